@@ -0,0 +1,383 @@
+import numpy as np
+import pandas as pd
+
+UTILITY_WEAPONS = ["hegrenade", "inferno", "molotov", "incgrenade"]
+TRADE_WINDOW_TICKS = 320  # ~5 seconds at 64 tick
+ROUND_WINNERS = {"T": 2, "CT": 3}  # round_end winner, when it comes as a name
+
+# order matters, this is the key order of every player's stats dict
+COUNT_FIELDS = [
+  "rounds_played",
+  "kills",
+  "assists",
+  "deaths",
+  "hs_kills",
+  "damage",
+  "util_damage",
+  "first_kills",
+  "first_deaths",
+  "kast_rounds",
+  "3k",
+  "4k",
+  "5k",
+  "trade_kills",
+  "traded_deaths",
+  "clutches",
+  "clutch_wins",
+]
+
+
+def assign_rounds(ticks, start_ticks):
+  """Maps every tick to the index of the round it falls in, -1 if before round 1."""
+  # a round spans from its start tick up to the NEXT round's start tick
+  return np.searchsorted(start_ticks, ticks, side="right") - 1
+
+
+def _with_rounds(df, start_ticks):
+  df = df.copy()
+  df["round"] = assign_rounds(df["tick"].to_numpy(), start_ticks)
+  # drop orphaned events that didn't fit into a valid match round
+  return df[df["round"] != -1]
+
+
+def _round_rosters(start_states, start_ticks):
+  # team alignment of every player at the exact start of each round
+  # several rounds can share a start tick, so join on tick instead of filtering
+  round_ticks = pd.DataFrame(
+    {"round": np.arange(len(start_ticks)), "tick": np.asarray(start_ticks)}
+  )
+  if start_states.empty:
+    return pd.DataFrame(columns=["round", "name"]), pd.Series(dtype=float)
+
+  states = round_ticks.merge(start_states, on="tick")
+  states = states[states["player_name"].notna()]
+  roster = states[["round", "player_name"]].rename(columns={"player_name": "name"})
+  # last known team wins, missing teams never overwrite a known one
+  teams = states.groupby(["round", "player_name"])["team_num"].last()
+  return roster, teams
+
+
+def _lookup_team(teams, rounds, names):
+  if teams.empty:
+    return np.full(len(rounds), np.nan)
+  keys = pd.MultiIndex.from_arrays(
+    [np.asarray(rounds), np.asarray(names, dtype=object)]
+  )
+  return teams.reindex(keys).to_numpy(dtype=float)
+
+
+def _is_enemy(team_a, team_b):
+  # unknown teams never match anything, same as comparing against a sentinel
+  same = ~np.isnan(team_a) & ~np.isnan(team_b) & (team_a == team_b)
+  return ~same
+
+
+def _count_by(names, mask=None):
+  if mask is not None:
+    names = names[mask]
+  return names.value_counts()
+
+
+def _cap_damage(rounds, victims, dmg):
+  # every player enters the round with a strict maximum of 100 HP to "give"
+  # overkill and corpse hits are nullified once the pool is empty, so a hit is
+  # worth what it adds to its victim's running total clipped at 100
+  dmg = np.maximum(dmg, 0)
+  dealt = pd.Series(dmg).groupby([rounds, victims], sort=False).cumsum().to_numpy()
+  return np.minimum(dealt, 100) - np.minimum(dealt - dmg, 100)
+
+
+def detect_trades(deaths, window=TRADE_WINDOW_TICKS):
+  """Flags every death whose killer died within `window` ticks in the same round.
+
+  `deaths` must be sorted by tick. Returns a frame aligned with `deaths` holding
+  `traded` and the `avenger` name plus the row of the avenging death.
+  """
+  left = pd.DataFrame(
+    {
+      "round": deaths["round"].to_numpy(),
+      "name": deaths["attacker_name"].to_numpy(dtype=object),
+      "tick": deaths["tick"].to_numpy(),
+      "row": np.arange(len(deaths)),
+    }
+  )
+  left = left[left["name"].notna() & deaths["user_name"].notna().to_numpy()]
+
+  # every death is a candidate for avenging an earlier one
+  right = pd.DataFrame(
+    {
+      "round": deaths["round"].to_numpy(),
+      "name": deaths["user_name"].to_numpy(dtype=object),
+      "tick": deaths["tick"].to_numpy(),
+      "avenger": deaths["attacker_name"].to_numpy(dtype=object),
+      "avenge_row": np.arange(len(deaths)),
+    }
+  )
+  right = right[right["name"].notna()]
+
+  # nearest later death of the killer, strictly after and at most `window` ticks
+  matched = pd.merge_asof(
+    left,
+    right,
+    on="tick",
+    by=["round", "name"],
+    direction="forward",
+    allow_exact_matches=False,
+    tolerance=window,
+  )
+  matched = matched[matched["avenge_row"].notna()]
+
+  trades = pd.DataFrame(
+    {
+      "traded": np.zeros(len(deaths), dtype=bool),
+      "avenger": pd.Series(np.nan, index=range(len(deaths)), dtype=object),
+      "avenge_row": -1,
+    }
+  )
+  rows = matched["row"].to_numpy()
+  trades.loc[rows, "traded"] = True
+  trades.loc[rows, "avenger"] = matched["avenger"].to_numpy()
+  trades.loc[rows, "avenge_row"] = matched["avenge_row"].to_numpy().astype(int)
+  return trades
+
+
+def round_winners(round_end_df, start_ticks):
+  """Winning team_num (2 = T, 3 = CT) of every round with a round_end, by round."""
+  if round_end_df is None or "winner" not in round_end_df.columns:
+    return pd.Series(dtype=float)
+  ends = _with_rounds(round_end_df, start_ticks)
+  winner = pd.to_numeric(ends["winner"], errors="coerce")
+  named = ends["winner"].astype(str).str.upper().map(ROUND_WINNERS)
+  winner = winner.where(winner.isin([2, 3]), named)
+  # a restarted round can end twice, the last end counts
+  return winner.groupby(ends["round"].to_numpy()).last().dropna()
+
+
+def detect_clutches(deaths, teams, winners):
+  """Finds the 1vX of every round, the last player alive on the side that was
+  left alone first while X enemies were still up.
+
+  `deaths` must be sorted by round and tick, alive counts start from the round
+  rosters in `teams`. Returns a frame of round, name, side, vs and won.
+  """
+  columns = ["round", "name", "side", "vs", "won"]
+  starts = teams[teams.isin([2, 3])].reset_index()
+  starts.columns = ["round", "name", "side"]
+  if starts.empty or deaths.empty:
+    return pd.DataFrame(columns=columns)
+  on_side = starts.groupby(["round", "side"]).size().unstack(fill_value=0)
+  on_side = on_side.reindex(columns=[2, 3], fill_value=0)
+
+  d_round = deaths["round"].to_numpy()
+  victims = deaths["user_name"]
+  rows = pd.DataFrame(
+    {
+      "round": d_round,
+      "name": victims.to_numpy(dtype=object),
+      "side": _lookup_team(teams, d_round, victims),
+      "row": np.arange(len(deaths)),
+    }
+  )
+  # only roster players count, and a reconnect can't die twice in a round
+  rows = rows[rows["side"].isin([2, 3])].drop_duplicates(["round", "name"])
+  rows["side"] = rows["side"].astype(int)
+
+  # alive counts of both sides right after every death
+  at_start = on_side.reindex(rows["round"].to_numpy(), fill_value=0)
+  t_dead = (rows["side"] == 2).groupby(rows["round"]).cumsum().to_numpy()
+  ct_dead = (rows["side"] == 3).groupby(rows["round"]).cumsum().to_numpy()
+  rows["t_alive"] = at_start[2].to_numpy() - t_dead
+  rows["ct_alive"] = at_start[3].to_numpy() - ct_dead
+  t_alone = (rows["t_alive"] == 1) & (rows["ct_alive"] >= 1)
+  ct_alone = (rows["ct_alive"] == 1) & (rows["t_alive"] >= 1)
+  rows["victim_alone"] = np.where(rows["side"] == 2, t_alone, ct_alone)
+
+  moments = rows[t_alone | ct_alone].groupby("round").head(1)
+  # the victim's side just went down to one, unless the other side already was
+  side = np.where(moments["victim_alone"], moments["side"], 5 - moments["side"])
+  clutch = pd.DataFrame(
+    {
+      "round": moments["round"].to_numpy(),
+      "side": side,
+      "vs": np.where(side == 2, moments["ct_alive"], moments["t_alive"]),
+      "at": moments["row"].to_numpy(),
+    }
+  )
+
+  # the one player of that side without a death up to that moment
+  candidates = starts.merge(clutch, on=["round", "side"])
+  died_at = rows.set_index(["round", "name"])["row"]
+  keys = pd.MultiIndex.from_frame(candidates[["round", "name"]])
+  death_row = died_at.reindex(keys).to_numpy(dtype=float)
+  alive = np.isnan(death_row) | (death_row > candidates["at"].to_numpy())
+  clutches = candidates[alive].drop_duplicates("round")
+
+  won = winners.reindex(clutches["round"].to_numpy()).to_numpy()
+  clutches = clutches.assign(won=won == clutches["side"].to_numpy())
+  return clutches[columns].reset_index(drop=True)
+
+
+def compute_player_stats(
+  hurt_df,
+  death_df,
+  start_ticks,
+  start_states,
+  trade_window=TRADE_WINDOW_TICKS,
+  round_end_df=None,
+):
+  """Columnar ADR/KAST/multi-kill aggregation keyed by player name."""
+  start_ticks = np.asarray(start_ticks)
+
+  hurts = _with_rounds(hurt_df, start_ticks)
+  # sort chronologically so damage applies in the correct order
+  hurts = hurts.sort_values(["round", "tick"], kind="stable").reset_index(drop=True)
+  deaths = _with_rounds(death_df, start_ticks)
+  deaths = deaths.sort_values(["round", "tick"], kind="stable").reset_index(drop=True)
+
+  roster, teams = _round_rosters(start_states, start_ticks)
+
+  # Add anyone who dealt damage or died, in case they reconnected mid-round
+  active = [
+    hurts[["round", "user_name"]].rename(columns={"user_name": "name"}),
+    hurts[["round", "attacker_name"]].rename(columns={"attacker_name": "name"}),
+    deaths[["round", "user_name"]].rename(columns={"user_name": "name"}),
+  ]
+  roster = pd.concat([roster, *active], ignore_index=True)
+  roster = roster[roster["name"].notna()].drop_duplicates()
+
+  # --- Kills, Assists, Deaths ---
+  d_round = deaths["round"].to_numpy()
+  vic = deaths["user_name"]
+  att = deaths["attacker_name"]
+  ass = deaths["assister_name"]
+  vic_team = _lookup_team(teams, d_round, vic)
+  att_team = _lookup_team(teams, d_round, att)
+  ass_team = _lookup_team(teams, d_round, ass)
+
+  is_kill = (att.notna() & (att != vic)).to_numpy() & _is_enemy(att_team, vic_team)
+  is_assist = ass.notna().to_numpy() & _is_enemy(ass_team, vic_team)
+  is_death = vic.notna().to_numpy()
+  is_hs = deaths["headshot"].astype(bool).to_numpy()
+
+  kills = _count_by(att, is_kill)
+  hs_kills = _count_by(att, is_kill & is_hs)
+  assists = _count_by(ass, is_assist)
+  death_counts = _count_by(vic, is_death)
+
+  # --- First Kills / Deaths ---
+  opening = deaths[is_kill & is_death].groupby("round").head(1)
+  first_kills = _count_by(opening["attacker_name"])
+  first_deaths = _count_by(opening["user_name"])
+
+  # --- Multi-kills ---
+  tally = deaths[is_kill].groupby(["round", "attacker_name"]).size()
+  tally_names = tally.index.get_level_values("attacker_name")
+  multi_kills = {
+    "3k": _count_by(pd.Series(tally_names[tally.to_numpy() == 3])),
+    "4k": _count_by(pd.Series(tally_names[tally.to_numpy() == 4])),
+    "5k": _count_by(pd.Series(tally_names[tally.to_numpy() >= 5])),
+  }
+
+  # --- Damage ---
+  hurts = hurts[hurts["user_name"].notna()]
+  h_round = hurts["round"].to_numpy()
+  h_vic = hurts["user_name"]
+  h_att = hurts["attacker_name"]
+  if "dmg_health" in hurts.columns:
+    dmg = pd.to_numeric(hurts["dmg_health"], errors="coerce").fillna(0)
+  else:
+    dmg = pd.Series(0, index=hurts.index)
+  dmg = dmg.to_numpy().astype(np.int64)
+
+  actual_dmg = _cap_damage(h_round, h_vic.to_numpy(dtype=object), dmg)
+  awarded = (
+    (h_att.notna() & (h_att != h_vic)).to_numpy()
+    & _is_enemy(
+      _lookup_team(teams, h_round, h_att), _lookup_team(teams, h_round, h_vic)
+    )
+    & (actual_dmg > 0)
+  )
+  is_util = hurts["weapon"].astype(str).isin(UTILITY_WEAPONS).to_numpy()
+  damage = pd.Series(actual_dmg[awarded]).groupby(h_att[awarded].to_numpy()).sum()
+  util_damage = (
+    pd.Series(actual_dmg[awarded & is_util])
+    .groupby(h_att[awarded & is_util].to_numpy())
+    .sum()
+  )
+
+  # --- Trades ---
+  trades = detect_trades(deaths, trade_window)
+  traded = trades["traded"].to_numpy()
+  traded_deaths = _count_by(vic, traded)
+  # one avenging kill can trade several teammates, count it once. the avenger has
+  # to be an enemy of the killer, a team kill or a world death trades nobody
+  avenger = trades["avenger"]
+  avenger_team = _lookup_team(teams, d_round, avenger)
+  avenging = trades[
+    traded
+    & (avenger.notna() & (avenger != att)).to_numpy()
+    & _is_enemy(avenger_team, att_team)
+  ]
+  trade_kills = _count_by(avenging.drop_duplicates("avenge_row")["avenger"])
+
+  # --- Clutches ---
+  clutches = detect_clutches(deaths, teams, round_winners(round_end_df, start_ticks))
+  clutch_counts = _count_by(clutches["name"])
+  clutch_wins = _count_by(clutches["name"], clutches["won"].to_numpy(dtype=bool))
+
+  # --- Rounds Played & KAST ---
+  # Kill, Assist, Survived or Traded
+  kast_events = pd.concat(
+    [
+      pd.DataFrame({"round": d_round[is_kill], "name": att[is_kill].to_numpy()}),
+      pd.DataFrame({"round": d_round[is_assist], "name": ass[is_assist].to_numpy()}),
+      pd.DataFrame({"round": d_round[traded], "name": vic[traded].to_numpy()}),
+    ],
+    ignore_index=True,
+  )
+  roster_keys = pd.MultiIndex.from_frame(roster[["round", "name"]])
+  died = roster_keys.isin(
+    pd.MultiIndex.from_arrays([d_round[is_death], vic[is_death].to_numpy()])
+  )
+  achieved = roster_keys.isin(pd.MultiIndex.from_frame(kast_events))
+  rounds_played = _count_by(roster["name"])
+  kast_rounds = _count_by(roster["name"], ~died | achieved)
+
+  columns = {
+    "rounds_played": rounds_played,
+    "kills": kills,
+    "assists": assists,
+    "deaths": death_counts,
+    "hs_kills": hs_kills,
+    "damage": damage,
+    "util_damage": util_damage,
+    "first_kills": first_kills,
+    "first_deaths": first_deaths,
+    "kast_rounds": kast_rounds,
+    **multi_kills,
+    "trade_kills": trade_kills,
+    "traded_deaths": traded_deaths,
+    "clutches": clutch_counts,
+    "clutch_wins": clutch_wins,
+  }
+
+  # everyone who was credited with anything gets a row, same as before
+  names = set(rounds_played.index) | set(kills.index) | set(assists.index)
+  names |= set(death_counts.index) | set(damage[damage > 0].index)
+
+  stats_per_player = {}
+  for name in sorted(names):
+    stats = {f: int(columns[f].get(name, 0)) for f in COUNT_FIELDS}
+
+    # Final Percentage Math
+    rp = max(stats["rounds_played"], 1)
+    k = max(stats["kills"], 1)
+    stats["kast_pct"] = round((stats["kast_rounds"] / rp) * 100, 1)
+    stats["adr"] = round(stats["damage"] / rp, 1)
+    stats["hs_pct"] = round((stats["hs_kills"] / k) * 100, 1)
+    stats["util_adr"] = round(stats["util_damage"] / rp, 1)
+    duels = max(stats["first_kills"] + stats["first_deaths"], 1)
+    stats["opening_win_pct"] = round((stats["first_kills"] / duels) * 100, 1)
+    stats_per_player[name] = stats
+
+  return stats_per_player
@@ -0,0 +1,113 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+BATCH_WORKERS = int(os.getenv("PARSER_BATCH_WORKERS", os.cpu_count() or 1))
+
+
+def find_demos(source):
+  """Demo paths from a directory of .dem files or a manifest with one path per line."""
+  if os.path.isdir(source):
+    return sorted(
+      os.path.join(source, name) for name in os.listdir(source) if name.endswith(".dem")
+    )
+
+  # manifest paths are relative to the manifest, blank lines and # comments skipped
+  base_dir = os.path.dirname(os.path.abspath(source))
+  demos = []
+  with open(source) as f:
+    for line in f:
+      line = line.strip()
+      if line and not line.startswith("#"):
+        demos.append(os.path.join(base_dir, line))
+  return demos
+
+
+def _init_worker():
+  # flush every line on its own, so output of parallel workers never interleaves
+  # mid line and the orchestrator can still pick out every DATA_OUTPUT
+  sys.stdout.reconfigure(line_buffering=True)
+
+
+def _parse_one(demo_path, keep_demo):
+  # pandas, numpy and demoparser2 are imported once per worker, not per demo
+  import parser
+
+  # a missing or unreadable demo fails on its own, not the whole batch
+  result = {"demo_path": demo_path, "bytes": None}
+  start = time.perf_counter()
+  try:
+    result["bytes"] = os.path.getsize(demo_path)
+    result["file_path"] = parser.parse_demo(demo_path, keep_demo=keep_demo)
+    result["ok"] = True
+  except Exception as e:
+    print(f"Error: Failed to parse {demo_path}: {e}")
+    event = {
+      "type": "error",
+      "payload": {"message": f"Parse failed: {e}", "demo_path": demo_path},
+    }
+    print(f"DATA_OUTPUT:{json.dumps(event)}", flush=True)
+    result["ok"] = False
+  result["seconds"] = time.perf_counter() - start
+  return result
+
+
+def throughput_summary(results, wall_seconds, workers):
+  parsed = [r for r in results if r["ok"]]
+  megabytes = sum(r["bytes"] for r in parsed) / (1024 * 1024)
+  minutes = max(wall_seconds, 1e-9) / 60
+  return {
+    "demos": len(results),
+    "parsed": len(parsed),
+    "failed": len(results) - len(parsed),
+    "workers": workers,
+    "wall_seconds": round(wall_seconds, 2),
+    "demos_per_min": round(len(parsed) / minutes, 2),
+    "mb_per_s": round(megabytes / max(wall_seconds, 1e-9), 2),
+  }
+
+
+def run_batch(demo_paths, workers=BATCH_WORKERS, keep_demos=False):
+  start = time.perf_counter()
+  results = []
+  with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+    futures = [pool.submit(_parse_one, path, keep_demos) for path in demo_paths]
+    for future in as_completed(futures):
+      results.append(future.result())
+
+  summary = throughput_summary(results, time.perf_counter() - start, workers)
+  print(
+    f"Batch done: {summary['parsed']}/{summary['demos']} demos parsed "
+    f"in {summary['wall_seconds']}s with {workers} workers"
+  )
+  print(
+    f"Throughput: {summary['demos_per_min']} demos/min, {summary['mb_per_s']} MB/s",
+    flush=True,
+  )
+  return summary
+
+
+def main(argv):
+  arg_parser = argparse.ArgumentParser(
+    prog="parser.py --batch", description="Parse many demos across a process pool."
+  )
+  arg_parser.add_argument(
+    "source", help="directory of .dem files or a manifest with one demo path per line"
+  )
+  arg_parser.add_argument("--workers", type=int, default=BATCH_WORKERS)
+  arg_parser.add_argument(
+    "--keep-demos", action="store_true", help="don't delete demos once parsed"
+  )
+  args = arg_parser.parse_args(argv)
+
+  demos = find_demos(args.source)
+  if not demos:
+    print(f"Error: No demos found in '{args.source}'.")
+    sys.exit(1)
+  print(f"Parsing {len(demos)} demos with {args.workers} workers...", flush=True)
+  summary = run_batch(demos, args.workers, args.keep_demos)
+  if summary["failed"]:
+    sys.exit(1)
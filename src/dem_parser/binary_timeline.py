@@ -0,0 +1,188 @@
+import json
+import os
+import shutil
+import struct
+import numpy as np
+
+# Layout (little endian):
+#   4 bytes   magic "FCTL"
+#   uint32    header length in bytes
+#   header    utf-8 JSON, describes every array below
+#   padding   up to the next 8 byte boundary, where the data section starts
+#   arrays    raw typed arrays, header offsets are relative to the data section
+#             and every array starts on an 8 byte boundary
+#
+# Tick i owns players p_*[p_start[i]:p_start[i + 1]] and
+# grenades g_*[g_start[i]:g_start[i + 1]], the same as timeline[i]["p"/"g"]
+MAGIC = b"FCTL"
+FORMAT_VERSION = 1
+ALIGNMENT = 8
+
+PLAYER_COLUMNS = [
+  ("sid", "p_sid", "<i2"),
+  ("hp", "p_hp", "<i2"),
+  ("x", "p_x", "<f4"),
+  ("y", "p_y", "<f4"),
+  ("z", "p_z", "<f4"),
+  ("rot", "p_rot", "<i2"),
+]
+
+HELD_COLUMN = ("held", "p_held", "<i1")
+
+GRENADE_COLUMNS = [
+  ("eid", "g_eid", "<i4"),
+  ("sid", "g_sid", "<i2"),
+  ("wep", "g_wep", "<i1"),
+  ("x", "g_x", "<f4"),
+  ("y", "g_y", "<f4"),
+  ("z", "g_z", "<f4"),
+]
+
+
+def get_binary_path(json_path):
+  return os.path.splitext(json_path)[0] + ".timeline.bin"
+
+
+def _data_start(header_len):
+  start = len(MAGIC) + 4 + header_len
+  return start + (-start % ALIGNMENT)
+
+
+def _row_starts(row_ticks, ticks, base=0):
+  # rows are sorted by tick, so every tick's slice starts where searchsorted says
+  return (np.searchsorted(row_ticks, ticks, side="left") + base).astype("<u4")
+
+
+class BinaryTimelineWriter:
+  """Appends tick frames window by window, every array is spooled to its own
+  part file and the parts are stitched behind the header on close."""
+
+  def __init__(self, filepath, held=False):
+    self.filepath = filepath
+    # optional p_held, 1 where the row is held on the following ticks
+    self.player_columns = PLAYER_COLUMNS + ([HELD_COLUMN] if held else [])
+    self.names = ["t", "p_start"]
+    self.names += [name for _, name, _ in self.player_columns]
+    self.names += ["g_start"] + [name for _, name, _ in GRENADE_COLUMNS]
+    self.dtypes = {"t": "<i4", "p_start": "<u4", "g_start": "<u4"}
+    self.dtypes.update({name: dtype for _, name, dtype in self.player_columns})
+    self.dtypes.update({name: dtype for _, name, dtype in GRENADE_COLUMNS})
+    self.lengths = dict.fromkeys(self.names, 0)
+
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    # truncate whatever a crashed parse of the same demo left behind
+    for name in self.names:
+      with open(self._part_path(name), "wb"):
+        pass
+
+  def _part_path(self, name):
+    return f"{self.filepath}.{name}.part"
+
+  def _append(self, name, arr):
+    arr = np.asarray(arr).astype(self.dtypes[name])
+    with open(self._part_path(name), "ab") as part:
+      part.write(arr.tobytes())
+    self.lengths[name] += len(arr)
+
+  def append(self, df, g_df=None):
+    """`df` is a cleaned tick frame sorted by tick, `g_df` the matching grenades."""
+    ticks = np.unique(df["tick"].to_numpy())
+    self._append("t", ticks)
+    self._append(
+      "p_start", _row_starts(df["tick"].to_numpy(), ticks, self.lengths["p_sid"])
+    )
+    for col, name, _ in self.player_columns:
+      self._append(name, df[col].to_numpy())
+
+    if g_df is not None and not g_df.empty:
+      # same as the json timeline, grenades only show up on sampled player ticks
+      g_df = g_df[g_df["tick"].isin(ticks)].sort_values("tick", kind="stable")
+    else:
+      g_df = None
+
+    if g_df is not None:
+      g_ticks = g_df["tick"].to_numpy()
+      self._append("g_start", _row_starts(g_ticks, ticks, self.lengths["g_eid"]))
+      for col, name, _ in GRENADE_COLUMNS:
+        self._append(name, g_df[col].to_numpy())
+    else:
+      self._append("g_start", np.full(len(ticks), self.lengths["g_eid"]))
+
+  def close(self):
+    # closing entries, tick i spans [start[i], start[i + 1])
+    self._append("p_start", [self.lengths["p_sid"]])
+    self._append("g_start", [self.lengths["g_eid"]])
+
+    header = {
+      "version": FORMAT_VERSION,
+      "ticks": self.lengths["t"],
+      "players": self.lengths["p_sid"],
+      "grenades": self.lengths["g_eid"],
+      "arrays": {},
+    }
+    offset = 0
+    for name in self.names:
+      offset += -offset % ALIGNMENT
+      header["arrays"][name] = {
+        "dtype": np.dtype(self.dtypes[name]).str,
+        "offset": offset,
+        "length": self.lengths[name],
+      }
+      offset += self.lengths[name] * np.dtype(self.dtypes[name]).itemsize
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+
+    print(f"Saving binary timeline to {self.filepath}...")
+    with open(self.filepath, "wb") as f:
+      f.write(MAGIC)
+      f.write(struct.pack("<I", len(header_bytes)))
+      f.write(header_bytes)
+      data_start = _data_start(len(header_bytes))
+      for name in self.names:
+        f.write(b"\0" * (data_start + header["arrays"][name]["offset"] - f.tell()))
+        part_path = self._part_path(name)
+        with open(part_path, "rb") as part:
+          shutil.copyfileobj(part, f)
+        os.remove(part_path)
+    return self.filepath
+
+  def abort(self):
+    for name in self.names:
+      if os.path.exists(self._part_path(name)):
+        os.remove(self._part_path(name))
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, exc_type, exc, tb):
+    if exc_type is None:
+      self.close()
+    else:
+      self.abort()
+
+
+def write_binary_timeline(df, g_df, filepath):
+  """Writes the sorted tick frame as a struct-of-arrays blob, straight from the columns."""
+  with BinaryTimelineWriter(filepath) as writer:
+    writer.append(df, g_df)
+  return filepath
+
+
+def read_binary_timeline(filepath):
+  """Returns (header, {name: ndarray}) for a file written by write_binary_timeline."""
+  with open(filepath, "rb") as f:
+    data = f.read()
+  if data[:4] != MAGIC:
+    raise ValueError(f"{filepath} is not a binary timeline")
+  (header_len,) = struct.unpack_from("<I", data, 4)
+  header = json.loads(data[8 : 8 + header_len].decode("utf-8"))
+  data_start = _data_start(header_len)
+  arrays = {
+    name: np.frombuffer(
+      data,
+      dtype=spec["dtype"],
+      count=spec["length"],
+      offset=data_start + spec["offset"],
+    )
+    for name, spec in header["arrays"].items()
+  }
+  return header, arrays
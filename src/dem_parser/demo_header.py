@@ -0,0 +1,75 @@
+import struct
+
+# CS2 demos start with the magic and two int32 offsets, the first one points at
+# the CDemoFileInfo frame the recorder writes last. A frame is three varints
+# (command, tick, size) followed by `size` bytes of protobuf.
+DEMO_MAGIC = b"PBDEMS2\0"
+DEM_FILE_INFO = 2
+DEM_IS_COMPRESSED = 64
+FILE_INFO_PLAYBACK_TICKS = 2  # CDemoFileInfo.playback_ticks
+
+
+def _varint(data, pos):
+  value = 0
+  shift = 0
+  while True:
+    if pos >= len(data):
+      raise ValueError("truncated varint")
+    byte = data[pos]
+    pos += 1
+    value |= (byte & 0x7F) << shift
+    if not byte & 0x80:
+      return value, pos
+    shift += 7
+
+
+def _find_varint_field(message, field_number):
+  pos = 0
+  while pos < len(message):
+    key, pos = _varint(message, pos)
+    field, wire_type = key >> 3, key & 7
+    if wire_type == 0:
+      value, pos = _varint(message, pos)
+      if field == field_number:
+        return value
+    elif wire_type == 1:
+      pos += 8
+    elif wire_type == 2:
+      length, pos = _varint(message, pos)
+      pos += length
+    elif wire_type == 5:
+      pos += 4
+    else:
+      raise ValueError(f"unsupported wire type {wire_type}")
+  return None
+
+
+def read_playback_ticks(demo_path):
+  """Tick count from the demo's file info frame, read straight from the file.
+
+  Returns None for anything that isn't a plain CS2 demo with an uncompressed
+  file info frame, callers fall back to scanning the ticks then.
+  """
+  try:
+    with open(demo_path, "rb") as f:
+      head = f.read(16)
+      if len(head) < 16 or head[:8] != DEMO_MAGIC:
+        return None
+      (offset,) = struct.unpack_from("<i", head, 8)
+      if offset <= 0:
+        return None
+      f.seek(offset)
+      frame = f.read(32)
+
+      command, pos = _varint(frame, 0)
+      _, pos = _varint(frame, pos)  # frame tick
+      size, pos = _varint(frame, pos)
+      if command & DEM_IS_COMPRESSED or command != DEM_FILE_INFO:
+        return None  # a snappy compressed frame isn't worth decoding here
+      f.seek(offset + pos)
+      message = f.read(size)
+    if len(message) != size:
+      return None
+    return _find_varint_field(message, FILE_INFO_PLAYBACK_TICKS)
+  except (OSError, ValueError):
+    return None
@@ -0,0 +1,37 @@
+import numpy as np
+
+# buckets are about a second long and always start on a sampled tick
+EVENT_INDEX_TICKS = 64
+
+
+class EventIndex:
+  """Offsets into every event list of the replay, per tick bucket and per round.
+
+  offsets[name][i] is how many `name` events happened before the bucket that
+  starts at start_tick + i * step, so the events of a scrub to tick T start
+  at offsets[name][(T - start_tick) // step] and at most one bucket of them
+  needs a look. round_offsets works the same with the round start ticks.
+  """
+
+  def __init__(self, start_tick, end_tick, interval, round_starts=None):
+    self.start_tick = int(start_tick)
+    self.step = interval * max(EVENT_INDEX_TICKS // interval, 1)
+    self.bucket_ticks = np.arange(self.start_tick, int(end_tick) + 1, self.step)
+    self.round_ticks = np.asarray(round_starts or [], dtype=np.int64)
+    self.offsets = {}
+    self.round_offsets = {}
+
+  def add(self, event_name, ticks):
+    """`ticks` of one event list, in the order the records were written."""
+    ticks = np.asarray(ticks)
+    self.offsets[event_name] = np.searchsorted(ticks, self.bucket_ticks).tolist()
+    self.round_offsets[event_name] = np.searchsorted(ticks, self.round_ticks).tolist()
+
+  def to_dict(self):
+    return {
+      "start_tick": self.start_tick,
+      "step": self.step,
+      "offsets": self.offsets,
+      "round_ticks": self.round_ticks.tolist(),
+      "round_offsets": self.round_offsets,
+    }
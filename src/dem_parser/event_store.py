@@ -0,0 +1,79 @@
+import pandas as pd
+
+
+class CountingParser:
+  """Wraps a DemoParser and counts every parse_* call, each one is a pass over the demo.
+
+  `rows` adds up the rows of every frame a call returned, per method.
+  """
+
+  def __init__(self, parser):
+    self._parser = parser
+    self.passes = {}
+    self.rows = {}
+
+  def __getattr__(self, name):
+    attr = getattr(self._parser, name)
+    if not name.startswith("parse_") or not callable(attr):
+      return attr
+
+    def counted(*args, **kwargs):
+      self.passes[name] = self.passes.get(name, 0) + 1
+      result = attr(*args, **kwargs)
+      if isinstance(result, pd.DataFrame):
+        self.rows[name] = self.rows.get(name, 0) + len(result)
+      return result
+
+    return counted
+
+  @property
+  def total_passes(self):
+    # the header is read from the front of the file, it is not a full pass
+    return sum(n for name, n in self.passes.items() if name != "parse_header")
+
+
+class EventStore:
+  """Decodes the union of every event a parse needs with one parse_events call.
+
+  Stages get their events from here instead of calling parse_event(s) themselves.
+  The frames are shared between stages, so treat them as read-only. A failed
+  pass raises its error again on every later call, a stage that catches it
+  doesn't leave the rest of the parse with no events.
+  """
+
+  def __init__(self, parser, event_names, other=None, player=None):
+    # dedupe but keep the order the stages asked in
+    self.event_names = list(dict.fromkeys(event_names))
+    self.other = other or []
+    self.player = player or []
+    self.parser = parser
+    self._events = None
+    self._error = None
+
+  def _load(self):
+    if self._error is not None:
+      raise self._error
+    if self._events is None:
+      events = {}
+      try:
+        for event_name, df in self.parser.parse_events(
+          self.event_names, player=self.player, other=self.other
+        ):
+          if df is not None and not df.empty:
+            events[event_name] = df
+      except Exception as e:
+        self._error = e
+        raise
+      self._events = events
+    return self._events
+
+  def get(self, event_name):
+    """Frame for one event, empty if the demo never fired it."""
+    if event_name not in self.event_names:
+      raise KeyError(f"{event_name} was not requested up front")
+    return self._load().get(event_name, pd.DataFrame())
+
+  def items(self, event_names):
+    """(name, frame) pairs for the wanted events, in the order demoparser returned them."""
+    wanted = set(event_names)
+    return [(name, df) for name, df in self._load().items() if name in wanted]
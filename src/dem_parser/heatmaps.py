@@ -0,0 +1,110 @@
+import json
+import os
+import numpy as np
+
+# Layout of <base>.heatmaps.json:
+#   {"version", "cell", "origin": [x, y], "shape": [rows, cols], "interval",
+#    "layers": {name: [[count, ...], ...]}}
+# row r, col c covers x in origin[0] + c * cell and y in origin[1] + r * cell,
+# one cell further each. Occupancy counts samples, every sample is `interval` ticks
+HEATMAP_VERSION = 1
+HEATMAP_CELL = 64  # world units per cell
+HEATMAP_EXTENT = 8192  # grid covers [-extent, extent) on x and y, every map fits
+SIDES = {2: "t", 3: "ct"}
+
+# extra columns the tick read and the death events need for the grids
+HEATMAP_TICK_PROPS = ["team_num"]
+HEATMAP_EVENT_PLAYER_PROPS = ["X", "Y", "team_num"]
+
+
+def get_heatmap_path(json_path):
+  return os.path.splitext(json_path)[0] + ".heatmaps.json"
+
+
+class HeatmapBuilder:
+  """Accumulates per side 2D histograms of where players stood, killed and died.
+
+  The grid is fixed world space, so windows can be added one at a time, and is
+  cropped to the cells that were ever hit when saved.
+  """
+
+  def __init__(self, interval, cell=HEATMAP_CELL, extent=HEATMAP_EXTENT):
+    self.interval = interval
+    self.cell = cell
+    self.extent = extent
+    self.size = 2 * extent // cell
+    self.layers = {
+      f"{kind}_{label}": np.zeros(self.size * self.size, dtype=np.int64)
+      for kind in ["occupancy", "kills", "deaths"]
+      for label in SIDES.values()
+    }
+
+  def _add(self, name, x, y):
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    col = np.floor((x + self.extent) / self.cell)
+    row = np.floor((y + self.extent) / self.cell)
+    inside = (col >= 0) & (col < self.size) & (row >= 0) & (row < self.size)
+    cells = (row[inside] * self.size + col[inside]).astype(np.int64)
+    self.layers[name] += np.bincount(cells, minlength=self.size * self.size)
+
+  def add_ticks(self, df):
+    """Raw parse_ticks frame with health, X, Y and team_num, dead players are skipped."""
+    if df.empty:
+      return
+    alive = (df["health"] > 0).to_numpy()
+    team = df["team_num"].to_numpy()
+    for side, label in SIDES.items():
+      rows = alive & (team == side)
+      self._add(
+        f"occupancy_{label}", df["X"].to_numpy()[rows], df["Y"].to_numpy()[rows]
+      )
+
+  def add_deaths(self, death_df, start_tick, end_tick):
+    """player_death events parsed with HEATMAP_EVENT_PLAYER_PROPS."""
+    if death_df.empty:
+      return
+    death_df = death_df[
+      (death_df["tick"] >= start_tick) & (death_df["tick"] <= end_tick)
+    ]
+    for role, layer in [("attacker", "kills"), ("user", "deaths")]:
+      cols = [f"{role}_X", f"{role}_Y", f"{role}_team_num"]
+      if not all(c in death_df.columns for c in cols):
+        continue
+      x, y, team = (death_df[c].to_numpy() for c in cols)
+      for side, label in SIDES.items():
+        rows = team == side
+        self._add(f"{layer}_{label}", x[rows], y[rows])
+
+  def to_dict(self):
+    names = list(self.layers)
+    grids = [self.layers[n].reshape(self.size, self.size) for n in names]
+    hit = np.zeros((self.size, self.size), dtype=bool)
+    for grid in grids:
+      hit |= grid > 0
+    rows = np.flatnonzero(hit.any(axis=1))
+    cols = np.flatnonzero(hit.any(axis=0))
+    if len(rows):
+      r0, r1, c0, c1 = rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+    else:
+      r0 = r1 = c0 = c1 = 0
+
+    return {
+      "version": HEATMAP_VERSION,
+      "cell": self.cell,
+      "origin": [
+        int(c0 * self.cell - self.extent),
+        int(r0 * self.cell - self.extent),
+      ],
+      "shape": [int(r1 - r0), int(c1 - c0)],
+      "interval": self.interval,
+      "layers": {n: g[r0:r1, c0:c1].tolist() for n, g in zip(names, grids)},
+    }
+
+  def save(self, json_path):
+    path = get_heatmap_path(json_path)
+    with open(f"{path}.tmp", "w") as f:
+      json.dump(self.to_dict(), f, separators=(",", ":"))
+    os.replace(f"{path}.tmp", path)
+    print(f"Saved heatmaps to {path}")
+    return path
@@ -0,0 +1,98 @@
+import os
+
+import pandas as pd
+
+try:
+  import pyarrow as pa
+  import pyarrow.parquet as pq
+except ImportError:  # the analytics export is optional
+  pa = pq = None
+
+# Layout under the export root, one table per directory, hive partitioned so
+# pyarrow.dataset / duckdb / spark prune by map and match:
+#   <table>/map=<map>/match=<match>/part-0.parquet
+# tables: ticks (the cleaned tick frame: tick, sid, hp, x, y, z, rot[, held]),
+# grenades (tick, eid, sid, wep, x, y, z), players (sid, steamid, name, team and
+# the advanced stats) and one per replay event (player_death, weapon_fire, ...)
+# with the columns of the "events" block, "t" renamed to tick.
+# sids are per match, join them to players on (map, match, sid)
+PART_NAME = "part-0.parquet"
+
+
+class ParquetExport:
+  """Writes the frames of one parse as parquet tables, window by window.
+
+  Every table goes to a .tmp file first and all of them are moved into place on
+  close, along with removing the parts an earlier export of the match left in
+  tables this one did not write.
+  """
+
+  def __init__(self, root, map_name, match):
+    if pq is None:
+      raise ImportError("pyarrow is required for the parquet export")
+    self.root = root
+    self.partition = os.path.join(f"map={map_name}", f"match={match}")
+    self.writers = {}
+
+  def path(self, table):
+    return os.path.join(self.root, table, self.partition, PART_NAME)
+
+  def write(self, table, df):
+    if df is None or df.empty:
+      return
+    data = pa.Table.from_pandas(df, preserve_index=False)
+    writer = self.writers.get(table)
+    if writer is None:
+      path = self.path(table)
+      os.makedirs(os.path.dirname(path), exist_ok=True)
+      writer = pq.ParquetWriter(f"{path}.tmp", data.schema)
+      self.writers[table] = writer
+    # every window is its own row group
+    writer.write_table(data)
+
+  def add_ticks(self, df, g_df=None):
+    self.write("ticks", df)
+    if g_df is not None:
+      self.write("grenades", g_df)
+
+  def add_events(self, event_name, df):
+    self.write(event_name, df.rename(columns={"t": "tick"}))
+
+  def add_players(self, player_lookup):
+    rows = [
+      {
+        "sid": sid,
+        "steamid": p["sid"],
+        "name": p["name"],
+        "team": p["team"],
+        **p.get("advanced_stats", {}),
+      }
+      for sid, p in player_lookup.items()
+    ]
+    self.write("players", pd.DataFrame(rows))
+
+  def close(self):
+    for writer in self.writers.values():
+      writer.close()
+    for table in self.writers:
+      os.replace(f"{self.path(table)}.tmp", self.path(table))
+    # a reparse may have no rows left for a table the last export wrote
+    for table in os.listdir(self.root) if os.path.isdir(self.root) else []:
+      stale = self.path(table)
+      if table not in self.writers and os.path.exists(stale):
+        os.remove(stale)
+    print(f"Exported {len(self.writers)} parquet tables to {self.root}")
+
+  def abort(self):
+    for table, writer in self.writers.items():
+      writer.close()
+      os.remove(f"{self.path(table)}.tmp")
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, exc_type, exc, tb):
+    if exc_type is None:
+      self.close()
+    else:
+      self.abort()
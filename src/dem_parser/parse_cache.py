@@ -0,0 +1,101 @@
+import hashlib
+import json
+import os
+import shutil
+
+# bump whenever the replay files or the parse_meta_complete payload change,
+# every entry written by an older parser is then a miss
+PARSER_VERSION = 4
+
+# Layout of <cache_dir>/<key>/:
+#   entry.json  {"version", "demo", "sha256", "config", "meta_event", "files"}
+#   one file per output, "demo" + its suffix after the demo name,
+#   e.g. demo.json, demo.timeline.bin, demo.rounds.jsonl
+
+
+def hash_demo(demo_path):
+  with open(demo_path, "rb") as f:
+    return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def _output_stem(json_path):
+  # <demo>.json and every sidecar next to it share <demo> as their prefix
+  return os.path.splitext(json_path)[0]
+
+
+class ParseCache:
+  """Parse outputs keyed by the demo's content hash, the parser version and the
+  output config (encoding, sampling, sidecars...).
+
+  The demo's file name is part of the key too, the replay meta and the sidecar
+  references inside it are named after it. Entries are written to a temp dir
+  and renamed into place, so a reader never sees half of one.
+  """
+
+  def __init__(self, cache_dir, config):
+    self.cache_dir = cache_dir
+    self.config = config
+
+  def key(self, demo_path, demo_hash=None):
+    key = {
+      "version": PARSER_VERSION,
+      "config": self.config,
+      "demo": os.path.basename(demo_path),
+      "sha256": demo_hash or hash_demo(demo_path),
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+  def restore(self, key, json_path):
+    """Copies a hit's files next to json_path, returns its parse_meta_complete
+    event (pointing at json_path) or None on a miss."""
+    entry_dir = os.path.join(self.cache_dir, key)
+    try:
+      with open(os.path.join(entry_dir, "entry.json")) as f:
+        entry = json.load(f)
+    except (OSError, ValueError):
+      return None
+    if entry.get("version") != PARSER_VERSION:
+      return None
+
+    stem = _output_stem(json_path)
+    os.makedirs(os.path.dirname(json_path), exist_ok=True)
+    for suffix in entry["files"]:
+      path = f"{stem}{suffix}"
+      shutil.copyfile(os.path.join(entry_dir, f"demo{suffix}"), f"{path}.tmp")
+      os.replace(f"{path}.tmp", path)
+
+    event = entry["meta_event"]
+    event["payload"]["file_path"] = json_path
+    print(f"Parse cache hit {key[:12]}, restored {len(entry['files'])} files")
+    return event
+
+  def store(self, key, demo_path, demo_hash, json_path, meta_event, outputs):
+    """`outputs` are the files the parse wrote, json_path first."""
+    stem = _output_stem(json_path)
+    suffixes = [path[len(stem) :] for path in outputs]
+    entry_dir = os.path.join(self.cache_dir, key)
+    tmp_dir = f"{entry_dir}.tmp{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    for path, suffix in zip(outputs, suffixes):
+      shutil.copyfile(path, os.path.join(tmp_dir, f"demo{suffix}"))
+    entry = {
+      "version": PARSER_VERSION,
+      "demo": os.path.basename(demo_path),
+      "sha256": demo_hash,
+      "config": self.config,
+      "meta_event": meta_event,
+      "files": suffixes,
+    }
+    with open(os.path.join(tmp_dir, "entry.json"), "w") as f:
+      json.dump(entry, f)
+
+    try:
+      os.rename(tmp_dir, entry_dir)
+    except OSError:
+      # another parse of the same demo got there first, same files
+      shutil.rmtree(tmp_dir, ignore_errors=True)
+      return None
+    print(f"Parse cache stored {key[:12]}")
+    return entry_dir
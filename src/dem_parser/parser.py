@@ -2,21 +2,91 @@ from demoparser2 import DemoParser
 import json
 import os
 import sys
+from contextlib import nullcontext
 import pandas as pd
 import numpy as np
 from dotenv import load_dotenv
+from advanced_stats import compute_player_stats
+from event_index import EventIndex
+from event_store import CountingParser, EventStore
+from heatmaps import (
+  HEATMAP_EVENT_PLAYER_PROPS,
+  HEATMAP_TICK_PROPS,
+  HeatmapBuilder,
+  get_heatmap_path,
+)
+from steamids import SteamIdMap, to_steamid64
+from demo_header import read_playback_ticks
+from parse_cache import ParseCache, hash_demo
+from parquet_export import ParquetExport
+from binary_timeline import BinaryTimelineWriter, get_binary_path
+from profiling import ParseProfiler
+from replay_writer import ReplayWriter
+from round_segments import RoundSegmentWriter, get_index_path, get_segments_path
+from sampling import AdaptiveSampler
+from timeline import delta_encoding_spec, iter_timeline
 
 load_dotenv()
 
 TICK_INTERVAL = 12
 OUTPUT_FOLDER = os.getenv("PARSER_OUTPUT_DIR", "output")
-
-
-def get_demo_path():
-  if len(sys.argv) < 2:
+# also write the timeline as a columnar .timeline.bin next to the replay json
+BINARY_TIMELINE = os.getenv("PARSER_BINARY_TIMELINE", "false").lower() == "true"
+# fetch ticks in windows to bound memory: unset = whole match, "round" or a tick count
+TICK_WINDOW = os.getenv("PARSER_TICK_WINDOW", "")
+# "delta" stores player positions as quantized deltas against keyframes
+POSITION_ENCODING = os.getenv("PARSER_POSITION_ENCODING", "").lower()
+# also write the timeline and events split per round, with a byte offset index
+ROUND_SEGMENTS = os.getenv("PARSER_ROUND_SEGMENTS", "false").lower() == "true"
+# "adaptive" samples on a finer grid and keeps only the samples that matter
+SAMPLING = os.getenv("PARSER_SAMPLING", "").lower()
+# per side occupancy / kill / death grids in <base>.heatmaps.json
+HEATMAPS = os.getenv("PARSER_HEATMAPS", "false").lower() == "true"
+# per bucket / per round offsets into the event lists, as "event_index"
+EVENT_INDEX = os.getenv("PARSER_EVENT_INDEX", "false").lower() == "true"
+# "dead" drops repeated samples of dead players, "held" also drops alive
+# samples that repeat the previous one and marks the sample they hold on to
+COMPACTION = os.getenv("PARSER_COMPACTION", "dead").lower()
+# reuse the outputs of an earlier parse of the same demo, unset = no cache
+PARSE_CACHE_DIR = os.getenv("PARSER_CACHE_DIR", "")
+# also write the tick and event frames as parquet tables under this dir, needs pyarrow
+PARQUET_DIR = os.getenv("PARSER_PARQUET_DIR", "")
+
+
+# replay events, written to the "events" block
+GAME_EVENTS = [
+  "weapon_fire",
+  "player_death",
+  "round_start",
+  "round_end",
+  "bomb_planted",
+  # grenades
+  "hegrenade_detonate",
+  "flashbang_detonate",
+  "smokegrenade_detonate",
+  "decoy_detonate",
+  "inferno_startburn",
+  "inferno_expire",
+  "inferno_extinguish",
+]
+STATS_EVENTS = ["player_hurt", "player_death", "round_start", "round_end"]
+META_EVENTS = [
+  "begin_new_match",
+  "round_start",
+  "warmup_period_start",
+  "warmup_period_end",
+]
+EVENT_PROPS = ["game_time", "team_num"]
+
+
+def get_demo_path(arg_index=1):
+  if len(sys.argv) <= arg_index:
     print("Usage: python3 parser.py <path_to_demo>")
+    print("       python3 parser.py --batch <demo_dir|manifest> [--workers N]")
+    print("       python3 parser.py --worker  (jobs as json lines on stdin)")
+    print("       python3 parser.py --meta-only <path_to_demo>")
     sys.exit(1)
-  demo_path = sys.argv[1]
+  demo_path = sys.argv[arg_index]
   if not os.path.exists(demo_path):
     print(f"Error: File '{demo_path}' not found.")
     sys.exit(1)
@@ -32,40 +102,10 @@ def get_absolute_path(filename):
   return os.path.join(output_dir, filename)
 
 
-def save_json(data, filepath):
-  os.makedirs(os.path.dirname(filepath), exist_ok=True)
-
-  print(f"Saving to {filepath}...")
-  with open(filepath, "w") as f:
-    # Use separators to strip whitespace completely
-    json.dump(data, f, separators=(",", ":"))
-    # json.dump(data, f, indent=1) # use if you need to understand how the structure is
-  print("Done.")
-  return filepath
-
-
-def parse_game_events(parser, match_start_tick, steamid_map):
-  event_names = [
-    "weapon_fire",
-    "player_death",
-    "round_start",
-    "round_end",
-    "bomb_planted",
-    # grenades
-    "hegrenade_detonate",
-    "flashbang_detonate",
-    "smokegrenade_detonate",
-    "decoy_detonate",
-    "inferno_startburn",
-    "inferno_expire",
-    "inferno_extinguish",
-  ]
-  events_df = parser.parse_events(event_names, other=["game_time", "team_num"])
-
-  def safe_map_sid(val):
-    if pd.isna(val):
-      return None
-    return steamid_map.get(str(val).split(".")[0])
+def parse_game_events(
+  events, match_start_tick, steamid_map, event_index=None, export=None
+):
+  events_df = events.items(GAME_EVENTS)
 
   processed_events = {}
   for event_name, df in events_df:
@@ -145,10 +185,10 @@ def parse_game_events(parser, match_start_tick, steamid_map):
     # Apply Rename
     df = df.rename(columns=rename_map)
 
-    # convert steamid to tiny ints
+    # convert steamid to tiny ints, -1 if missing or unknown
     for col in ["vic", "att", "ass", "id"]:
       if col in df.columns:
-        df[col] = df[col].apply(safe_map_sid)
+        df[col] = steamid_map.lookup(df[col])
 
     # keep columns that are wanted and discard rest
     existing_cols = [c for c in wanted_cols if c in df.columns]
@@ -164,25 +204,34 @@ def parse_game_events(parser, match_start_tick, steamid_map):
       elif col in ["wep", "winner", "reason", "site", "time"]:
         df[col] = df[col].fillna("").astype(str)
 
+    if event_index is not None:
+      # seeking relies on tick order, demoparser already hands them out sorted
+      df = df.sort_values("t", kind="stable")
+      event_index.add(event_name, df["t"].to_numpy())
+    if export is not None:
+      export.add_events(event_name, df)
     processed_events[event_name] = df.to_dict(orient="records")
 
   return processed_events
 
 
-def get_match_metadata(parser):
+def read_boundary_ticks(parser, start_tick, end_tick):
+  # scores and sides only need the first and the last tick, read both at once
+  props = ["player_steamid", "team_num", "team_rounds_total"]
+  return parser.parse_ticks(props, ticks=[start_tick, end_tick])
+
+
+def get_match_metadata(parser, events, demo_path=None):
   header = parser.parse_header()
   map_name = header.get("map_name", "unknown")
 
-  max_tick_df = parser.parse_ticks(["tick"])
-  end_tick = int(max_tick_df["tick"].max())
-
   start_tick = 0
   try:
-    match_start_df = parser.parse_event("begin_new_match")  # find warmup phase
+    match_start_df = events.get("begin_new_match")  # find warmup phase
     if not match_start_df.empty:
       start_tick = int(match_start_df["tick"].iloc[0])
     else:
-      round_start_df = parser.parse_event("round_start")  # actual round start
+      round_start_df = events.get("round_start")  # actual round start
       if not round_start_df.empty:
         start_tick = int(round_start_df["tick"].iloc[0])
   except Exception:
@@ -191,24 +240,47 @@ def get_match_metadata(parser):
   warmup_start_tick = -1
   warmup_end_tick = -1
   try:
-    warmup_start_df = parser.parse_event("warmup_period_start")
+    warmup_start_df = events.get("warmup_period_start")
     if not warmup_start_df.empty:
       warmup_start_tick = int(warmup_start_df["tick"].iloc[0])
 
-    warmup_end_df = parser.parse_event("warmup_period_end")
+    warmup_end_df = events.get("warmup_period_end")
     if not warmup_end_df.empty:
       # Use .iloc[-1] to get the last warmup end, in case it was restarted
       warmup_end_tick = int(warmup_end_df["tick"].iloc[-1])
   except Exception as e:
     print(f"Warning: Could not fetch warmup events: {e}")
 
+  # the file info frame has the tick count, which saves a pass over every tick
+  # just to take the max. it only counts if players exist on that tick
+  end_tick = read_playback_ticks(demo_path) if demo_path else None
+  df_boundary = None
+  if end_tick is not None:
+    try:
+      df_boundary = read_boundary_ticks(parser, start_tick, end_tick)
+      if not (df_boundary["tick"] == end_tick).any():
+        end_tick = None
+    except Exception as e:
+      print(f"Warning: Could not read ticks at the file info end tick: {e}")
+      end_tick = None
+
+  if end_tick is None:
+    max_tick_df = parser.parse_ticks(["tick"])
+    end_tick = int(max_tick_df["tick"].max())
+    df_boundary = None
+
   winner_team = 0  # 2 = T, 3 = CT
   score_t = 0
   score_ct = 0
+  df_players = None
 
   try:
+    if df_boundary is None:
+      df_boundary = read_boundary_ticks(parser, start_tick, end_tick)
+    df_players = df_boundary
+
     # Get score state at the final tick
-    df_score = parser.parse_ticks(["team_num", "team_rounds_total"], ticks=[end_tick])
+    df_score = df_boundary[df_boundary["tick"] == end_tick]
 
     t_data = df_score[df_score["team_num"] == 2]
     ct_data = df_score[df_score["team_num"] == 3]
@@ -229,12 +301,7 @@ def get_match_metadata(parser):
 
   if winner_team != 0:
     try:
-      # We grab player teams at START and END
-      # We filter for alive/connected players to ensure we get valid data
-      props = ["player_steamid", "team_num"]
-
-      # Fetch data for start and end
-      df_players = parser.parse_ticks(props, ticks=[start_tick, end_tick])
+      # We grab player teams at START and END, from the boundary read above
 
       # Pick a "Reference Player" (The first steamid found at the start)
       start_data = df_players[df_players["tick"] == start_tick]
@@ -282,54 +349,205 @@ def get_match_metadata(parser):
   )
 
 
-def process_ticks(parser, start_tick, end_tick):
-  ############### PLAYER PROCESSING
-  wanted_ticks = np.arange(start_tick, end_tick + 1, TICK_INTERVAL)
+# we need Name/Team for lookup, but won't save them in timeline
+IDENTITY_PROPS = ["player_steamid", "player_name", "team_num"]
+# names and teams only change on (re)connects and side swaps, so they are read
+# at one sampled tick every IDENTITY_SPACING ticks instead of on every tick
+IDENTITY_SPACING = 64 * 30
+TICK_PROPS = [
+  "player_steamid",
+  "health",
+  "X",
+  "Y",
+  "Z",
+  # "pitch",
+  "yaw",
+]
+# the tick frame is narrowed to these right after demoparser hands it over,
+# same widths as the binary timeline
+TICK_DTYPES = {
+  "tick": np.int32,
+  "sid": np.int16,
+  "hp": np.int16,
+  "x": np.float32,
+  "y": np.float32,
+  "z": np.float32,
+  "rot": np.int16,
+}
+
+
+def get_wanted_ticks(start_tick, end_tick, interval=TICK_INTERVAL):
+  wanted_ticks = np.arange(start_tick, end_tick + 1, interval)
   if wanted_ticks[-1] != end_tick:
     wanted_ticks = np.append(wanted_ticks, end_tick)
+  return wanted_ticks
+
+
+def split_tick_windows(wanted_ticks, window=None):
+  """Splits the sampled ticks into windows.
+
+  `window` is either a tick count or a list of boundary ticks (e.g. round starts).
+  None keeps the whole match in one window.
+  """
+  if not window:
+    return [wanted_ticks]
+  if isinstance(window, int):
+    bounds = np.arange(wanted_ticks[0], wanted_ticks[-1] + 1, window)[1:]
+  else:
+    bounds = np.asarray(window)
+  windows = np.split(wanted_ticks, np.searchsorted(wanted_ticks, bounds))
+  return [w for w in windows if len(w)]
+
 
-  # we need Name/Team for lookup, but won't save them in timeline
-  props = [
-    "player_steamid",
-    "player_name",
-    "team_num",
-    "is_alive",
-    "health",
-    "X",
-    "Y",
-    "Z",
-    # "pitch",
-    "yaw",
-  ]
-
-  print(f"Fetching {len(wanted_ticks)} ticks...")
-  df = parser.parse_ticks(props, ticks=list(wanted_ticks))
+def get_identity_ticks(wanted_ticks, interval=TICK_INTERVAL):
+  step = max(IDENTITY_SPACING // interval, 1)
+  identity_ticks = wanted_ticks[::step]
+  if identity_ticks[-1] != wanted_ticks[-1]:
+    identity_ticks = np.append(identity_ticks, wanted_ticks[-1])
+  return identity_ticks
 
+
+def build_player_lookup(player_info):
   # Map SteamID -> Name/Team
-  # this runs BEFORE we strip columns, so we can capture the names
-  player_lookup = {}
-  steamid_map = {}
+  # player_info holds the first known name/team per steamid, sorted by steamid,
+  # so the tiny id of a player is its position in the sorted steamid array
+  steamids, _ = to_steamid64(player_info["player_steamid"])
+  steamid_map = SteamIdMap(steamids)
 
-  if (
-    "player_steamid" in df.columns
-    and "player_name" in df.columns
-    and "team_num" in df.columns
+  player_lookup = {}
+  for current_id, (original_sid, name, team) in enumerate(
+    zip(steamids, player_info["player_name"], player_info["team_num"])
   ):
-    player_info = (
-      df.groupby("player_steamid").first()[["player_name", "team_num"]].reset_index()
-    )
-    current_id = 0
-    for _, row in player_info.iterrows():
-      original_sid = str(row["player_steamid"]).split(".")[0]
-
-      steamid_map[original_sid] = current_id
-      player_lookup[current_id] = {
-        "name": row["player_name"],
-        "team": int(row["team_num"]) if pd.notnull(row["team_num"]) else 0,
-        "sid": original_sid,
-      }
-      current_id += 1
+    player_lookup[current_id] = {
+      "name": name,
+      "team": int(team) if pd.notnull(team) else 0,
+      "sid": str(original_sid),
+    }
+
+  return player_lookup, steamid_map
+
+
+def add_late_players(parser, player_lookup, steamid_map):
+  """Names and teams of the players the identity ticks missed, e.g. one who
+  joined and left between two of them. The tick pass handed them ids, this is one
+  extra identity read at the first tick each of them showed up on."""
+  if not steamid_map.added:
+    return
+  steamids, ticks = zip(*steamid_map.added)
+  df = parser.parse_ticks(IDENTITY_PROPS, ticks=sorted(set(ticks)))
+  if len(df):
+    df = df[steamid_map.lookup(df["player_steamid"]) >= len(player_lookup)]
+  info = first_player_info(df).reset_index()
+  known, _ = to_steamid64(info["player_steamid"])
+  info.index = known
+
+  for steamid in steamids:
+    name, team = str(steamid), 0
+    if steamid in info.index:
+      name, team = info.loc[steamid, ["player_name", "team_num"]]
+    player_lookup[int(steamid_map.lookup([steamid])[0])] = {
+      "name": name,
+      "team": int(team) if pd.notnull(team) else 0,
+      "sid": str(steamid),
+    }
+
+
+def first_player_info(df):
+  if not all(c in df.columns for c in IDENTITY_PROPS):
+    return pd.DataFrame(columns=IDENTITY_PROPS)
+  return df.groupby("player_steamid").first()[["player_name", "team_num"]]
+
+
+HOLD_POLICY = {
+  "type": "held",
+  "position_tolerance": 0.1,  # units, per axis
+  "yaw_tolerance": 1,  # degrees
+  "max_held_samples": 64,  # a held sample is repeated at least this often
+  "decode": (
+    "a player listed in a tick's h keeps that tick's row on every following "
+    "sampled tick until its next row. dead players (hp 0) are held the same "
+    "way without being listed. with round segments every player has a row on "
+    "the first sampled tick of a round. with delta encoding decode the rows "
+    "first, a held row is the decoded row and a keyframe only resets the delta "
+    "state, it doesn't end a hold."
+  ),
+}
+
+
+def compact_player_rows(df, carry=None, hold=None, keep_at=None, until=None):
+  """Drops consecutive samples of a player who stays dead.
+
+  With a `hold` policy alive samples within its tolerances of the player's
+  previous sample go too. The kept sample such a run repeats gets held=1, held
+  runs are cut every max_held_samples. Dead and held runs are both cut at every
+  `keep_at` tick (the round starts), so from there every player has a row again.
+  `carry` holds every player's last sample of the previous window and is
+  updated in place so compaction carries across windows. Rows after `until`
+  are a peek into the next window, they only decide the held marks of the
+  last rows of this one and are not returned.
+  """
+  lead = None
+  if carry:
+    # the previous window's last samples go first, as the rows before this one
+    last = carry["last"]
+    lead = np.concatenate([np.ones(len(last), bool), np.zeros(len(df), bool)])
+    df = pd.concat([last.drop(columns="run_pos"), df], ignore_index=True)
+  df = df.sort_values(by=["sid", "tick"], kind="stable")
+  if lead is not None:
+    lead = lead[df.index.to_numpy()]
+  is_dead = df["hp"] <= 0
+  was_dead_prev = is_dead.groupby(df["sid"]).shift(1, fill_value=False)
+  same_block = np.ones(len(df), dtype=bool)
+  if keep_at is not None and len(keep_at):
+    block = pd.Series(np.searchsorted(np.sort(keep_at), df["tick"], "right"))
+    same_block = (block.diff() == 0).to_numpy()
+  drop = (is_dead & was_dead_prev).to_numpy() & same_block
+  run_pos = np.zeros(len(df), dtype=np.int64)
+
+  if hold is not None:
+    # a player's very first sample has no previous one and is kept
+    prev = df.groupby("sid")[["hp", "x", "y", "z", "rot"]].shift(1)
+    moved = (df[["x", "y", "z"]] - prev[["x", "y", "z"]]).abs().max(axis=1)
+    turned = ((df["rot"] - prev["rot"] + 180) % 360 - 180).abs()
+    same = (
+      ~is_dead
+      & (df["hp"] == prev["hp"])
+      & (moved <= hold["position_tolerance"])
+      & (turned <= hold["yaw_tolerance"])
+    ).to_numpy() & same_block
+    # position in the run of same samples, a carried row continues its old run
+    starts = np.flatnonzero(~same)
+    run = np.cumsum(~same) - 1
+    offset = np.zeros(len(df), dtype=np.int64)
+    if lead is not None:
+      offset[lead] = carry["last"]["run_pos"].to_numpy()[df.index[lead]]
+    run_pos = np.arange(len(df)) - starts[run] + offset[starts][run]
+    held_drop = same & (run_pos % hold["max_held_samples"] != 0)
+    drop = drop | held_drop
+    # held marks the row right before a dropped run, sids are sorted so the
+    # next row belongs to the same player whenever it was dropped
+    held = np.append(held_drop[1:], False) & ~drop
+    df = df.assign(held=held.astype(np.int8))
+
+  kept = ~drop
+  if until is not None:
+    current = (df["tick"] <= until).to_numpy()
+    kept &= current
+  else:
+    current = np.ones(len(df), dtype=bool)
+  if carry is not None:
+    last = df[current].assign(run_pos=run_pos[current])
+    last = last[~last["sid"].duplicated(keep="last")]
+    carry["last"] = last[[*TICK_DTYPES, "run_pos"]].reset_index(drop=True)
+  if lead is not None:
+    kept &= ~lead
+
+  df = df[kept]
+  # stable, so players stay in sid order within a tick whatever the window size
+  return df.sort_values(by=["tick"], kind="stable")
+
 
+def clean_tick_frame(df, steamid_map, carry=None, hold=None, keep_at=None, until=None):
   col_map = {
     "player_steamid": "sid",
     "health": "hp",
@@ -339,165 +557,248 @@ def process_ticks(parser, start_tick, end_tick):
     # "pitch": "p",
     "yaw": "rot",  # 'rot' for rotation
   }
-  df = df.rename(columns=col_map)
-
-  # map steamids to tiny ints
-  df["sid"] = df["sid"].apply(
-    lambda x: steamid_map.get(str(x).split(".")[0]) if pd.notnull(x) else None
-  )
+  # windows without a player can come back without any columns
+  if df.empty:
+    return pd.DataFrame({col: np.empty(0, dtype) for col, dtype in TICK_DTYPES.items()})
 
+  # map steamids to tiny ints, rows of unknown players can't be drawn
+  sids = steamid_map.lookup(df["player_steamid"])
+  keep = sids >= 0
   # df = df.dropna(subset=["x", "y", "z", "p", "rot", "hp"])
-  df = df.dropna(subset=["x", "y", "z", "rot", "hp"])
-
-  # rounding floats to make sure no crazy value (0.032193120310) happens
-  df["sid"] = df["sid"].astype(int)
-  df["hp"] = df["hp"].astype(int)
-  df["x"] = df["x"].astype(float).round(2)
-  df["y"] = df["y"].astype(float).round(2)
-  df["z"] = df["z"].astype(float).round(2)
-  # df["p"] = df["p"].round(0).astype(int)
-  df["rot"] = df["rot"].astype(int)
-
-  # rename columns to short keys
-
-  # keep ONLY these columns + tick
-  # we drop name, team, is_alive, and any other misc
-  # keep_cols = ["tick", "sid", "hp", "x", "y", "z", "p", "rot"]
-  keep_cols = ["tick", "sid", "hp", "x", "y", "z", "rot"]
-
-  # Filter to ensure we only have existing columns (avoids errors if a tick is empty)
-  existing_cols = [c for c in keep_cols if c in df.columns]
-  df = df[existing_cols]
+  for col in ["health", "X", "Y", "Z", "yaw"]:
+    keep &= df[col].notna().to_numpy()
+
+  # keep ONLY these columns + tick, in narrow dtypes
+  # we drop name and any other misc demoparser adds
+  columns = {"tick": df["tick"].to_numpy()[keep], "sid": sids[keep]}
+  for src, col in col_map.items():
+    if col != "sid":
+      columns[col] = df[src].to_numpy()[keep]
+  for col in ["x", "y", "z"]:
+    # rounding floats to make sure no crazy value (0.032193120310) happens
+    columns[col] = np.round(columns[col].astype(np.float64), 2)
+  df = pd.DataFrame(
+    {col: columns[col].astype(dtype) for col, dtype in TICK_DTYPES.items()}
+  )
 
   # dead player compact
-  df = df.sort_values(by=["sid", "tick"])
-  is_dead = df["hp"] <= 0
-  was_dead_prev = is_dead.groupby(df["sid"]).shift(1, fill_value=False)
-  df = df[~(is_dead & was_dead_prev)]
-  df = df.sort_values(by=["tick"])
+  return compact_player_rows(df, carry, hold, keep_at, until)
 
-  ################### GRENADE PROCESSING
-  g_grouped = None
+
+def load_grenades(parser, wanted_ticks):
+  # returns None unless the grenade frame was fully cleaned. throwers keep their
+  # raw "steamid", the window they land in maps it once every player has an id
   try:
     print("Fetching grenade flight paths")
     g_df = parser.parse_grenades()
 
-    if not g_df.empty:
-      g_rename = {
-        "X": "x",
-        "Y": "y",
-        "Z": "z",
-        "grenade_entity_id": "eid",
-        "steamid": "sid",
-        "grenade_type": "gtype",
-      }
-      g_df = g_df.rename(columns=g_rename)
-      g_df = g_df[g_df["tick"].isin(wanted_ticks)]
-
-      if "sid" in g_df.columns:
-        g_df["sid"] = g_df["sid"].apply(
-          lambda x: steamid_map.get(str(x).split(".")[0]) if pd.notnull(x) else -1
-        )
-      else:
-        g_df["sid"] = -1
-
-      # 1=HE, 2=Smoke, 3=Flash, 4=Decoy, 5=Molly/Incendiary
-      def map_grenade_class(name):
-        name = str(name).lower()
-        if "hegrenade" in name:
-          return 1
-        if "smoke" in name:
-          return 2
-        if "flash" in name:
-          return 3
-        if "decoy" in name:
-          return 4
-        if "molotov" in name:
-          return 5
-        if "incendiary" in name:
-          return 5
-        return 0
-
-      if "gtype" in g_df.columns:
-        g_df["wep"] = g_df["gtype"].apply(map_grenade_class)
-      else:
-        g_df["wep"] = 0
+    if g_df.empty:
+      return None
+
+    g_rename = {
+      "X": "x",
+      "Y": "y",
+      "Z": "z",
+      "grenade_entity_id": "eid",
+      "steamid": "sid",
+      "grenade_type": "gtype",
+    }
+    g_df = g_df.rename(columns=g_rename)
+    g_df = g_df[g_df["tick"].isin(wanted_ticks)]
+
+    if "sid" in g_df.columns:
+      g_df["steamid"] = g_df["sid"]
+    else:
+      g_df["steamid"] = None
+
+    # 1=HE, 2=Smoke, 3=Flash, 4=Decoy, 5=Molly/Incendiary
+    def map_grenade_class(name):
+      name = str(name).lower()
+      if "hegrenade" in name:
+        return 1
+      if "smoke" in name:
+        return 2
+      if "flash" in name:
+        return 3
+      if "decoy" in name:
+        return 4
+      if "molotov" in name:
+        return 5
+      if "incendiary" in name:
+        return 5
+      return 0
+
+    if "gtype" in g_df.columns:
+      g_df["wep"] = g_df["gtype"].apply(map_grenade_class)
+    else:
+      g_df["wep"] = 0
 
-      # for col in ["eid", "sid", "wep", "x", "y", "z"]:
-      #   if col not in g_df.columns:
-      #     g_df[col] = 0 if col in ["eid", "wep"] else (-1 if col == "sid" else 0.0)
+    # for col in ["eid", "sid", "wep", "x", "y", "z"]:
+    #   if col not in g_df.columns:
+    #     g_df[col] = 0 if col in ["eid", "wep"] else (-1 if col == "sid" else 0.0)
 
-      # g_df = g_df.dropna(subset=["x", "y", "z"])
+    # g_df = g_df.dropna(subset=["x", "y", "z"])
 
-      # actually round coordinates
-      g_df["eid"] = g_df["eid"].fillna(0).astype(int)
-      g_df["sid"] = g_df["sid"].fillna(-1).astype(int)
-      g_df["wep"] = g_df["wep"].fillna(0).astype(int)
-      g_df["x"] = g_df["x"].astype(float).round(2)
-      g_df["y"] = g_df["y"].astype(float).round(2)
-      g_df["z"] = g_df["z"].astype(float).round(2)
+    # actually round coordinates
+    g_df["eid"] = g_df["eid"].fillna(0).astype(np.int32)
+    g_df["wep"] = g_df["wep"].fillna(0).astype(np.int8)
+    g_df["x"] = g_df["x"].astype(float).round(2).astype(np.float32)
+    g_df["y"] = g_df["y"].astype(float).round(2).astype(np.float32)
+    g_df["z"] = g_df["z"].astype(float).round(2).astype(np.float32)
 
-      g_df = g_df.dropna(subset=["x", "y"])
-      g_grouped = g_df.groupby("tick")
+    g_df = g_df.dropna(subset=["x", "y"])
+    return g_df[["tick", "eid", "steamid", "wep", "x", "y", "z"]]
   except Exception as e:
     print(f"Error: Failed to parse grenade paths: {e}")
-
-  # TIMELINE
-  # convert to timeline list
-  timeline = []
-  grouped = df.groupby("tick")
-
-  for tick, group in grouped:
-    # Drop 'tick' from the inner records
-    players_data = [
-      [
-        int(sid),
-        int(hp),
-        round(float(x), 2),
-        round(float(y), 2),
-        round(float(z), 2),
-        int(rot),
-      ]
-      for sid, hp, x, y, z, rot in zip(
-        group["sid"], group["hp"], group["x"], group["y"], group["z"], group["rot"]
+    return None
+
+
+def iter_windowed_timeline(
+  parser,
+  windows,
+  steamid_map,
+  grenades,
+  binary_path=None,
+  encoding=None,
+  keyframe_at=None,
+  sampler=None,
+  heatmaps=None,
+  hold=None,
+  export=None,
+):
+  # every window is fetched, compacted and joined with its grenades on its own,
+  # so only one window of ticks is alive at a time
+  binary_writer = None
+  if binary_path:
+    binary_writer = BinaryTimelineWriter(binary_path, held=hold is not None)
+  carry = {} if len(windows) > 1 else None
+  props = TICK_PROPS + HEATMAP_TICK_PROPS if heatmaps else TICK_PROPS
+
+  # a failed parse drops the part files instead of stitching them
+  with binary_writer or nullcontext():
+    for i, window_ticks in enumerate(windows):
+      if len(windows) > 1:
+        print(f"Fetching ticks {window_ticks[0]}-{window_ticks[-1]}...")
+      fetch_ticks = list(window_ticks)
+      # a held mark depends on the player's next sample, peek at the next window
+      if hold is not None and i + 1 < len(windows):
+        fetch_ticks.append(windows[i + 1][0])
+      df = parser.parse_ticks(props, ticks=fetch_ticks)
+      # players the identity ticks missed get their ids here, before any of
+      # their rows is cleaned, see add_late_players
+      if len(df):
+        steamid_map.add(df["player_steamid"], df["tick"])
+      # before cleaning and sampling, every sampled tick counts the same
+      if heatmaps is not None:
+        heatmaps.add_ticks(df[df["tick"] <= window_ticks[-1]] if len(df) else df)
+      df = clean_tick_frame(
+        df, steamid_map, carry, hold, keyframe_at, until=window_ticks[-1]
       )
-    ]
+      if sampler is not None:
+        df = sampler.sample(
+          df,
+          steamid_map,
+          lambda ticks: clean_tick_frame(
+            parser.parse_ticks(TICK_PROPS, ticks=ticks), steamid_map
+          ),
+        )
 
-    tick_obj = {"t": int(tick), "p": players_data}
-    # tick to t
-    if g_grouped is not None and tick in g_grouped.groups:
-      g_data = g_grouped.get_group(tick).drop(columns=["tick"])
-      tick_obj["g"] = [
-        [
-          int(eid),
-          int(sid),
-          int(wep),
-          round(float(x), 2),
-          round(float(y), 2),
-          round(float(z), 2),
+      g_window = None
+      if grenades is not None:
+        g_window = grenades[
+          (grenades["tick"] >= window_ticks[0]) & (grenades["tick"] <= window_ticks[-1])
         ]
-        for eid, sid, wep, x, y, z in zip(
-          g_data["eid"],
-          g_data["sid"],
-          g_data["wep"],
-          g_data["x"],
-          g_data["y"],
-          g_data["z"],
-        )
-      ]
+        sids = steamid_map.lookup(g_window["steamid"]).astype(np.int16)
+        g_window = g_window.assign(steamid=sids).rename(columns={"steamid": "sid"})
 
-    timeline.append(tick_obj)
+      if binary_writer:
+        binary_writer.append(df, g_window)
+      if export is not None:
+        export.add_ticks(df, g_window)
+      yield from iter_timeline(df, g_window, encoding, keyframe_at)
+
+
+def get_tick_window(events, start_tick):
+  if TICK_WINDOW == "round":
+    round_start_df = events.get("round_start")
+    if round_start_df.empty:
+      return None
+    return sorted(t for t in round_start_df["tick"].tolist() if t > start_tick)
+  if TICK_WINDOW:
+    return int(TICK_WINDOW)
+  return None
+
+
+def process_ticks(
+  parser,
+  start_tick,
+  end_tick,
+  binary_path=None,
+  window=None,
+  encoding=None,
+  keyframe_at=None,
+  sampler=None,
+  heatmaps=None,
+  hold=None,
+  export=None,
+):
+  ############### PLAYER PROCESSING
+  interval = sampler.policy["base_interval"] if sampler else TICK_INTERVAL
+  wanted_ticks = get_wanted_ticks(start_tick, end_tick, interval)
+  windows = split_tick_windows(wanted_ticks, window)
+
+  if len(windows) == 1:
+    print(f"Fetching {len(wanted_ticks)} ticks...")
+  else:
+    print(f"Fetching {len(wanted_ticks)} ticks in {len(windows)} windows...")
+
+  # ids are handed out in steamid order over the whole match, so the identity
+  # columns get their own narrow read before any window is written
+  identity_ticks = get_identity_ticks(wanted_ticks, interval)
+  player_info = first_player_info(
+    parser.parse_ticks(IDENTITY_PROPS, ticks=list(identity_ticks))
+  )
+
+  player_lookup, steamid_map = build_player_lookup(player_info.reset_index())
+
+  ################### GRENADE PROCESSING
+  grenades = load_grenades(parser, wanted_ticks)
+
+  # TIMELINE
+  # handed out lazily so the caller can stream it without holding the full list
+  timeline = iter_windowed_timeline(
+    parser,
+    windows,
+    steamid_map,
+    grenades,
+    binary_path,
+    encoding,
+    keyframe_at,
+    sampler,
+    heatmaps,
+    hold,
+    export,
+  )
 
   return timeline, player_lookup, steamid_map
 
 
-def calculate_advanced_stats(parser, start_tick, end_tick):
+def get_round_starts(events, start_tick):
+  # A round spans from its start_tick to the NEXT round's start_tick (or match end)
+  round_start_df = events.get("round_start")
+  if round_start_df.empty:
+    return []
+  return sorted(t for t in round_start_df["tick"].tolist() if t >= start_tick)
+
+
+def calculate_advanced_stats(parser, events, start_tick, end_tick):
   # Notice we no longer need 'total_rounds_played'
-  events_df = parser.parse_events(["player_hurt", "player_death", "round_start"])
+  events_df = events.items(STATS_EVENTS)
 
   hurt_df = pd.DataFrame()
   death_df = pd.DataFrame()
   round_start_df = pd.DataFrame()
+  round_end_df = pd.DataFrame()
 
   for event_name, df in events_df:
     if df is None or df.empty:
@@ -508,6 +809,8 @@ def calculate_advanced_stats(parser, start_tick, end_tick):
       death_df = df
     elif event_name == "round_start":
       round_start_df = df
+    elif event_name == "round_end":
+      round_end_df = df[df["tick"] >= start_tick]
 
   if hurt_df.empty or death_df.empty or round_start_df.empty:
     return {}
@@ -519,232 +822,131 @@ def calculate_advanced_stats(parser, start_tick, end_tick):
   death_df = death_df[
     (death_df["tick"] >= start_tick) & (death_df["tick"] <= end_tick)
   ].copy()
-  round_start_df = round_start_df[round_start_df["tick"] >= start_tick].copy()
 
-  # 2. BUILD PROPER ROUND INTERVALS
-  # A round spans from its start_tick to the NEXT round's start_tick (or match end)
-  round_start_df = round_start_df.sort_values("tick")
-  start_ticks = round_start_df["tick"].tolist()
+  # 2. ROUND BOUNDARIES
+  start_ticks = get_round_starts(events, start_tick)
 
   if not start_ticks:
     return {}
 
-  round_intervals = []
-  for i in range(len(start_ticks)):
-    current_start = start_ticks[i]
-    next_start = start_ticks[i + 1] if i + 1 < len(start_ticks) else end_tick + 1
-    round_intervals.append((current_start, next_start))
-
-  # Map every event to a specific round index
-  def get_round_idx(tick):
-    for idx, (start, end) in enumerate(round_intervals):
-      if start <= tick < end:
-        return idx
-    return -1
-
-  hurt_df["round"] = hurt_df["tick"].apply(get_round_idx)
-  death_df["round"] = death_df["tick"].apply(get_round_idx)
-
-  # Drop orphaned events that somehow didn't fit into a valid match round
-  hurt_df = hurt_df[hurt_df["round"] != -1]
-  death_df = death_df[death_df["round"] != -1]
-
-  stats_per_player = {}
-
-  def init_player(name):
-    if pd.notna(name) and name not in stats_per_player:
-      stats_per_player[name] = {
-        "rounds_played": 0,
-        "kills": 0,
-        "assists": 0,
-        "deaths": 0,
-        "hs_kills": 0,
-        "damage": 0,
-        "util_damage": 0,
-        "first_kills": 0,
-        "first_deaths": 0,
-        "kast_rounds": 0,
-        "3k": 0,
-        "4k": 0,
-        "5k": 0,
-      }
-
+  # team alignments at the exact start of every round
   start_states = parser.parse_ticks(["player_name", "team_num"], ticks=start_ticks)
 
-  # 3. PROCESS EACH ROUND INDEPENDENTLY
-  for r_idx in range(len(round_intervals)):
-    r_hurts = hurt_df[hurt_df["round"] == r_idx]
-    r_deaths = death_df[death_df["round"] == r_idx].sort_values("tick")
-    r_start_tick = start_ticks[r_idx]
-
-    round_players = set()
-    player_teams = {}
-
-    # Get team alignments at the exact start of the round
-    if not start_states.empty:
-      r_state = start_states[start_states["tick"] == r_start_tick]
-      for _, row in r_state.iterrows():
-        pname = row.get("player_name")
-        team = row.get("team_num")
-        if pd.notna(pname):
-          round_players.add(pname)
-          if pd.notna(team):
-            player_teams[pname] = team
-
-    # Add anyone who dealt damage or died, in case they reconnected mid-round
-    active_in_round = (
-      set(r_hurts["user_name"].dropna())
-      .union(set(r_hurts["attacker_name"].dropna()))
-      .union(set(r_deaths["user_name"].dropna()))
-    )
-    round_players.update(active_in_round)
-
-    # --- First Kills / Deaths ---
-    if not r_deaths.empty:
-      for _, fk_event in r_deaths.iterrows():
-        att_fk = fk_event.get("attacker_name")
-        vic_fd = fk_event.get("user_name")
-
-        att_team = player_teams.get(att_fk, "att_unknown")
-        vic_team = player_teams.get(vic_fd, "vic_unknown")
-
-        if (
-          pd.notna(att_fk)
-          and pd.notna(vic_fd)
-          and att_fk != vic_fd
-          and att_team != vic_team
-        ):
-          init_player(att_fk)
-          stats_per_player[att_fk]["first_kills"] += 1
-          init_player(vic_fd)
-          stats_per_player[vic_fd]["first_deaths"] += 1
-          break
-
-    round_kast_achieved = set()
-    round_kill_tally = {}
-
-    # --- Deaths, Kills, Assists, Trades ---
-    for _, death in r_deaths.iterrows():
-      vic = death.get("user_name")
-      att = death.get("attacker_name")
-      ass = death.get("assister_name")
-      hs = death.get("headshot")
-      tick = int(death.get("tick"))
-
-      vic_team = player_teams.get(vic, "vic_unknown")
-      att_team = player_teams.get(att, "att_unknown")
-      ass_team = player_teams.get(ass, "ass_unknown")
-
-      # KILLS
-      if pd.notna(att) and att != vic and att_team != vic_team:
-        init_player(att)
-        stats_per_player[att]["kills"] += 1
-        if hs:
-          stats_per_player[att]["hs_kills"] += 1
-        round_kast_achieved.add(att)
-
-        round_kill_tally[att] = round_kill_tally.get(att, 0) + 1
-
-      # ASSISTS
-      if pd.notna(ass) and ass_team != vic_team:
-        init_player(ass)
-        stats_per_player[ass]["assists"] += 1
-        round_kast_achieved.add(ass)
-
-      # DEATHS & TRADES
-      if pd.notna(vic):
-        init_player(vic)
-        stats_per_player[vic]["deaths"] += 1
-
-        # Trade check (Killer is avenged within ~5 seconds)
-        killer_death = r_deaths[
-          (r_deaths["user_name"] == att)
-          & (r_deaths["tick"] > tick)
-          & (r_deaths["tick"] <= tick + 320)
-        ]
-        if not killer_death.empty:
-          round_kast_achieved.add(vic)
-
-    # --- Multi-kills ---
-    for player_name, round_kills in round_kill_tally.items():
-      if round_kills == 3:
-        stats_per_player[player_name]["3k"] += 1
-      elif round_kills == 4:
-        stats_per_player[player_name]["4k"] += 1
-      elif round_kills >= 5:
-        stats_per_player[player_name]["5k"] += 1
-
-    # --- Damage ---
-    # Sort hurts chronologically so damage applies in the correct order
-    r_hurts = r_hurts.sort_values("tick")
-
-    # Every player enters the round with a strict maximum of 100 HP to "give"
-    victim_health_pool = {p: 100 for p in round_players}
-
-    for _, hurt in r_hurts.iterrows():
-      att = hurt.get("attacker_name")
-      vic = hurt.get("user_name")
+  # 3. AGGREGATE ALL ROUNDS AT ONCE
+  return compute_player_stats(
+    hurt_df, death_df, start_ticks, start_states, round_end_df=round_end_df
+  )
 
-      try:
-        dmg = int(hurt.get("dmg_health", 0))
-      except (ValueError, TypeError):
-        dmg = 0
 
-      wep = hurt.get("weapon")
+def get_winner_name(winner):
+  if winner == 2:
+    return "2"  # T
+  if winner == 3:
+    return "3"  # CT
+  return "D"
 
-      if pd.isna(vic):
-        continue
 
-      vic_team = player_teams.get(vic, "vic_unknown")
-      att_team = player_teams.get(att, "att_unknown")
+def emit_meta(absolute_file_path, metadata, interval, meta_only=False):
+  start_tick, end_tick, map_name, winner, t_score, ct_score, winning_start_side = (
+    metadata[:7]
+  )
+  winner_name = get_winner_name(winner)
 
-      # 1. Cap the damage at whatever health the victim actually has left
-      available_hp = victim_health_pool.get(vic, 100)
-      actual_dmg = min(dmg, available_hp)
+  event = {
+    "type": "parse_meta_complete",
+    "payload": {
+      "outcome": winner_name,
+      "file_path": absolute_file_path,
+      "length_ticks": end_tick - start_tick,
+      # fetch time server already has
+      # match code server already has
+      "map": map_name,
+      "tick_interval": interval,
+      "score_t": t_score,
+      "score_ct": ct_score,
+    },
+  }
+  if meta_only:
+    # the replay json at file_path is written by a later full parse
+    event["payload"]["meta_only"] = True
 
-      # 2. Subtract this damage from the victim's pool so overkill/corpse-hitting is nullified
-      victim_health_pool[vic] = available_hp - actual_dmg
+  print(f"Final Score: T {t_score} - {ct_score} CT")
+  print(f"Winner Faction: {winner_name}")
+  print(f"Actual Team Winner: {winning_start_side}")  # e.g. "TeamStartedCT"
 
-      # 3. Only award damage if it's a valid enemy attacker
-      if pd.notna(att) and att != vic and att_team != vic_team and actual_dmg > 0:
-        init_player(att)
-        stats_per_player[att]["damage"] += actual_dmg
-        if str(wep) in ["hegrenade", "inferno", "molotov", "incgrenade"]:
-          stats_per_player[att]["util_damage"] += actual_dmg
+  print(f"DATA_OUTPUT:{json.dumps(event)}", flush=True)
+  return event
 
-    # --- Rounds Played & Survived (KAST) ---
-    r_death_names = set(r_deaths["user_name"].dropna())
 
-    for p in round_players:
-      init_player(p)
-      stats_per_player[p]["rounds_played"] += 1
+def parse_meta_only(demo_path):
+  """Only the parse_meta_complete event: header, a few events and two ticks.
 
-      if p not in r_death_names:
-        round_kast_achieved.add(p)
+  The demo is kept, the full parse still needs it.
+  """
+  absolute_file_path = get_absolute_path(f"{os.path.basename(demo_path)}.json")
+  parser = CountingParser(DemoParser(demo_path))
+  events = EventStore(parser, META_EVENTS, EVENT_PROPS)
 
-      if p in round_kast_achieved:
-        stats_per_player[p]["kast_rounds"] += 1
+  print("Parsing Metadata...")
+  metadata = get_match_metadata(parser, events, demo_path)
+  emit_meta(absolute_file_path, metadata, TICK_INTERVAL, meta_only=True)
 
-  # Final Percentage Math
-  for name, stats in stats_per_player.items():
-    rp = max(stats["rounds_played"], 1)
-    kills = max(stats["kills"], 1)
+  print(f"demoparser2 passes: {parser.total_passes} {parser.passes}")
+  return absolute_file_path
 
-    stats["kast_pct"] = round((stats["kast_rounds"] / rp) * 100, 1)
-    stats["adr"] = round(stats["damage"] / rp, 1)
-    stats["hs_pct"] = round((stats["hs_kills"] / kills) * 100, 1)
-    stats["util_adr"] = round(stats["util_damage"] / rp, 1)
 
-  return stats_per_player
+def get_output_config():
+  # everything that changes what a parse writes, TICK_WINDOW only changes how
+  return {
+    "interval": TICK_INTERVAL,
+    "binary_timeline": BINARY_TIMELINE,
+    "encoding": POSITION_ENCODING,
+    "round_segments": ROUND_SEGMENTS,
+    "sampling": SAMPLING,
+    "heatmaps": HEATMAPS,
+    "event_index": EVENT_INDEX,
+    "compaction": COMPACTION,
+    # a hit skips the export, the parse that stored the entry did it
+    "parquet": bool(PARQUET_DIR),
+  }
 
 
-def main():
-  demo_path = get_demo_path()
+def parse_demo(demo_path, keep_demo=False):
+  # interpolating between adaptive samples and holding a row until the next one
+  # are two different readings of the same gap
+  if COMPACTION == "held" and SAMPLING == "adaptive":
+    raise ValueError(
+      "PARSER_COMPACTION=held can't be used with PARSER_SAMPLING=adaptive"
+    )
   base_filename = os.path.basename(demo_path)
   absolute_file_path = get_absolute_path(f"{base_filename}.json")
-  parser = DemoParser(demo_path)
+
+  cache = cache_key = demo_hash = None
+  if PARSE_CACHE_DIR:
+    cache = ParseCache(PARSE_CACHE_DIR, get_output_config())
+    demo_hash = hash_demo(demo_path)
+    cache_key = cache.key(demo_path, demo_hash)
+    meta_event = cache.restore(cache_key, absolute_file_path)
+    if meta_event is not None:
+      print(f"DATA_OUTPUT:{json.dumps(meta_event)}", flush=True)
+      if not keep_demo:
+        os.remove(demo_path)
+      return absolute_file_path
+
+  parser = CountingParser(DemoParser(demo_path))
+  # every event any stage needs is decoded in one pass, on first use
+  # replay events go first so the "events" block keeps its key order
+  # death positions for the heatmaps come with the same events pass
+  player_props = HEATMAP_EVENT_PLAYER_PROPS if HEATMAPS else None
+  events = EventStore(
+    parser, GAME_EVENTS + STATS_EVENTS + META_EVENTS, EVENT_PROPS, player_props
+  )
+  profiler = ParseProfiler()
 
   print("Parsing Metadata...")
+  # the shared events pass runs here too, on the first events.get
+  with profiler.stage("metadata"):
+    metadata = get_match_metadata(parser, events, demo_path)
   (
     start_tick,
     end_tick,
@@ -755,41 +957,27 @@ def main():
     winning_start_side,
     warmup_start_tick,
     warmup_end_tick,
-  ) = get_match_metadata(parser)
-
-  winner_name = "D"
-  if winner == 2:
-    winner_name = "2"  # T
-  if winner == 3:
-    winner_name = "3"  # CT
+  ) = metadata
 
   duration = end_tick - start_tick
 
-  event = {
-    "type": "parse_meta_complete",
-    "payload": {
-      "outcome": winner_name,
-      "file_path": absolute_file_path,
-      "length_ticks": duration,
-      # fetch time server already has
-      # match code server already has
-      "map": map_name,
-      "tick_interval": TICK_INTERVAL,
-      "score_t": t_score,
-      "score_ct": ct_score,
-    },
-  }
-
-  print(f"Final Score: T {t_score} - {ct_score} CT")
-  print(f"Winner Faction: {winner_name}")
-  print(f"Actual Team Winner: {winning_start_side}")  # e.g. "TeamStartedCT"
+  # adaptive sampling thins the same grid and adds finer samples where it matters
+  sampler = None
+  interval = TICK_INTERVAL
+  if SAMPLING == "adaptive":
+    sampler = AdaptiveSampler(
+      events.get("player_death"), events.get("weapon_fire"), interval
+    )
 
-  print(f"DATA_OUTPUT:{json.dumps(event)}", flush=True)
+  meta_event = emit_meta(absolute_file_path, metadata, interval)
+  winner_name = meta_event["payload"]["outcome"]
+  # every file this parse writes, for the cache
+  outputs = [absolute_file_path]
 
   meta_payload = {
     "filename": base_filename,
     "map": map_name,
-    "interval": TICK_INTERVAL,
+    "interval": interval,
     "length_ticks": duration,
     "winner_team": winner,
     "winner_name": winner_name,
@@ -801,30 +989,137 @@ def main():
   }
 
   print("Calculating Advanced Stats (ADR, KAST, 1vX)...")
-  advanced_stats = calculate_advanced_stats(parser, start_tick, end_tick)
-
-  print("Processing Ticks & Events (this may take a while)...")
-  ticks_data, player_lookup, steamid_map = process_ticks(parser, start_tick, end_tick)
-  events_data = parse_game_events(parser, start_tick, steamid_map)
-
-  # Merge advanced stats into your player_lookup using the steamIDs
-  for tiny_id, p_info in player_lookup.items():
-    p_name = p_info["name"]
+  with profiler.stage("advanced_stats"):
+    advanced_stats = calculate_advanced_stats(parser, events, start_tick, end_tick)
+
+  binary_path = None
+  if BINARY_TIMELINE:
+    binary_path = get_binary_path(absolute_file_path)
+    outputs.append(binary_path)
+    meta_payload["timeline_bin"] = os.path.basename(binary_path)
+
+  if sampler is not None:
+    meta_payload["sampling"] = sampler.policy
+
+  heatmaps = None
+  if HEATMAPS:
+    heatmaps = HeatmapBuilder(interval)
+    outputs.append(get_heatmap_path(absolute_file_path))
+    meta_payload["heatmaps"] = os.path.basename(outputs[-1])
+
+  hold = None
+  if COMPACTION == "held":
+    hold = HOLD_POLICY
+    meta_payload["compaction"] = hold
+
+  encoding = None
+  if POSITION_ENCODING == "delta":
+    encoding = POSITION_ENCODING
+    meta_payload["encoding"] = delta_encoding_spec()
+
+  round_starts = None
+  segment_writer = nullcontext()
+  if ROUND_SEGMENTS:
+    round_starts = get_round_starts(events, start_tick)
+    segment_writer = RoundSegmentWriter(
+      absolute_file_path, round_starts, start_tick, end_tick, encoding, COMPACTION
+    )
+    outputs += [
+      get_segments_path(absolute_file_path),
+      get_index_path(absolute_file_path),
+    ]
+    meta_payload["rounds_index"] = os.path.basename(outputs[-1])
+
+  export = nullcontext()
+  if PARQUET_DIR:
+    match = os.path.splitext(base_filename)[0]
+    export = ParquetExport(PARQUET_DIR, map_name, match)
+
+  # Stream the replay (overwriting or creating a new file) section by section
+  # the on disk layout is one {"meta","timeline","players","events"} object, players
+  # go after the timeline so the ones the tick pass found are in there too
+  with (
+    ReplayWriter(absolute_file_path) as writer,
+    segment_writer as segments,
+    export as exporter,
+  ):
+    writer.write("meta", meta_payload)
+
+    print("Processing Ticks & Events (this may take a while)...")
+    # round starts are forced keyframes, so every round segment decodes on its own
+    with profiler.stage("players"):
+      ticks_data, player_lookup, steamid_map = process_ticks(
+        parser,
+        start_tick,
+        end_tick,
+        binary_path,
+        get_tick_window(events, start_tick),
+        encoding,
+        round_starts,
+        sampler,
+        heatmaps,
+        hold,
+        exporter,
+      )
+    ticks_data = profiler.counted(ticks_data, "timeline_entries")
+    if segments:
+      ticks_data = segments.tee_timeline(ticks_data)
+
+    # the timeline is streamed, fetching and cleaning the ticks happens in here
+    with profiler.stage("timeline"):
+      writer.write_list("timeline", ticks_data)
+    with profiler.stage("late_players"):
+      add_late_players(parser, player_lookup, steamid_map)
+
+    # Merge advanced stats into your player_lookup using the steamIDs
+    for tiny_id, p_info in player_lookup.items():
+      p_name = p_info["name"]
+
+      if p_name in advanced_stats:
+        p_info["advanced_stats"] = advanced_stats[p_name]
+      else:
+        print(f"Warning: No advanced stats found for {p_name}")
 
-    if p_name in advanced_stats:
-      p_info["advanced_stats"] = advanced_stats[p_name]
-    else:
-      print(f"Warning: No advanced stats found for {p_name}")
+    writer.write("players", player_lookup)
+    if exporter:
+      exporter.add_players(player_lookup)
 
-  replay_json = {
-    "meta": meta_payload,
-    "players": player_lookup,
-    "timeline": ticks_data,
-    "events": events_data,
-  }
+    with profiler.stage("events"):
+      event_index = None
+      if EVENT_INDEX:
+        event_index = EventIndex(
+          start_tick, end_tick, interval, get_round_starts(events, start_tick)
+        )
+      events_data = parse_game_events(
+        events, start_tick, steamid_map, event_index, exporter
+      )
+      writer.write("events", events_data)
+      if event_index is not None:
+        writer.write("event_index", event_index.to_dict())
+      if segments:
+        segments.write_events(events_data)
+
+  if heatmaps is not None:
+    heatmaps.add_deaths(events.get("player_death"), start_tick, end_tick)
+    heatmaps.save(absolute_file_path)
+
+  print(f"demoparser2 passes: {parser.total_passes} {parser.passes}")
+
+  profiler.count("players", len(player_lookup))
+  profile = profiler.event(
+    file_path=absolute_file_path,
+    demo=base_filename,
+    replay_bytes=os.path.getsize(absolute_file_path),
+    passes=parser.passes,
+    rows=parser.rows,
+    events={name: len(records) for name, records in events_data.items()},
+  )
+  print(f"DATA_OUTPUT:{json.dumps(profile)}", flush=True)
 
-  # Save the full replay (overwriting or creating a new file)
-  save_json(replay_json, absolute_file_path)
+  if cache is not None:
+    cache.store(
+      cache_key, demo_path, demo_hash, absolute_file_path, meta_event, outputs
+    )
 
   # delete meta file
   # meta_path = os.path.join(OUTPUT_FOLDER, f"{base_filename}_meta.json")
@@ -832,7 +1127,27 @@ def main():
   #     os.remove(meta_path)
 
   # Cleanup demo file
-  os.remove(demo_path)
+  if not keep_demo:
+    os.remove(demo_path)
+  return absolute_file_path
+
+
+def main():
+  if len(sys.argv) > 1 and sys.argv[1] == "--batch":
+    # imported here, batch imports this module for its workers
+    from batch import main as batch_main
+
+    batch_main(sys.argv[2:])
+    return
+  if len(sys.argv) > 1 and sys.argv[1] == "--worker":
+    from worker import run_worker
+
+    run_worker(parse_demo)
+    return
+  if len(sys.argv) > 1 and sys.argv[1] == "--meta-only":
+    parse_meta_only(get_demo_path(2))
+    return
+  parse_demo(get_demo_path())
 
 
 if __name__ == "__main__":
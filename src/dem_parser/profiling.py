@@ -0,0 +1,72 @@
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+  import resource
+except ImportError:  # windows
+  resource = None
+
+
+def peak_rss_mb():
+  """Peak resident set size of this process so far, None where it can't be read."""
+  if resource is None:
+    return None
+  peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  # linux reports kilobytes, macos bytes
+  if sys.platform == "darwin":
+    peak /= 1024
+  return round(peak / 1024, 1)
+
+
+class ParseProfiler:
+  """Wall time, cpu time and peak rss per parse stage plus free form row counts.
+
+  Peak rss is the high water mark of the whole process, so in a warm worker it
+  includes earlier jobs. It still shows which stage first pushed it up.
+  """
+
+  def __init__(self):
+    self.stages = []
+    self.counts = {}
+    self._wall = time.perf_counter()
+    self._cpu = time.process_time()
+
+  @contextmanager
+  def stage(self, name):
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    try:
+      yield
+    finally:
+      self.stages.append(
+        {
+          "stage": name,
+          "wall_s": round(time.perf_counter() - wall, 3),
+          "cpu_s": round(time.process_time() - cpu, 3),
+          "peak_rss_mb": peak_rss_mb(),
+        }
+      )
+
+  def count(self, name, n):
+    self.counts[name] = self.counts.get(name, 0) + int(n)
+
+  def counted(self, items, name):
+    """Passes a stream through, counting its items under `name`."""
+    self.counts.setdefault(name, 0)
+    for item in items:
+      self.counts[name] += 1
+      yield item
+
+  def event(self, **extra):
+    return {
+      "type": "parse_profile",
+      "payload": {
+        **extra,
+        "wall_s": round(time.perf_counter() - self._wall, 3),
+        "cpu_s": round(time.process_time() - self._cpu, 3),
+        "peak_rss_mb": peak_rss_mb(),
+        "stages": self.stages,
+        "counts": self.counts,
+      },
+    }
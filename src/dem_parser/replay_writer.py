@@ -0,0 +1,84 @@
+import json
+import os
+
+# timeline entries are encoded and written this many at a time
+CHUNK_SIZE = 512
+
+
+def _dumps(data):
+  # Use separators to strip whitespace completely
+  return json.dumps(data, separators=(",", ":"))
+
+
+class ReplayWriter:
+  """Writes the replay json one top level key at a time.
+
+  The file ends up byte for byte what json.dump(replay_json) would have written,
+  but the timeline is streamed in chunks so the full replay dict never exists.
+  Everything goes to a .tmp file first and is moved into place on close, so a
+  crashed parse never leaves half a replay behind.
+  """
+
+  def __init__(self, filepath):
+    self.filepath = filepath
+    self.tmp_path = f"{filepath}.tmp"
+    self.keys_written = 0
+
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    print(f"Saving to {filepath}...")
+    self.f = open(self.tmp_path, "w")
+    self.f.write("{")
+
+  def _write_key(self, key):
+    if self.keys_written:
+      self.f.write(",")
+    self.f.write(f"{_dumps(key)}:")
+    self.keys_written += 1
+
+  def write(self, key, value):
+    self._write_key(key)
+    self.f.write(_dumps(value))
+
+  def write_list(self, key, items):
+    """Streams any iterable as a json list, returns how many items were written."""
+    self._write_key(key)
+    self.f.write("[")
+    count = 0
+    chunk = []
+    for item in items:
+      chunk.append(_dumps(item))
+      if len(chunk) >= CHUNK_SIZE:
+        self._write_chunk(chunk, count)
+        count += len(chunk)
+        chunk = []
+    if chunk:
+      self._write_chunk(chunk, count)
+      count += len(chunk)
+    self.f.write("]")
+    return count
+
+  def _write_chunk(self, chunk, count):
+    if count:
+      self.f.write(",")
+    self.f.write(",".join(chunk))
+
+  def close(self):
+    self.f.write("}")
+    self.f.close()
+    os.replace(self.tmp_path, self.filepath)
+    print("Done.")
+    return self.filepath
+
+  def abort(self):
+    self.f.close()
+    if os.path.exists(self.tmp_path):
+      os.remove(self.tmp_path)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, exc_type, exc, tb):
+    if exc_type is None:
+      self.close()
+    else:
+      self.abort()
@@ -0,0 +1,139 @@
+import json
+import os
+import numpy as np
+
+# Layout:
+#   <base>.rounds.jsonl       one json value per line, the timeline list of every
+#                             round followed by the events object of every round
+#   <base>.rounds.index.json  {"encoding", "compaction", "rounds": [{"round",
+#                             "start_tick", "end_tick", "timeline": [offset, length],
+#                             "events": [offset, length]}]}
+#
+# offsets are byte offsets into the .jsonl file, a slice is exactly one json value
+INDEX_VERSION = 1
+
+
+def get_segments_path(json_path):
+  return os.path.splitext(json_path)[0] + ".rounds.jsonl"
+
+
+def get_index_path(json_path):
+  return os.path.splitext(json_path)[0] + ".rounds.index.json"
+
+
+def _dumps(data):
+  return json.dumps(data, separators=(",", ":"))
+
+
+class RoundSegmentWriter:
+  """Writes the timeline and events of a replay split per round, next to the replay json.
+
+  A round spans from its round_start tick up to the next one. Anything before
+  the first round start belongs to round 1, anything after the last to the last.
+  Only one round of timeline entries is held at a time.
+  """
+
+  def __init__(
+    self, json_path, round_starts, start_tick, end_tick, encoding=None, compaction=None
+  ):
+    self.segments_path = get_segments_path(json_path)
+    self.index_path = get_index_path(json_path)
+    self.round_starts = np.asarray(sorted(round_starts), dtype=np.int64)
+    self.encoding = encoding
+    self.compaction = compaction
+
+    starts = self.round_starts.tolist() or [start_tick]
+    starts[0] = min(starts[0], start_tick)
+    ends = [t - 1 for t in starts[1:]] + [max(end_tick, starts[-1])]
+    self.rounds = [
+      {"round": i + 1, "start_tick": int(s), "end_tick": int(e)}
+      for i, (s, e) in enumerate(zip(starts, ends))
+    ]
+
+    os.makedirs(os.path.dirname(self.segments_path), exist_ok=True)
+    self.f = open(f"{self.segments_path}.tmp", "wb")
+    self.timeline_rounds = 0
+
+  def round_of(self, ticks):
+    """Round index (0 based) of every tick."""
+    idx = np.searchsorted(self.round_starts, ticks, side="right") - 1
+    return np.clip(idx, 0, len(self.rounds) - 1)
+
+  def _write_piece(self, data):
+    offset = self.f.tell()
+    self.f.write(_dumps(data).encode("utf-8"))
+    length = self.f.tell() - offset
+    self.f.write(b"\n")
+    return [offset, length]
+
+  def _flush_timeline(self, upto, entries):
+    # rounds without a sampled tick still get an empty list
+    while self.timeline_rounds < upto:
+      self.rounds[self.timeline_rounds]["timeline"] = self._write_piece([])
+      self.timeline_rounds += 1
+    self.rounds[upto]["timeline"] = self._write_piece(entries)
+    self.timeline_rounds = upto + 1
+
+  def tee_timeline(self, timeline):
+    """Passes every timeline entry through while writing the per round segments."""
+    current = None
+    entries = []
+    for tick_obj in timeline:
+      r = int(self.round_of(tick_obj["t"]))
+      if r != current:
+        if current is not None:
+          self._flush_timeline(current, entries)
+        current, entries = r, []
+      entries.append(tick_obj)
+      yield tick_obj
+    if current is not None:
+      self._flush_timeline(current, entries)
+
+  def write_events(self, events_data):
+    """`events_data` is the {"event_name": [records]} block of the replay."""
+    per_round = [{} for _ in self.rounds]
+    for event_name, records in events_data.items():
+      rounds = self.round_of([r["t"] for r in records]).tolist() if records else []
+      for r, record in zip(rounds, records):
+        per_round[r].setdefault(event_name, []).append(record)
+    for r, events in enumerate(per_round):
+      self.rounds[r]["events"] = self._write_piece(events)
+
+  def close(self):
+    while self.timeline_rounds < len(self.rounds):
+      self.rounds[self.timeline_rounds]["timeline"] = self._write_piece([])
+      self.timeline_rounds += 1
+    for round_info in self.rounds:
+      if "events" not in round_info:
+        round_info["events"] = self._write_piece({})
+    self.f.close()
+
+    index = {
+      "version": INDEX_VERSION,
+      "segments": os.path.basename(self.segments_path),
+      "encoding": self.encoding,
+      "compaction": self.compaction,
+      "rounds": self.rounds,
+    }
+    with open(f"{self.index_path}.tmp", "w") as f:
+      f.write(_dumps(index))
+    # the index goes in last, a half written round split is never picked up
+    os.replace(f"{self.segments_path}.tmp", self.segments_path)
+    os.replace(f"{self.index_path}.tmp", self.index_path)
+    print(f"Saved {len(self.rounds)} round segments to {self.segments_path}")
+    return self.index_path
+
+  def abort(self):
+    self.f.close()
+    for path in (f"{self.segments_path}.tmp", f"{self.index_path}.tmp"):
+      if os.path.exists(path):
+        os.remove(path)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, exc_type, exc, tb):
+    if exc_type is None:
+      self.close()
+    else:
+      self.abort()
@@ -0,0 +1,176 @@
+import numpy as np
+import pandas as pd
+
+# players are sampled on the fixed TICK_INTERVAL grid, thinned where they move
+# in a straight line and refined with extra ticks around kills and sharp bends
+ADAPTIVE_POLICY = {
+  "type": "adaptive",
+  "fine_interval": 4,  # extra samples between grid ticks, ~16 a second at 64 tick
+  "max_gap": 64,  # a live player gets a sample at least once a second
+  # samples are dropped while players move in a straight line at a steady turn
+  # rate, these bound how much velocity / turn rate change a dropped run hides
+  "position_tolerance": 4.0,  # units per sample
+  "yaw_tolerance": 4.0,  # degrees per sample
+  # a change of velocity past this between two grid samples is a sharp bend
+  # (a stop, a peek), the grid steps next to it are refined
+  "bend_tolerance": 16.0,  # units per sample
+  "event_radius": 32,  # ticks around a death / shot of the player
+  "interpolate": (
+    "players are only listed on ticks where they were sampled, around kills and "
+    "sharp bends that includes ticks between the base_interval grid. interpolate "
+    "a player linearly between two of its samples at most max_gap ticks apart, a "
+    "longer gap means the player was dead or not connected."
+  ),
+}
+
+# tick and sid are packed into one sortable key when matching event marks
+_SID_SHIFT = 32
+
+
+def _run_position(new_run):
+  # index of every row inside its run, a run starts wherever new_run is set
+  idx = np.arange(len(new_run))
+  return idx - np.maximum.accumulate(np.where(new_run, idx, 0))
+
+
+def _kinks(values, new_run, wrap=None):
+  """How far every sample is off the line through its two neighbours, the
+  second difference. The first and last sample of a run have none."""
+  values = values.reshape(len(new_run), -1)
+  step = np.zeros_like(values)
+  step[1:] = np.diff(values, axis=0)
+  if wrap is not None:
+    step = (step + wrap / 2) % wrap - wrap / 2
+  step[new_run] = 0
+
+  bend = np.zeros_like(values)
+  bend[1:] = np.diff(step, axis=0)
+  # the first step of a run is a velocity, not a change of it
+  bend[new_run] = 0
+  bend[1:][new_run[:-1]] = 0
+
+  # bend[i] is the kink at sample i - 1
+  kinks = np.zeros(len(new_run))
+  kinks[:-1] = np.abs(bend[1:]).sum(axis=1)
+  return kinks
+
+
+def _bends(values, new_run, tolerance, wrap=None):
+  """Flags the samples where the accumulated change of slope crosses `tolerance`.
+
+  The running total of _kinks is cut into `tolerance` sized cells, so a long
+  gentle curve still gets a sample every time it bends another cell.
+  """
+  cells = np.floor(np.cumsum(_kinks(values, new_run, wrap)) / tolerance)
+  return np.diff(cells, prepend=0) != 0
+
+
+class AdaptiveSampler:
+  """Drops grid samples that add nothing over the previous kept one and adds
+  finer ones where the grid is too coarse.
+
+  A grid sample is kept where the player's path or turn rate bends (see
+  _bends), when hp changes, within `event_radius` ticks of a death or shot the
+  player was part of, on the first and last sample of every alive stretch, and
+  at least every `max_gap` ticks so clients can interpolate. Grid steps next to
+  a sharp bend or within `event_radius` of a kill get a sample every
+  `fine_interval` ticks.
+  """
+
+  def __init__(self, death_df=None, fire_df=None, interval=12, policy=None):
+    self.policy = {**(policy or ADAPTIVE_POLICY), "base_interval": interval}
+    self.sources = {"kill": [], "shot": []}
+    if death_df is not None and not death_df.empty:
+      for col in ["user_steamid", "attacker_steamid", "assister_steamid"]:
+        if col in death_df.columns:
+          self.sources["kill"].append((death_df["tick"], death_df[col]))
+    if fire_df is not None and "user_steamid" in fire_df.columns:
+      self.sources["shot"].append((fire_df["tick"], fire_df["user_steamid"]))
+    self._marks = {}
+
+  def marks(self, steamid_map, kind):
+    """Sorted (sid, tick) keys of every event of `kind` a player was part of."""
+    # the map grows when the tick pass finds a late player, marks follow it
+    if self._marks.get(kind, (None,))[0] != len(steamid_map):
+      keys = [np.empty(0, dtype=np.int64)]
+      for ticks, steamids in self.sources[kind]:
+        sids = steamid_map.lookup(steamids)
+        known = sids >= 0
+        ticks = ticks.to_numpy().astype(np.int64)[known]
+        keys.append((sids[known] << _SID_SHIFT) + ticks)
+      self._marks[kind] = (len(steamid_map), np.sort(np.concatenate(keys)))
+    return self._marks[kind][1]
+
+  def _near(self, keys, steamid_map, kind):
+    marks = self.marks(steamid_map, kind)
+    radius = self.policy["event_radius"]
+    lo = np.searchsorted(marks, keys - radius, side="left")
+    hi = np.searchsorted(marks, keys + radius, side="right")
+    return hi > lo
+
+  def plan(self, df, steamid_map):
+    """Keep mask over the rows of `df`, and the sorted (sid, tick) keys of the
+    fine samples to add."""
+    p = self.policy
+    # walk every player's samples in tick order
+    order = np.lexsort((df["tick"].to_numpy(), df["sid"].to_numpy()))
+    sids = df["sid"].to_numpy().astype(np.int64)[order]
+    ticks = df["tick"].to_numpy().astype(np.int64)[order]
+
+    gap_before = np.ones(len(df), dtype=bool)
+    gap_before[1:] = (np.diff(sids) != 0) | (np.diff(ticks) > p["base_interval"])
+    gap_after = np.append(gap_before[1:], True)
+    keep = gap_before | gap_after
+
+    # float32 positions, rounded back to the 2 decimals they were cleaned to
+    positions = np.round(df[["x", "y", "z"]].to_numpy(dtype=np.float64), 2)[order]
+    keep |= _bends(positions, gap_before, p["position_tolerance"])
+    yaw = df["rot"].to_numpy(dtype=np.float64)[order]
+    keep |= _bends(yaw, gap_before, p["yaw_tolerance"], wrap=360)
+    hp = df["hp"].to_numpy()[order]
+    keep[1:] |= hp[1:] != hp[:-1]
+
+    heartbeat = max(p["max_gap"] // p["base_interval"], 1)
+    keep |= _run_position(gap_before) % heartbeat == 0
+
+    keys = (sids << _SID_SHIFT) + ticks
+    near_kill = self._near(keys, steamid_map, "kill")
+    keep |= near_kill | self._near(keys, steamid_map, "shot")
+
+    # refine the grid steps on either side of a sharp bend or a sample near a
+    # kill, a step is refined from its first sample when the next one follows
+    # on the grid, never across a gap
+    flagged = near_kill | (_kinks(positions, gap_before) > p["bend_tolerance"])
+    refine = flagged.copy()
+    refine[:-1] |= flagged[1:]
+    refine &= ~gap_after
+    steps = np.arange(p["fine_interval"], p["base_interval"], p["fine_interval"])
+    fine = (keys[refine][:, None] + steps[None, :]).ravel()
+
+    mask = np.empty(len(df), dtype=bool)
+    mask[order] = keep
+    return mask, np.setdiff1d(fine, keys)
+
+  def sample(self, df, steamid_map, fetch=None):
+    """Thins a cleaned, tick sorted frame, the row order is kept.
+
+    `fetch` takes a list of ticks and returns their cleaned frame, the planned
+    fine samples are taken from it. Without it the grid is only thinned.
+    """
+    if df.empty:
+      return df
+    keep, fine = self.plan(df, steamid_map)
+    df = df[keep]
+    if fetch is None or not len(fine):
+      return df
+
+    extra = fetch(np.unique(fine & ((1 << _SID_SHIFT) - 1)).tolist())
+    keys = (extra["sid"].to_numpy().astype(np.int64) << _SID_SHIFT) + extra[
+      "tick"
+    ].to_numpy().astype(np.int64)
+    # dead players stay compacted to their first dead grid sample
+    extra = extra[np.isin(keys, fine) & (extra["hp"] > 0).to_numpy()]
+    if "held" in df.columns:
+      extra = extra.assign(held=np.int8(0))
+    df = pd.concat([df, extra[df.columns]], ignore_index=True)
+    return df.sort_values(["tick", "sid"], kind="stable")
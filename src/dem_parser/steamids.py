@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+
+def to_steamid64(values):
+  """SteamIDs as int64 plus a mask of the rows that had one, without a per-row str()."""
+  s = values if isinstance(values, pd.Series) else pd.Series(values)
+  valid = s.notna().to_numpy()
+
+  if pd.api.types.is_integer_dtype(s.dtype) or pd.api.types.is_float_dtype(s.dtype):
+    return s.fillna(0).to_numpy().astype(np.int64), valid
+
+  # event steamids come in as strings
+  raw = s.where(s.notna(), "0")
+  try:
+    return np.asarray(raw, dtype=str).astype(np.int64), valid
+  except ValueError:
+    # float formatted ("7656...0.0") or junk ids, same as the old split(".")[0]
+    digits = raw.astype(str).str.partition(".")[0]
+    numeric = digits.str.fullmatch(r"\d+").fillna(False).to_numpy(dtype=bool)
+    digits = digits.where(numeric, "0")
+    return np.asarray(digits, dtype=str).astype(np.int64), valid & numeric
+
+
+class SteamIdMap:
+  """SteamID -> tiny player id through a sorted int64 array.
+
+  Tiny ids are handed out in steamid order, so a steamid's id is simply its
+  position in the sorted array and a lookup is one searchsorted call. Players
+  found later through add() get the ids after those, in the order they showed up.
+  """
+
+  def __init__(self, steamids):
+    self.steamids = np.unique(np.asarray(steamids, dtype=np.int64))
+    # tiny id of every entry of self.steamids
+    self.ids = np.arange(len(self.steamids), dtype=np.int64)
+    # (steamid, first tick) of every player add() handed an id to
+    self.added = []
+
+  def __len__(self):
+    return len(self.steamids)
+
+  def lookup(self, values, missing=-1):
+    sids, valid = to_steamid64(values)
+    if not len(self.steamids):
+      return np.full(len(sids), missing, dtype=np.int64)
+    idx = np.searchsorted(self.steamids, sids)
+    idx_clipped = np.minimum(idx, len(self.steamids) - 1)
+    found = valid & (idx < len(self.steamids)) & (self.steamids[idx_clipped] == sids)
+    return np.where(found, self.ids[idx_clipped], missing).astype(np.int64)
+
+  def add(self, values, ticks):
+    """Hands the next ids to the steamids that have none yet, ordered by the
+    first of their `ticks` and then by steamid. Returns how many were added."""
+    sids, valid = to_steamid64(values)
+    new = valid & (self.lookup(sids) < 0)
+    if not new.any():
+      return 0
+    first = (
+      pd.DataFrame({"steamid": sids[new], "tick": np.asarray(ticks)[new]})
+      .groupby("steamid")["tick"]
+      .min()
+      .reset_index()
+      .sort_values(["tick", "steamid"], kind="stable")
+    )
+    steamids = np.concatenate([self.steamids, first["steamid"].to_numpy()])
+    ids = np.concatenate([self.ids, len(self) + np.arange(len(first))])
+    order = np.argsort(steamids, kind="stable")
+    self.steamids, self.ids = steamids[order], ids[order]
+    self.added += list(zip(first["steamid"].tolist(), first["tick"].tolist()))
+    return len(first)
@@ -0,0 +1,167 @@
+import numpy as np
+
+PLAYER_FIELDS = ["sid", "hp", "x", "y", "z", "rot"]
+GRENADE_FIELDS = ["eid", "sid", "wep", "x", "y", "z"]
+FLOAT_FIELDS = {"x", "y", "z"}
+
+# ticks converted to python objects at a time, keeps the streamed writer flat
+TICKS_PER_CHUNK = 256
+
+# delta encoding, positions are stored as integer steps of 1 / POSITION_SCALE units
+DELTA_FIELDS = ["hp", "x", "y", "z", "rot"]
+POSITION_SCALE = 10
+KEYFRAME_TICKS = 64  # sampled ticks between keyframes, ~12s at interval 12
+
+
+def delta_encoding_spec(scale=POSITION_SCALE, keyframe_ticks=KEYFRAME_TICKS):
+  """Decoder spec for the "delta" timeline, written to the replay meta block."""
+  return {
+    "type": "delta",
+    "scale": scale,
+    "keyframe_ticks": keyframe_ticks,
+    "fields": PLAYER_FIELDS,
+    "delta_fields": DELTA_FIELDS,
+    "decode": (
+      "keep an integer [hp, x, y, z, rot] state per sid, starting at 0. walk the "
+      "timeline in order; when a tick has k=1 reset every sid's state to 0 first. "
+      "p rows are [sid, *deltas] and drop trailing zero deltas, pad them with 0 "
+      "and add the deltas to the sid's state. the position is state x, y, z / "
+      "scale, hp and yaw are read as is. sid is absolute, g rows are not encoded."
+    ),
+  }
+
+
+def delta_encode(
+  df, scale=POSITION_SCALE, keyframe_ticks=KEYFRAME_TICKS, keyframe_at=None
+):
+  """Quantizes hp/x/y/z/rot and replaces them with deltas to the player's previous row.
+
+  Every `keyframe_ticks` sampled ticks, and on the first sampled tick at or after
+  every tick in `keyframe_at`, the state resets, so the first row of a player
+  after a keyframe holds absolute values. Returns the encoded frame and a
+  keyframe flag per unique tick.
+  """
+  ticks = df["tick"].to_numpy()
+  unique_ticks, tick_index = np.unique(ticks, return_inverse=True)
+
+  # the keyframe count restarts in every block between two forced keyframes
+  block = np.zeros(len(unique_ticks), dtype=np.int64)
+  if keyframe_at is not None and len(keyframe_at):
+    block = np.searchsorted(np.sort(keyframe_at), unique_ticks, side="right")
+  block_start = np.ones(len(unique_ticks), dtype=bool)
+  block_start[1:] = np.diff(block) != 0
+  first_in_block = np.maximum.accumulate(
+    np.where(block_start, np.arange(len(unique_ticks)), 0)
+  )
+  keyframes = (np.arange(len(unique_ticks)) - first_in_block) % keyframe_ticks == 0
+  segment = (np.cumsum(keyframes) - 1)[tick_index]
+  sids = df["sid"].to_numpy()
+
+  # group rows by (segment, sid), keeping tick order inside every group
+  order = np.lexsort((np.arange(len(df)), sids, segment))
+  first = np.ones(len(df), dtype=bool)
+  first[1:] = (np.diff(segment[order]) != 0) | (np.diff(sids[order]) != 0)
+
+  encoded = {}
+  for col in DELTA_FIELDS:
+    values = df[col].to_numpy().astype(np.float64)
+    if col in FLOAT_FIELDS:
+      # positions come in as float32, back to the 2 decimal float64 value first
+      values = np.round(values, 2) * scale
+    values = np.round(values).astype(np.int64)[order]
+    deltas = np.diff(values, prepend=0)
+    deltas[first] = values[first]
+    out = np.empty(len(df), dtype=np.int64)
+    out[order] = deltas
+    encoded[col] = out
+
+  return df.assign(**encoded), keyframes
+
+
+def _rows(df, fields, start, end):
+  # one bulk tolist per column instead of boxing every cell through a Series
+  columns = []
+  for col in fields:
+    arr = df[col].to_numpy()[start:end]
+    if col in FLOAT_FIELDS:
+      columns.append(np.round(arr.astype(np.float64), 2).tolist())
+    else:
+      columns.append(arr.astype(np.int64).tolist())
+  return [list(row) for row in zip(*columns)]
+
+
+def _delta_rows(df, start, end):
+  # like _rows, but every row stops after its last non zero delta
+  deltas = np.stack(
+    [df[col].to_numpy()[start:end] for col in DELTA_FIELDS], axis=1
+  ).astype(np.int64)
+  changed = deltas != 0
+  last = len(DELTA_FIELDS) - np.argmax(changed[:, ::-1], axis=1)
+  lengths = (np.where(changed.any(axis=1), last, 0) + 1).tolist()
+  sids = df["sid"].to_numpy()[start:end].astype(np.int64).tolist()
+  return [[sid, *row[: n - 1]] for sid, row, n in zip(sids, deltas.tolist(), lengths)]
+
+
+def _tick_bounds(ticks):
+  # ticks are sorted, every run of equal ticks is one timeline entry
+  starts = np.flatnonzero(np.diff(ticks)) + 1
+  starts = np.concatenate([[0], starts]) if len(ticks) else starts
+  return ticks[starts], starts, np.append(starts[1:], len(ticks))
+
+
+def iter_timeline(df, g_df=None, encoding=None, keyframe_at=None):
+  """Yields one {"t", "p", "g"} object per sampled tick of the cleaned tick frame.
+
+  `df` must be sorted by tick, which clean_tick_frame guarantees. Rows are split
+  at tick boundaries on the raw arrays instead of grouping tick by tick.
+  With encoding="delta" the player rows are delta encoded and keyframe ticks
+  carry "k": 1, see delta_encoding_spec. `keyframe_at` forces extra keyframes,
+  e.g. at round starts so every round decodes on its own.
+  A "held" column (held compaction) lists the sids of held rows under "h".
+  """
+  ticks, p_starts, p_ends = _tick_bounds(df["tick"].to_numpy())
+
+  held_rows = held_sids = None
+  if "held" in df.columns:
+    held_rows = np.flatnonzero(df["held"].to_numpy())
+    held_sids = df["sid"].to_numpy()[held_rows].astype(np.int64).tolist()
+    held_starts = np.searchsorted(held_rows, p_starts)
+    held_ends = np.searchsorted(held_rows, p_ends)
+
+  keyframes = None
+  if encoding == "delta":
+    df, keyframes = delta_encode(df, keyframe_at=keyframe_at)
+
+  g_starts = g_ends = None
+  if g_df is not None and not g_df.empty:
+    # stable, so grenades keep their frame order within a tick like groupby did
+    g_df = g_df.sort_values("tick", kind="stable")
+    g_ticks = g_df["tick"].to_numpy()
+    g_starts = np.searchsorted(g_ticks, ticks, side="left")
+    g_ends = np.searchsorted(g_ticks, ticks, side="right")
+
+  for lo in range(0, len(ticks), TICKS_PER_CHUNK):
+    hi = min(lo + TICKS_PER_CHUNK, len(ticks))
+    base = p_starts[lo]
+    if keyframes is not None:
+      players = _delta_rows(df, base, p_ends[hi - 1])
+    else:
+      players = _rows(df, PLAYER_FIELDS, base, p_ends[hi - 1])
+
+    if g_starts is not None:
+      g_base = g_starts[lo]
+      grenades = _rows(g_df, GRENADE_FIELDS, g_base, g_ends[hi - 1])
+
+    for i in range(lo, hi):
+      tick_obj = {
+        "t": int(ticks[i]),
+        "p": players[p_starts[i] - base : p_ends[i] - base],
+      }
+      if keyframes is not None and keyframes[i]:
+        tick_obj["k"] = 1
+      if held_rows is not None and held_ends[i] > held_starts[i]:
+        tick_obj["h"] = held_sids[held_starts[i] : held_ends[i]]
+      # ticks without grenades have no "g" key at all
+      if g_starts is not None and g_ends[i] > g_starts[i]:
+        tick_obj["g"] = grenades[g_starts[i] - g_base : g_ends[i] - g_base]
+      yield tick_obj
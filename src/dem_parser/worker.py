@@ -0,0 +1,49 @@
+import json
+import os
+import sys
+
+# a worker exits after this many jobs so memory never creeps, the orchestrator
+# starts a fresh one for the next job. 0 = never
+MAX_JOBS = int(os.getenv("PARSER_WORKER_MAX_JOBS", "0"))
+
+
+def emit(event_type, payload):
+  event = {"type": event_type, "payload": payload}
+  print(f"DATA_OUTPUT:{json.dumps(event)}", flush=True)
+
+
+def run_worker(parse_demo, jobs=None, max_jobs=MAX_JOBS):
+  """Parses one demo per json line ({"demo_path", "match_code", "fetch_time"}).
+
+  Every job prints the usual DATA_OUTPUT events and ends with parse_job_done,
+  which tells the orchestrator the worker is free again, or that it is
+  retiring. Stops at EOF.
+  """
+  jobs = jobs if jobs is not None else sys.stdin
+  sys.stdout.reconfigure(line_buffering=True)
+  print("Parser worker ready", flush=True)
+
+  done = 0
+  for line in jobs:
+    line = line.strip()
+    if not line:
+      continue
+
+    ok = False
+    demo_path = None
+    try:
+      job = json.loads(line)
+      demo_path = job.get("demo_path")
+      if not demo_path or not os.path.exists(demo_path):
+        raise FileNotFoundError(f"File '{demo_path}' not found.")
+      parse_demo(demo_path)
+      ok = True
+    except Exception as e:
+      print(f"Error: Failed to parse {demo_path}: {e}")
+      emit("error", {"message": f"Parse failed: {e}", "demo_path": demo_path})
+    done += 1
+    retiring = bool(max_jobs) and done >= max_jobs
+    emit("parse_job_done", {"demo_path": demo_path, "ok": ok, "retiring": retiring})
+    if retiring:
+      print(f"Parser worker retiring after {done} jobs", flush=True)
+      break
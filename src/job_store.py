@@ -0,0 +1,163 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+# one row per task (a subprocess or worker job) and per replay watcher, the
+# watcher's own name is its job_id so find(job_id=...) returns it with its tasks
+SCHEMA = [
+  """
+  CREATE TABLE IF NOT EXISTS orchestrator_jobs (
+    name TEXT PRIMARY KEY,
+    stage TEXT NOT NULL,
+    job_id TEXT,
+    match_code TEXT,
+    context TEXT NOT NULL,
+    updated_at DOUBLE PRECISION NOT NULL
+  )""",
+  "CREATE INDEX IF NOT EXISTS orchestrator_jobs_job_id ON orchestrator_jobs (job_id)",
+  "CREATE INDEX IF NOT EXISTS orchestrator_jobs_match_code "
+  "ON orchestrator_jobs (match_code)",
+  "CREATE INDEX IF NOT EXISTS orchestrator_jobs_stage ON orchestrator_jobs (stage)",
+]
+
+UPSERT = """
+INSERT INTO orchestrator_jobs (name, stage, job_id, match_code, context, updated_at)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (name) DO UPDATE SET
+  stage = excluded.stage, job_id = excluded.job_id,
+  match_code = excluded.match_code, context = excluded.context,
+  updated_at = excluded.updated_at"""
+
+FILTERS = ("stage", "job_id", "match_code")
+
+
+class JobStore:
+  """Task contexts of the pipeline, persisted so a restart can pick them up.
+
+  Backed by a local sqlite file, or by the orchestrator's postgres pool. sqlite
+  calls run one at a time in a worker thread so they never block the loop.
+  update and pop read and write a task under a per name lock, so concurrent
+  updates of one watcher all land. A context is a plain dict with a "stage" (watcher, meta, parser, replay,
+  transcriber, debug...) and optionally "job_id" and "match_code", which are
+  kept in indexed columns.
+  """
+
+  def __init__(self, path: Optional[str] = None, pool=None):
+    self.path = path
+    self.pool = pool
+    self.conn: Optional[sqlite3.Connection] = None
+    self.lock = threading.Lock()
+    # name -> [asyncio.Lock, tasks holding or waiting for it]
+    self.name_locks: dict = {}
+
+  async def open(self):
+    if self.pool is None:
+      self.conn = await asyncio.to_thread(
+        sqlite3.connect, self.path, check_same_thread=False
+      )
+      self.conn.row_factory = sqlite3.Row
+    for statement in SCHEMA:
+      await self._execute(statement)
+
+  async def close(self):
+    if self.conn is not None:
+      await asyncio.to_thread(self._locked, self.conn.close)
+      self.conn = None
+
+  def _sql(self, query: str) -> str:
+    # sqlite takes ?, asyncpg numbered $n
+    if self.pool is None:
+      return query
+    parts = query.split("?")
+    return "".join(f"{p}${i}" for i, p in enumerate(parts[:-1], 1)) + parts[-1]
+
+  def _locked(self, call, *args):
+    with self.lock:
+      return call(*args)
+
+  def _execute_sqlite(self, query: str, args: tuple):
+    with self.conn:
+      self.conn.execute(query, args)
+
+  def _fetch_sqlite(self, query: str, args: tuple) -> list:
+    return self.conn.execute(query, args).fetchall()
+
+  async def _execute(self, query: str, *args):
+    if self.pool is not None:
+      await self.pool.execute(self._sql(query), *args)
+      return
+    await asyncio.to_thread(self._locked, self._execute_sqlite, query, args)
+
+  async def _fetch(self, query: str, *args) -> list:
+    if self.pool is not None:
+      return await self.pool.fetch(self._sql(query), *args)
+    return await asyncio.to_thread(self._locked, self._fetch_sqlite, query, args)
+
+  @asynccontextmanager
+  async def _name_lock(self, name: str):
+    entry = self.name_locks.setdefault(name, [asyncio.Lock(), 0])
+    entry[1] += 1
+    try:
+      async with entry[0]:
+        yield
+    finally:
+      entry[1] -= 1
+      if not entry[1]:
+        del self.name_locks[name]
+
+  async def put(self, name: str, context: dict):
+    job_id = name if context.get("stage") == "watcher" else context.get("job_id")
+    await self._execute(
+      UPSERT,
+      name,
+      context.get("stage", ""),
+      job_id,
+      context.get("match_code"),
+      json.dumps(context),
+      time.time(),
+    )
+
+  async def get(self, name: str) -> Optional[dict]:
+    rows = await self._fetch(
+      "SELECT context FROM orchestrator_jobs WHERE name = ?", name
+    )
+    return json.loads(rows[0]["context"]) if rows else None
+
+  async def pop(self, name: str) -> dict:
+    """Removes a task and returns its context, {} if another pop got it first."""
+    async with self._name_lock(name):
+      context = await self.get(name)
+      if context is not None:
+        await self.delete(name)
+    return context or {}
+
+  async def delete(self, name: str):
+    await self._execute("DELETE FROM orchestrator_jobs WHERE name = ?", name)
+
+  async def update(self, name: str, **fields) -> Optional[dict]:
+    """Merges fields into a stored context, None if there is no such task."""
+    async with self._name_lock(name):
+      context = await self.get(name)
+      if context is None:
+        return None
+      context.update(fields)
+      await self.put(name, context)
+    return context
+
+  async def find(self, **filters) -> list:
+    """(name, context) of every task matching stage / job_id / match_code,
+    oldest first."""
+    unknown = set(filters) - set(FILTERS)
+    if unknown:
+      raise ValueError(f"Cannot filter jobs by {sorted(unknown)}")
+    where = " AND ".join(f"{column} = ?" for column in filters) or "TRUE"
+    rows = await self._fetch(
+      f"SELECT name, context FROM orchestrator_jobs WHERE {where} "
+      "ORDER BY updated_at, name",
+      *filters.values(),
+    )
+    return [(row["name"], json.loads(row["context"])) for row in rows]
@@ -13,7 +13,8 @@ from contextlib import asynccontextmanager
 from pydantic import BaseModel
 import uvicorn
 from dotenv import load_dotenv
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
+from job_store import JobStore
 
 load_dotenv()
 
@@ -31,10 +32,27 @@ DB_CONFIG = {
   "database": os.getenv("PG_DB"),
 }
 
-TASK_CONTEXT: Dict[str, dict] = {}
+# every task and replay watcher of the pipeline, persisted so a restart resumes
+# them. "sqlite" keeps them in JOB_STORE_PATH, "postgres" in the demo database
+# the default file is relative to the working directory, like the parser output
+JOB_STORE = os.getenv("JOB_STORE", "sqlite").lower()
+JOB_STORE_PATH = os.getenv("JOB_STORE_PATH", "jobs.sqlite3")
+job_store = JobStore(JOB_STORE_PATH)
 # decided storing fragmented data from downloader here
 # so that way there can only be one query for each parsed demo
 downloader_process: Optional[subprocess.Popen] = None
+# warm `parser.py --worker` processes, 0 keeps forking one parser per demo
+PARSER_WORKERS = int(os.getenv("PARSER_WORKERS", "0"))
+parser_pool: Optional["ParserWorkerPool"] = None
+# run `parser.py --meta-only` first so the demo row and the transcriber don't
+# wait on the full replay parse, which runs right after as its own task
+PARSER_META_FIRST = os.getenv("PARSER_META_FIRST", "false").lower() == "true"
+# every parse_profile the parsers report is appended here as one json line,
+# relative to the working directory like JOB_STORE_PATH
+PARSE_PROFILE_PATH = os.getenv("PARSE_PROFILE_PATH", "parse_profiles.jsonl")
+
+# stages whose task runs the full parse, the replay is written once it exits
+PARSE_STAGES = ("parser", "replay")
 
 db_pool: Optional[asyncpg.Pool] = None
 
@@ -118,6 +136,11 @@ async def insert_into_db(record: dict, event_type: str):
       logger.error(f"Transcript DB Insertion failed: {e}")
 
 
+def append_parse_profile(record: dict):
+  with open(PARSE_PROFILE_PATH, "a") as f:
+    f.write(json.dumps(record) + "\n")
+
+
 # SUBPROCESSES
 #
 #
@@ -130,9 +153,8 @@ async def handle_subprocess_event(event: dict, task_name: str):
   # if any scripts error out
   if event_type == "error":
     logger.error(f"[{task_name}] reported an error: {payload.get('message')}")
-    context = TASK_CONTEXT.get(task_name, {})
-    abort_job(context.get("job_id"), payload.get("message", "Subprocess error"))
-    TASK_CONTEXT.pop(task_name, None)
+    context = await job_store.pop(task_name)
+    await abort_job(context.get("job_id"), payload.get("message", "Subprocess error"))
     return
 
   if event_type == "download_complete":
@@ -140,43 +162,67 @@ async def handle_subprocess_event(event: dict, task_name: str):
     match_code = payload.get("match_code")
     fetch_time = payload.get("fetch_time")
 
-    for key, context in list(TASK_CONTEXT.items()):
-      if (
-        context.get("is_debug")
-        and context.get("match_code") == match_code
-        and key.startswith("Debug_Download")
-      ):
-        del TASK_CONTEXT[key]
-        return
-
-    job_id = None
-    for key, context in TASK_CONTEXT.items():
-      if context.get("is_watcher") and context.get("match_code") == match_code:
-        job_id = key
-        break
+    debug = await job_store.find(stage="debug_download", match_code=match_code)
+    if debug:
+      await job_store.delete(debug[0][0])
+      return
+
+    watchers = await job_store.find(stage="watcher", match_code=match_code)
+    job_id = watchers[0][0] if watchers else None
+
+    if PARSER_META_FIRST:
+      meta_task_name = f"Meta_{match_code[-5:]}"
+      await job_store.put(
+        meta_task_name,
+        {
+          "stage": "meta",
+          "match_code": match_code,
+          "fetch_time": fetch_time,
+          "job_id": job_id,
+          "demo_path": demo_path,
+          "meta_first": True,
+        },
+      )
+
+      logger.info(f"Triggering metadata parse for {match_code}")
+      meta_cmd = [sys.executable, PARSER_SCRIPT, "--meta-only", demo_path]
+      await launch_subprocess(meta_cmd, meta_task_name)
+      return
 
     parser_task_name = f"Parser_{match_code[-5:]}"
-    TASK_CONTEXT[parser_task_name] = {
-      "match_code": match_code,
-      "fetch_time": fetch_time,
-      "job_id": job_id,
-    }
+    await job_store.put(
+      parser_task_name,
+      {
+        "stage": "parser",
+        "match_code": match_code,
+        "fetch_time": fetch_time,
+        "job_id": job_id,
+        "demo_path": demo_path,
+      },
+    )
 
     logger.info(f"Triggering parser for {match_code}")
 
-    cmd = [sys.executable, PARSER_SCRIPT, demo_path, match_code, fetch_time]
-    await launch_subprocess(cmd, parser_task_name)
+    await dispatch_parser(demo_path, match_code, fetch_time, parser_task_name)
 
   elif event_type == "parse_meta_complete":
-    context = TASK_CONTEXT.pop(task_name, {})
+    context = await job_store.get(task_name)
     if not context:
       logger.error(f"Lost context for task {task_name}! Cannot save to DB.")
       return
+    # a full parse writes the replay after this event, finish_task ends its task
+    if context.get("stage") not in PARSE_STAGES:
+      await job_store.delete(task_name)
 
     if context.get("is_debug"):
       logger.info(f"[DEBUG] Parse complete for {payload.get('match_code', 'unknown')}")
       return
 
+    # the demo row came from the meta only run already
+    if context.get("meta_done"):
+      logger.info(f"[{task_name}] Replay written to {payload.get('file_path')}")
+      return
+
     db_record = {
       "outcome": payload.get("outcome"),
       "file_path": payload.get("file_path"),
@@ -193,13 +239,32 @@ async def handle_subprocess_event(event: dict, task_name: str):
     job_id = context.get("job_id")
 
     if not demo_id:
-      abort_job(job_id, "Demo database insertion failed.")
+      await abort_job(job_id, "Demo database insertion failed.")
       return
 
-    if job_id and job_id in TASK_CONTEXT:
-      watcher = TASK_CONTEXT[job_id]
-      watcher["demo_id"] = demo_id
+    if context.get("meta_first"):
+      replay_task_name = f"Replay_{context.get('match_code', '')[-5:]}"
+      await job_store.put(
+        replay_task_name,
+        {
+          "stage": "replay",
+          "match_code": context.get("match_code"),
+          "fetch_time": context.get("fetch_time"),
+          "meta_done": True,
+          "demo_path": context["demo_path"],
+          "job_id": job_id,
+        },
+      )
+      logger.info(f"Metadata saved, triggering replay parse for demo {demo_id}")
+      await dispatch_parser(
+        context["demo_path"],
+        context.get("match_code"),
+        context.get("fetch_time"),
+        replay_task_name,
+      )
 
+    watcher = await job_store.update(job_id, demo_id=demo_id) if job_id else None
+    if watcher is not None:
       map_name = payload.get("map", "unknown_map")
       base_prompt = watcher.get("base_prompt")
 
@@ -208,21 +273,42 @@ async def handle_subprocess_event(event: dict, task_name: str):
         final_prompt = f"{base_prompt}, {final_prompt}"
 
       transcriber_task_name = f"Transcriber_{job_id}"
-      TASK_CONTEXT[transcriber_task_name] = {
-        "audio_id": watcher["audio_id"],
-        "job_id": job_id,
-      }
-
       transcriber_cmd = [sys.executable, TRANSCRIPT_SCRIPT, watcher["audio_file_path"]]
       transcriber_cmd.append(final_prompt)
+      await job_store.put(
+        transcriber_task_name,
+        {
+          "stage": "transcriber",
+          "audio_id": watcher["audio_id"],
+          "job_id": job_id,
+          "cmd": transcriber_cmd,
+        },
+      )
 
       logger.info(
         f"Parser finished, launching transcriber with map context: {map_name}"
       )
       await launch_subprocess(transcriber_cmd, transcriber_task_name)
 
+  elif event_type == "parse_profile":
+    slowest = max(payload.get("stages", []), key=lambda s: s["wall_s"], default={})
+    logger.info(
+      f"[{task_name}] Parse profile: {payload.get('wall_s')}s wall, "
+      f"{payload.get('cpu_s')}s cpu, peak {payload.get('peak_rss_mb')} MB, "
+      f"slowest stage {slowest.get('stage')} ({slowest.get('wall_s')}s)"
+    )
+    record = {
+      "recorded_at": datetime.now().astimezone().isoformat(),
+      "task": task_name,
+      **payload,
+    }
+    try:
+      await asyncio.to_thread(append_parse_profile, record)
+    except OSError as e:
+      logger.error(f"Could not persist parse profile: {e}")
+
   elif event_type == "transcribe_complete":
-    context = TASK_CONTEXT.get(task_name, {})
+    context = await job_store.get(task_name) or {}
     audio_id = context.get("audio_id")
 
     if not audio_id:
@@ -236,8 +322,7 @@ async def handle_subprocess_event(event: dict, task_name: str):
     await insert_into_db(payload, event_type)
 
     job_id = context.get("job_id")
-    if job_id and job_id in TASK_CONTEXT:
-      TASK_CONTEXT[job_id]["transcript_done"] = True
+    if job_id and await job_store.update(job_id, transcript_done=True) is not None:
       await check_replay_watcher(job_id)
 
 
@@ -266,26 +351,35 @@ async def listen_to_process(process, task_name):
   finally:
     await process.wait()
     logger.info(f"[{task_name}] Process finished with code {process.returncode}")
+    await finish_task(task_name, process.returncode)
 
-    context = TASK_CONTEXT.pop(task_name, {})
-    job_id = context.get("job_id")
 
-    # crash
-    if process.returncode != 0:
-      if job_id and job_id in TASK_CONTEXT:
-        logger.warning(f"Cleaning dead watcher: {job_id} due to {task_name} failure")
-        del TASK_CONTEXT[job_id]
-    else:
-      if job_id and job_id in TASK_CONTEXT:
-        watcher = TASK_CONTEXT[job_id]
-        if watcher.get("transcript_done"):
-          await check_replay_watcher(job_id)
-        else:
-          logger.warning(f"[{task_name}] Audio was silent. Discarding job {job_id}.")
+async def finish_task(task_name: str, returncode: int):
+  # runs once a task's work is over, whether it was its own process or a job on
+  # a warm parser worker
+  context = await job_store.pop(task_name)
+  job_id = context.get("job_id")
+  watcher = await job_store.get(job_id) if job_id else None
+
+  # crash
+  if returncode != 0:
+    if watcher is not None:
+      logger.warning(f"Cleaning dead watcher: {job_id} due to {task_name} failure")
+      await job_store.delete(job_id)
+  else:
+    if watcher is not None and context.get("stage") in PARSE_STAGES:
+      # the replay file is only there once the parse is over
+      await job_store.update(job_id, replay_done=True)
+      await check_replay_watcher(job_id)
+    elif watcher is not None:
+      if watcher.get("transcript_done"):
+        await check_replay_watcher(job_id)
+      else:
+        logger.warning(f"[{task_name}] Audio was silent. Discarding job {job_id}.")
 
-          # await db_pool.execute("DELETE FROM demos WHERE demo_id = $1", watcher.get("demo_id"))
+        # await db_pool.execute("DELETE FROM demos WHERE demo_id = $1", watcher.get("demo_id"))
 
-          abort_job(job_id, "Audio contained no transcribable speech.")
+        await abort_job(job_id, "Audio contained no transcribable speech.")
 
 
 async def launch_subprocess(cmd: list, task_name: str):
@@ -320,6 +414,127 @@ async def launch_subprocess(cmd: list, task_name: str):
     return None
 
 
+class ParserWorkerPool:
+  """Long lived parser workers fed one job at a time over stdin.
+
+  Every worker pays the interpreter start and the pandas/demoparser2 imports
+  once. Its DATA_OUTPUT lines go through handle_subprocess_event under the task
+  name of the job it is running, and a parse_job_done line frees it again.
+  Workers that die are started again for the next job.
+  """
+
+  def __init__(self, size: int):
+    self.size = size
+    self.queue: asyncio.Queue = asyncio.Queue()
+    self.processes: Dict[int, asyncio.subprocess.Process] = {}
+    self.runners: list = []
+
+  def start(self):
+    self.runners = [asyncio.create_task(self._run(i)) for i in range(self.size)]
+    logger.info(f"Started {self.size} parser workers")
+
+  async def submit(
+    self, demo_path: str, match_code: str, fetch_time: str, task_name: str
+  ):
+    job = {"demo_path": demo_path, "match_code": match_code, "fetch_time": fetch_time}
+    await self.queue.put((job, task_name))
+
+  async def _spawn(self, worker_id: int):
+    logger.info(f"Launching task: ParserWorker_{worker_id}")
+    process = await asyncio.create_subprocess_exec(
+      sys.executable,
+      "-u",
+      PARSER_SCRIPT,
+      "--worker",
+      cwd=os.path.dirname(PARSER_SCRIPT),
+      stdin=asyncio.subprocess.PIPE,
+      stdout=asyncio.subprocess.PIPE,
+      stderr=asyncio.subprocess.STDOUT,
+    )
+    self.processes[worker_id] = process
+    return process
+
+  async def _read_job(self, process, task_name: str) -> Optional[dict]:
+    # same line protocol as listen_to_process, until the parse_job_done line
+    while True:
+      line_bytes = await process.stdout.readline()
+      if not line_bytes:
+        return None  # worker died mid job
+
+      line = line_bytes.decode("utf-8").strip()
+      if not line:
+        continue
+
+      if line.startswith("DATA_OUTPUT:"):
+        try:
+          data = json.loads(line.replace("DATA_OUTPUT:", "", 1))
+          if data.get("type") == "parse_job_done":
+            return data.get("payload", {})
+          await handle_subprocess_event(data, task_name)
+        except Exception as e:
+          logger.error(f"[{task_name}] Event Error: {e}")
+      else:
+        logger.info(f"[{task_name}] {line}")
+
+  async def _run(self, worker_id: int):
+    while True:
+      job, task_name = await self.queue.get()
+      try:
+        await self._run_job(worker_id, job, task_name)
+      finally:
+        self.queue.task_done()
+
+  async def _run_job(self, worker_id: int, job: dict, task_name: str):
+    worker_name = f"ParserWorker_{worker_id}"
+    done = None
+    try:
+      process = self.processes.get(worker_id)
+      if process is None:
+        process = await self._spawn(worker_id)
+      logger.info(f"[{worker_name}] Running task: {task_name}")
+      process.stdin.write(f"{json.dumps(job)}\n".encode())
+      await process.stdin.drain()
+      done = await self._read_job(process, task_name)
+    except Exception as e:
+      logger.error(f"[{worker_name}] Job {task_name} failed: {e}")
+
+    # crashed or retiring workers are replaced on the next job
+    if done is None or done.get("retiring"):
+      process = self.processes.pop(worker_id, None)
+      if process:
+        if done is None and process.returncode is None:
+          process.kill()
+        await process.wait()
+        logger.info(f"[{worker_name}] Process finished with code {process.returncode}")
+
+    ok = bool(done and done.get("ok"))
+    logger.info(f"[{task_name}] Parse job finished, ok={ok}")
+    await finish_task(task_name, 0 if ok else 1)
+
+  async def stop(self):
+    for runner in self.runners:
+      runner.cancel()
+    for process in self.processes.values():
+      if process.returncode is None:
+        # workers exit on their own once stdin closes
+        process.stdin.close()
+        try:
+          await asyncio.wait_for(process.wait(), timeout=5)
+        except asyncio.TimeoutError:
+          process.kill()
+
+
+async def dispatch_parser(
+  demo_path: str, match_code: str, fetch_time: str, task_name: str
+):
+  # hand the demo to a warm worker when the pool is running, else fork a parser
+  if parser_pool is not None:
+    await parser_pool.submit(demo_path, match_code, fetch_time, task_name)
+    return
+  cmd = [sys.executable, PARSER_SCRIPT, demo_path, match_code, fetch_time]
+  await launch_subprocess(cmd, task_name)
+
+
 # HELPER FUNCTION FOR DOWNLOADER
 async def send_via_pipe(match_code: str):
   if downloader_process and downloader_process.returncode is None:
@@ -332,15 +547,22 @@ async def send_via_pipe(match_code: str):
     raise HTTPException(status_code=503, detail="Downloader service is not running.")
 
 
-# HELPER FUNCTION FOR TASK_CONTEXT
+# HELPER FUNCTION FOR THE JOB STORE
 async def check_replay_watcher(job_id: str):
-  watcher = TASK_CONTEXT.get(job_id)
+  watcher = await job_store.get(job_id)
   # remove misc requests
-  if not watcher or not watcher.get("is_watcher"):
+  if not watcher or watcher.get("stage") != "watcher":
     return
 
-  # we check if the fields are filled
-  if watcher.get("demo_id") is not None and watcher.get("transcript_done") is True:
+  # we check if the fields are filled, the demo row is in before the replay file
+  if (
+    watcher.get("demo_id") is not None
+    and watcher.get("transcript_done") is True
+    and watcher.get("replay_done") is True
+  ):
+    # the transcript and the replay can finish together, only one check inserts
+    if not await job_store.pop(job_id):
+      return
     logger.info(f"Watcher complete for {job_id}. Inserting replay")
 
     try:
@@ -416,18 +638,60 @@ async def check_replay_watcher(job_id: str):
           audio_starts_first,
         )
       logger.info(f"Successfully created replay: {watcher['replay_name']}")
-
-      del TASK_CONTEXT[job_id]
     except Exception as e:
-      abort_job(job_id, f"Final replay DB insertion failed: {e}")
-      logger.error(f"Replay DB Insertion failed: {e}")
+      logger.error(f"Replay DB Insertion failed for {job_id}: {e}")
 
 
 # HELPER FUNCTION TO ABORT JOB IF PARSER/DOWNLOADER/TRANSCRIBER DOESN'T WORK
-def abort_job(job_id: str, reason: str):
-  if job_id and job_id in TASK_CONTEXT:
+async def abort_job(job_id: str, reason: str):
+  if job_id and await job_store.get(job_id) is not None:
     logger.error(f"Aborting job '{job_id}: {reason}")
-    del TASK_CONTEXT[job_id]
+    await job_store.delete(job_id)
+
+
+# HELPER FUNCTION TO PICK UP THE PIPELINE AFTER A RESTART
+async def resume_jobs():
+  # the processes of every stored task died with the last orchestrator, start
+  # them again from their context. tasks that can't run again take their
+  # watcher down with them, watchers still waiting on a demo ask for it again
+  for task_name, context in await job_store.find():
+    stage = context.get("stage")
+    demo_path = context.get("demo_path")
+    has_demo = bool(demo_path) and os.path.exists(demo_path)
+
+    if stage == "watcher":
+      continue
+    if stage in ("parser", "replay", "debug_parse") and has_demo:
+      logger.info(f"Resuming {task_name}: parsing {demo_path} again")
+      await dispatch_parser(
+        demo_path, context.get("match_code"), context.get("fetch_time"), task_name
+      )
+    elif stage == "meta" and has_demo:
+      logger.info(f"Resuming {task_name}: reading metadata of {demo_path} again")
+      meta_cmd = [sys.executable, PARSER_SCRIPT, "--meta-only", demo_path]
+      await launch_subprocess(meta_cmd, task_name)
+    elif stage == "transcriber" and context.get("cmd"):
+      logger.info(f"Resuming {task_name}: transcribing again")
+      await launch_subprocess(context["cmd"], task_name)
+    else:
+      logger.warning(f"Cannot resume {task_name} ({stage}), dropping it")
+      await job_store.delete(task_name)
+      await abort_job(context.get("job_id"), f"{task_name} was interrupted")
+
+  for job_id, watcher in await job_store.find(stage="watcher"):
+    # the watcher itself is one of the rows, anything else is a resumed task
+    if len(await job_store.find(job_id=job_id)) > 1:
+      continue
+    if watcher.get("demo_id") is None:
+      logger.info(f"Resuming {job_id}: downloading {watcher['match_code']} again")
+      try:
+        await send_via_pipe(watcher["match_code"])
+      except HTTPException as e:
+        await abort_job(job_id, f"Could not resume the download: {e.detail}")
+    elif watcher.get("transcript_done") and watcher.get("replay_done"):
+      await check_replay_watcher(job_id)
+    else:
+      await abort_job(job_id, "Transcriber or replay parse was interrupted")
 
 
 # ROUTES
@@ -437,7 +701,7 @@ def abort_job(job_id: str, reason: str):
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-  global downloader_process, db_pool
+  global downloader_process, db_pool, parser_pool, job_store
   logger.info("Starting Services...")
 
   try:
@@ -446,12 +710,28 @@ async def lifespan(app: FastAPI):
   except Exception as e:
     logger.critical(f"Failed to connect to DB: {e}")
 
+  if JOB_STORE == "postgres" and db_pool:
+    job_store = JobStore(pool=db_pool)
+  elif JOB_STORE == "postgres":
+    logger.warning(f"No DB for the job store, using {JOB_STORE_PATH}")
+  await job_store.open()
+
   downloader_process = await launch_subprocess(
     [sys.executable, DOWNLOADER_SCRIPT], "Downloader"
   )
 
+  if PARSER_WORKERS > 0:
+    parser_pool = ParserWorkerPool(PARSER_WORKERS)
+    parser_pool.start()
+
+  await resume_jobs()
+
   yield
 
+  if parser_pool:
+    await parser_pool.stop()
+    parser_pool = None
+
   if downloader_process:
     downloader_process.terminate()
     try:
@@ -459,6 +739,7 @@ async def lifespan(app: FastAPI):
     except asyncio.TimeoutError:
       downloader_process.kill()
 
+  await job_store.close()
   if db_pool:
     await db_pool.close()
 
@@ -493,7 +774,10 @@ app = FastAPI(title="CS2 & Audio Orchestrator", lifespan=lifespan)
 async def trigger_download(req: DownloadRequest):
   """Sends a match_code to the background Steam downloader via Pipe."""
   task_name = f"Debug_Download_${req.match_code[-5:]}"
-  TASK_CONTEXT[task_name] = {"match_code": req.match_code, "is_debug": True}
+  await job_store.put(
+    task_name,
+    {"stage": "debug_download", "match_code": req.match_code, "is_debug": True},
+  )
   await send_via_pipe(req.match_code)
   return {
     "status": "queued",
@@ -510,15 +794,19 @@ async def trigger_parse(req: ParseRequest):
     raise HTTPException(status_code=404, detail="Demo file not found")
 
   task_name = f"Parser_Debug_{req.match_code[-5:]}"
-  TASK_CONTEXT[task_name] = {
-    "match_code": req.match_code,
-    "fetch_time": req.fetch_time,
-    "is_debug": True,
-  }
+  await job_store.put(
+    task_name,
+    {
+      "stage": "debug_parse",
+      "match_code": req.match_code,
+      "fetch_time": req.fetch_time,
+      "is_debug": True,
+      "demo_path": req.demo_path,
+    },
+  )
 
   # Run in background so API doesn't hang
-  cmd = [sys.executable, PARSER_SCRIPT, req.demo_path, req.match_code, req.fetch_time]
-  await launch_subprocess(cmd, task_name)
+  await dispatch_parser(req.demo_path, req.match_code, req.fetch_time, task_name)
 
   return {"status": "parsing", "file": req.demo_path, "message": "Sent to parser"}
 
@@ -544,11 +832,12 @@ async def trigger_transcribe(req: TranscriptRequest):
     )
 
   task_name = f"Transcriber_{req.audio_id}"
-  TASK_CONTEXT[task_name] = {"audio_id": req.audio_id}
-
   cmd = [sys.executable, TRANSCRIPT_SCRIPT, file_path]
   if req.prompt:
     cmd.append(req.prompt)
+  await job_store.put(
+    task_name, {"stage": "transcriber", "audio_id": req.audio_id, "cmd": cmd}
+  )
 
   await launch_subprocess(cmd, task_name)
 
@@ -573,16 +862,20 @@ async def create_replay(req: CreateReplayRequest):
 
   # define what fields are required for the watcher
   job_id = f"job_{req.match_code[-5:]}_{req.audio_id}"
-  TASK_CONTEXT[job_id] = {
-    "is_watcher": True,
-    "match_code": req.match_code,
-    "replay_name": req.replay_name,
-    "audio_id": req.audio_id,
-    "demo_id": None,
-    "transcript_done": False,
-    "audio_file_path": record["file_path"],
-    "base_prompt": req.prompt,
-  }
+  await job_store.put(
+    job_id,
+    {
+      "stage": "watcher",
+      "match_code": req.match_code,
+      "replay_name": req.replay_name,
+      "audio_id": req.audio_id,
+      "demo_id": None,
+      "transcript_done": False,
+      "replay_done": False,
+      "audio_file_path": record["file_path"],
+      "base_prompt": req.prompt,
+    },
+  )
 
   await send_via_pipe(req.match_code)
 
@@ -602,6 +895,125 @@ async def get_parsed_json(filepath: str):
   return FileResponse(filepath, media_type="application/json")
 
 
+# helper for nodejs backend
+# takes the same replay .json path and serves the columnar .timeline.bin next to it
+# only exists when the parser ran with PARSER_BINARY_TIMELINE=true
+@app.get("/get_timeline")
+async def get_timeline(filepath: str):
+  bin_path = os.path.splitext(filepath)[0] + ".timeline.bin"
+  if not os.path.exists(bin_path):
+    raise HTTPException(
+      status_code=404, detail="Binary timeline not found on remote server"
+    )
+  return FileResponse(bin_path, media_type="application/octet-stream")
+
+
+# per side occupancy / kill / death grids, same replay .json path as the key
+# only exists when the parser ran with PARSER_HEATMAPS=true
+@app.get("/get_heatmaps")
+async def get_heatmaps(filepath: str):
+  heatmap_path = os.path.splitext(filepath)[0] + ".heatmaps.json"
+  if not os.path.exists(heatmap_path):
+    raise HTTPException(status_code=404, detail="Heatmaps not found on remote server")
+  return FileResponse(heatmap_path, media_type="application/json")
+
+
+def load_rounds_index(filepath: str):
+  # the parser writes <base>.rounds.index.json next to the replay .json when
+  # PARSER_ROUND_SEGMENTS=true, pieces are byte ranges of <base>.rounds.jsonl
+  index_path = os.path.splitext(filepath)[0] + ".rounds.index.json"
+  if not os.path.exists(index_path):
+    raise HTTPException(
+      status_code=404, detail="Round index not found on remote server"
+    )
+  with open(index_path) as f:
+    index = json.load(f)
+  segments_path = os.path.join(os.path.dirname(index_path), index["segments"])
+  return index, segments_path
+
+
+def read_pieces(segments_path: str, spans: list):
+  # only the requested byte ranges are read, never the whole segments file
+  pieces = []
+  with open(segments_path, "rb") as f:
+    for offset, length in spans:
+      f.seek(offset)
+      pieces.append(f.read(length))
+  return pieces
+
+
+# helper for nodejs backend
+# one round of the replay:
+# {"round","start_tick","end_tick","encoding","compaction","timeline","events"}
+# rounds are numbered from 1, only that round's bytes are read from disk
+@app.get("/get_round")
+async def get_round(filepath: str, round_num: int):
+  index, segments_path = await asyncio.to_thread(load_rounds_index, filepath)
+  rounds = index["rounds"]
+  if not 1 <= round_num <= len(rounds):
+    raise HTTPException(status_code=404, detail="Round not found in replay")
+
+  info = rounds[round_num - 1]
+  timeline, events = await asyncio.to_thread(
+    read_pieces, segments_path, [info["timeline"], info["events"]]
+  )
+
+  head = {
+    "round": info["round"],
+    "start_tick": info["start_tick"],
+    "end_tick": info["end_tick"],
+    "encoding": index.get("encoding"),
+    "compaction": index.get("compaction"),
+  }
+  # splice the stored json in as is instead of decoding and re-encoding it
+  body = json.dumps(head, separators=(",", ":"))[:-1].encode("utf-8")
+  body += b',"timeline":' + timeline + b',"events":' + events + b"}"
+  return Response(content=body, media_type="application/json")
+
+
+# helper for nodejs backend
+# timeline entries and events with start_tick <= t <= end_tick, read from the rounds
+# the range overlaps. the timeline starts at the start of start_tick's round instead,
+# where every player has a row and delta encoding a keyframe, so compacted dead and
+# held players can be rebuilt
+@app.get("/get_ticks")
+async def get_ticks(filepath: str, start_tick: int, end_tick: int):
+  index, segments_path = await asyncio.to_thread(load_rounds_index, filepath)
+  overlapping = [
+    r
+    for r in index["rounds"]
+    if r["start_tick"] <= end_tick and r["end_tick"] >= start_tick
+  ]
+
+  spans = [span for r in overlapping for span in (r["timeline"], r["events"])]
+  pieces = await asyncio.to_thread(read_pieces, segments_path, spans)
+
+  timeline = []
+  events = {}
+  for timeline_piece, events_piece in zip(pieces[::2], pieces[1::2]):
+    entries = json.loads(timeline_piece)
+    first = start_tick
+    if not timeline:
+      # a dead or held player's last row can be anywhere before start_tick, every
+      # player has one on the round's first tick, which is a keyframe too
+      first = min(start_tick, overlapping[0]["start_tick"])
+    timeline += [e for e in entries if first <= e["t"] <= end_tick]
+
+    for name, records in json.loads(events_piece).items():
+      kept = [e for e in records if start_tick <= e["t"] <= end_tick]
+      if kept:
+        events.setdefault(name, []).extend(kept)
+
+  return {
+    "start_tick": start_tick,
+    "end_tick": end_tick,
+    "encoding": index.get("encoding"),
+    "compaction": index.get("compaction"),
+    "timeline": timeline,
+    "events": events,
+  }
+
+
 # helper for nodejs backend
 @app.get("/get_audio")
 async def get_audio(filepath: str):
@@ -0,0 +1,280 @@
+import numpy as np
+import pandas as pd
+
+TICK_RATE = 64
+GRENADE_TYPES = ["HeGrenade", "SmokeGrenade", "Flashbang", "Decoy", "Molotov"]
+DETONATE_EVENTS = {
+  "hegrenade_detonate": 0,
+  "smokegrenade_detonate": 1,
+  "flashbang_detonate": 2,
+  "decoy_detonate": 3,
+  "inferno_startburn": 4,
+  "inferno_expire": 4,
+}
+WEAPONS = ["ak47", "m4a1", "awp", "deagle", "glock", "usp_silencer"]
+
+
+class FakeDemoParser:
+  """Stands in for demoparser2.DemoParser with a seeded, synthetic match.
+
+  Same call signatures and frame layouts as the real parser for what
+  parser.py asks for: a warmup, `rounds` rounds of `round_seconds` with
+  `players` players that swap sides at half time, kills with their damage,
+  shots, utility and grenade flight paths. Ticks are generated on demand, so
+  a full `parse_ticks(["tick"])` scan costs what it would on a real demo.
+  """
+
+  def __init__(self, demo_path=None, rounds=30, players=10, seed=0, round_seconds=100):
+    rng = np.random.default_rng(seed)
+    self.rounds = rounds
+    self.players = players
+    self.names = np.array([f"player{i}" for i in range(players)], dtype=object)
+    self.steamids = 76561198000000000 + np.arange(players, dtype=np.uint64) * 7919
+    self.half = min(rounds // 2, 12)
+
+    self.warmup_end = 60 * TICK_RATE
+    self.match_start = self.warmup_end + 2 * TICK_RATE
+    round_ticks = round_seconds * TICK_RATE
+    self.round_starts = self.match_start + np.arange(rounds) * round_ticks
+    self.end_tick = int(self.round_starts[-1]) + round_ticks - 1
+
+    # first half players [0, players / 2) are T (2), the rest CT (3)
+    self.death_tick = np.full((rounds, players), np.iinfo(np.int64).max)
+    deaths, hurts, shots, nades, flights = [], [], [], [], []
+    self.round_winner = np.zeros(rounds, dtype=np.int64)
+    for r, start in enumerate(self.round_starts):
+      teams = self.teams(r)
+      alive = list(range(players))
+      tick = int(start) + 15 * TICK_RATE  # freeze time
+      for _ in range(int(rng.integers(3, players))):
+        tick += int(rng.integers(TICK_RATE, 8 * TICK_RATE))
+        victim = int(rng.choice(alive))
+        enemies = [p for p in alive if teams[p] != teams[victim]]
+        if not enemies:
+          break
+        attacker = int(rng.choice(enemies))
+        assister = int(rng.choice(enemies)) if rng.random() < 0.25 else None
+        weapon = str(rng.choice(WEAPONS))
+
+        hp = 100
+        hit_tick = tick - int(rng.integers(4, 3 * TICK_RATE))
+        while hp > 0:
+          hit_tick = min(hit_tick + int(rng.integers(1, 32)), tick)
+          dmg = int(rng.integers(15, 110))
+          hurts.append((hit_tick, victim, attacker, dmg, weapon))
+          hp -= dmg
+        deaths.append((tick, victim, attacker, assister, weapon, rng.random() < 0.4))
+        self.death_tick[r, victim] = tick
+        alive.remove(victim)
+
+      for shooter, shot_tick in zip(
+        rng.integers(0, players, 120), rng.integers(start, start + round_ticks, 120)
+      ):
+        shots.append((int(shot_tick), int(shooter), str(rng.choice(WEAPONS))))
+
+      for k in range(8):
+        thrower = int(rng.integers(0, players))
+        kind = int(rng.integers(0, len(GRENADE_TYPES)))
+        throw = int(start) + int(rng.integers(15, round_seconds - 10)) * TICK_RATE
+        air = int(rng.integers(TICK_RATE, 3 * TICK_RATE))
+        entity = 1000 + r * 16 + k
+        flights.append((throw, air, entity, thrower, kind))
+        nades.append((throw + air, entity, thrower, kind))
+
+      t_alive = sum(teams[p] == 2 for p in alive)
+      self.round_winner[r] = 2 if t_alive > len(alive) - t_alive else 3
+
+    self.death_df = pd.DataFrame(
+      sorted(deaths, key=lambda d: d[0]),
+      columns=["tick", "victim", "attacker", "assister", "weapon", "headshot"],
+    )
+    self.hurt_df = pd.DataFrame(
+      sorted(hurts, key=lambda h: h[0]),
+      columns=["tick", "victim", "attacker", "dmg_health", "weapon"],
+    )
+    self.shot_df = pd.DataFrame(sorted(shots), columns=["tick", "shooter", "weapon"])
+    self.nade_df = pd.DataFrame(
+      sorted(nades), columns=["tick", "entity", "thrower", "kind"]
+    )
+    self.flights = flights
+    self.round_ends = np.append(self.round_starts[1:] - 7 * TICK_RATE, self.end_tick)
+    # players that start on T won the round
+    self.group_a_won = (self.round_winner == 2) == (np.arange(rounds) < self.half)
+
+  def teams(self, round_idx):
+    first_half = np.arange(self.players) < self.players // 2
+    t_side = first_half if round_idx < self.half else ~first_half
+    return np.where(t_side, 2, 3)
+
+  def _round_of(self, ticks):
+    return np.clip(np.searchsorted(self.round_starts, ticks, side="right") - 1, 0, None)
+
+  def _steamid_str(self, players):
+    return [None if pd.isna(p) else str(self.steamids[int(p)]) for p in players]
+
+  def _name(self, players):
+    return [None if pd.isna(p) else self.names[int(p)] for p in players]
+
+  def parse_header(self):
+    return {"map_name": "de_mirage", "demo_version_name": "valve_demo_2"}
+
+  def parse_ticks(self, wanted_props, ticks=None):
+    ticks = np.arange(self.end_tick + 1) if ticks is None else np.asarray(ticks)
+    tick = np.repeat(ticks, self.players)
+    player = np.tile(np.arange(self.players), len(ticks))
+    data = self._player_props(tick, player, wanted_props)
+    data["tick"] = tick
+    data["steamid"] = self.steamids[player]
+    data["name"] = self.names[player]
+    return pd.DataFrame(data)
+
+  def _player_props(self, tick, player, wanted_props):
+    rounds = self._round_of(tick)
+    team = np.where((player < self.players // 2) == (rounds < self.half), 2, 3)
+    alive = tick < self.death_tick[rounds, player]
+    # still in warmup nobody dies
+    alive |= tick < self.match_start
+
+    data = {}
+    for prop in wanted_props:
+      if prop == "player_steamid":
+        data[prop] = self.steamids[player]
+      elif prop == "player_name":
+        data[prop] = self.names[player]
+      elif prop == "team_num":
+        data[prop] = team
+      elif prop == "is_alive":
+        data[prop] = alive
+      elif prop == "health":
+        data[prop] = np.where(alive, 100 - (tick // 97 + player) % 3 * 17, 0)
+      elif prop in ("X", "Y", "Z"):
+        phase = tick / (TICK_RATE * 4.0) + player * 0.7
+        axis = {"X": np.sin, "Y": np.cos, "Z": lambda v: np.sin(v) * 0.05}[prop]
+        data[prop] = axis(phase) * 900.0 + player * 120.0
+      elif prop == "yaw":
+        data[prop] = (tick * 0.4 + player * 36.0) % 360.0 - 180.0
+      elif prop == "team_rounds_total":
+        # the score follows the players when they swap sides
+        done = np.searchsorted(self.round_ends, tick, side="right")
+        a_won = np.concatenate([[0], np.cumsum(self.group_a_won)])[done]
+        data[prop] = np.where(player < self.players // 2, a_won, done - a_won)
+      else:
+        data[prop] = np.zeros(len(tick), dtype=np.int64)
+    return data
+
+  def _event(self, name):
+    d, h, s, n = self.death_df, self.hurt_df, self.shot_df, self.nade_df
+    if name == "player_death":
+      return pd.DataFrame(
+        {
+          "tick": d["tick"],
+          "user_name": self._name(d["victim"]),
+          "user_steamid": self._steamid_str(d["victim"]),
+          "attacker_name": self._name(d["attacker"]),
+          "attacker_steamid": self._steamid_str(d["attacker"]),
+          "assister_name": self._name(d["assister"]),
+          "assister_steamid": self._steamid_str(d["assister"]),
+          "weapon": d["weapon"],
+          "headshot": d["headshot"],
+        }
+      )
+    if name == "player_hurt":
+      return pd.DataFrame(
+        {
+          "tick": h["tick"],
+          "user_name": self._name(h["victim"]),
+          "attacker_name": self._name(h["attacker"]),
+          "dmg_health": h["dmg_health"],
+          "weapon": h["weapon"],
+        }
+      )
+    if name == "weapon_fire":
+      return pd.DataFrame(
+        {
+          "tick": s["tick"],
+          "user_steamid": self._steamid_str(s["shooter"]),
+          "weapon": "weapon_" + s["weapon"],
+        }
+      )
+    if name == "round_start":
+      return pd.DataFrame({"tick": self.round_starts, "timelimit": 115})
+    if name == "round_end":
+      winner = np.where(self.round_winner == 2, "T", "CT")
+      return pd.DataFrame(
+        {"tick": self.round_ends, "winner": winner, "reason": "t_killed"}
+      )
+    if name == "bomb_planted":
+      ticks = self.round_starts[::3] + 50 * TICK_RATE
+      return pd.DataFrame(
+        {"tick": ticks, "user_steamid": str(self.steamids[0]), "site": 1}
+      )
+    if name == "begin_new_match":
+      return pd.DataFrame({"tick": [self.match_start]})
+    if name == "warmup_period_start":
+      return pd.DataFrame({"tick": [TICK_RATE]})
+    if name == "warmup_period_end":
+      return pd.DataFrame({"tick": [self.warmup_end]})
+    if name in DETONATE_EVENTS:
+      n = n[n["kind"] == DETONATE_EVENTS[name]]
+      return pd.DataFrame(
+        {
+          "tick": n["tick"],
+          "user_steamid": self._steamid_str(n["thrower"]),
+          "entityid": n["entity"],
+          "x": n["entity"] * 1.5,
+          "y": n["entity"] * -0.5,
+          "z": 12.25,
+        }
+      )
+    return pd.DataFrame()
+
+  def parse_event(self, event_name, player=None, other=None):
+    return self._with_props(self._event(event_name), player, other)
+
+  def parse_events(self, event_names, player=None, other=None):
+    out = []
+    for name in event_names:
+      df = self._event(name)
+      if not df.empty:
+        out.append((name, self._with_props(df, player, other)))
+    return out
+
+  def _with_props(self, df, player, other):
+    if df.empty:
+      return df
+    df = df.reset_index(drop=True)
+    if other and "game_time" in other:
+      df = df.assign(game_time=df["tick"] / TICK_RATE)
+    # player props come once per player field of the event, prefixed like it
+    index = {name: i for i, name in enumerate(self.names)}
+    for role in ["user", "attacker"]:
+      if not player or f"{role}_name" not in df.columns:
+        continue
+      who = df[f"{role}_name"].map(index)
+      known = who.notna().to_numpy()
+      props = self._player_props(
+        df["tick"].to_numpy(), who.fillna(0).to_numpy(dtype=np.int64), player
+      )
+      for prop, values in props.items():
+        df[f"{role}_{prop}"] = np.where(known, values, np.nan)
+    return df
+
+  def parse_grenades(self):
+    parts = []
+    for throw, air, entity, thrower, kind in self.flights:
+      t = np.arange(air)
+      parts.append(
+        pd.DataFrame(
+          {
+            "tick": throw + t,
+            "grenade_entity_id": entity,
+            "steamid": self.steamids[thrower],
+            "name": self.names[thrower],
+            "grenade_type": GRENADE_TYPES[kind],
+            "X": t * 4.5,
+            "Y": t * -3.25,
+            "Z": 64.0 + t * (air - t) * 0.01,
+          }
+        )
+      )
+    return pd.concat(parts, ignore_index=True)
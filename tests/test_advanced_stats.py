@@ -0,0 +1,86 @@
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+parser_path = os.path.abspath(
+  os.path.join(os.path.dirname(__file__), "../src/dem_parser")
+)
+sys.path.insert(0, parser_path)
+from advanced_stats import (  # noqa: E402
+  _cap_damage,
+  compute_player_stats,
+  detect_clutches,
+  round_winners,
+)
+
+
+def test_damage_pool_caps_at_100_per_victim_and_round():
+  rounds = np.array([0, 0, 0, 0, 0, 1, 1])
+  victims = np.array(["a", "b", "a", "a", "b", "a", "a"], dtype=object)
+  dmg = np.array([60, 30, 27, 100, 90, 120, 5])
+  # a: 60, 27, then only 13 of the 100 are left and the corpse hit is free
+  # b: 30 then 70 of 90, a new round refills the pool
+  assert _cap_damage(rounds, victims, dmg).tolist() == [60, 30, 27, 13, 70, 100, 0]
+  assert _cap_damage(rounds[:0], victims[:0], dmg[:0]).tolist() == []
+
+
+def test_clutches_follow_the_alive_counts():
+  # t1..t3 on T, c1..c3 on CT, both rounds
+  teams = pd.Series(
+    [2, 2, 2, 3, 3, 3] * 2,
+    index=pd.MultiIndex.from_product(
+      [[0, 1], ["t1", "t2", "t3", "c1", "c2", "c3"]], names=["round", "player_name"]
+    ),
+  )
+  deaths = pd.DataFrame(
+    {
+      "round": [0, 0, 0, 0, 0, 1, 1, 1, 1],
+      "tick": [10, 20, 30, 40, 50, 110, 120, 130, 140],
+      # round 0: t3 is left alone against c2 and c3 and wins, c3 ending up alone
+      # later is no clutch of its own. round 1: c3 loses a 1v3, the unknown
+      # player's death changes nothing
+      "user_name": ["t1", "c1", "t2", "c2", "c3", "c1", "nobody", "c2", "c3"],
+    }
+  )
+  winners = round_winners(
+    pd.DataFrame({"tick": [60, 150], "winner": ["T", "T"]}), np.array([0, 100])
+  )
+  clutches = detect_clutches(deaths, teams, winners)
+  assert clutches.to_dict(orient="records") == [
+    {"round": 0, "name": "t3", "side": 2, "vs": 2, "won": True},
+    {"round": 1, "name": "c3", "side": 3, "vs": 3, "won": False},
+  ]
+  assert round_winners(pd.DataFrame({"tick": [5], "winner": [3]}), [0]).tolist() == [3]
+
+
+def test_trade_kills_need_an_enemy_avenger():
+  states = pd.DataFrame(
+    {
+      "tick": [0] * 6,
+      "player_name": ["t1", "t2", "t3", "c1", "c2", "c3"],
+      "team_num": [2, 2, 2, 3, 3, 3],
+    }
+  )
+  deaths = pd.DataFrame(
+    {
+      "tick": [10, 20, 30, 40, 50, 60],
+      # t2 trades t1 and c2 trades c1. c2 and c3 then die to their teammate c3
+      # and the world, neither of those trades t2 or t3
+      "user_name": ["t1", "c1", "t2", "c2", "t3", "c3"],
+      "attacker_name": ["c1", "t2", "c2", "c3", "c3", None],
+      "assister_name": [None] * 6,
+      "headshot": [False] * 6,
+    }
+  )
+  hurts = pd.DataFrame(
+    columns=["tick", "user_name", "attacker_name", "dmg_health", "weapon"]
+  )
+  stats = compute_player_stats(hurts, deaths, [0], states)
+  trade_kills = {name: s["trade_kills"] for name, s in stats.items()}
+  assert trade_kills == {"c1": 0, "c2": 1, "c3": 0, "t1": 0, "t2": 1, "t3": 0}
+  # the deaths still count as traded for KAST
+  assert [stats[name]["traded_deaths"] for name in ["t1", "t2", "t3"]] == [1, 1, 1]
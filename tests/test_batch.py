@@ -0,0 +1,49 @@
+import os
+import sys
+
+import pytest
+
+parser_path = os.path.abspath(
+  os.path.join(os.path.dirname(__file__), "../src/dem_parser")
+)
+sys.path.insert(0, parser_path)
+from batch import find_demos, run_batch, throughput_summary  # noqa: E402
+
+
+def test_find_demos(tmp_path):
+  for name in ["b.dem", "a.dem", "notes.txt"]:
+    (tmp_path / name).write_text("x")
+  assert find_demos(str(tmp_path)) == [
+    str(tmp_path / "a.dem"),
+    str(tmp_path / "b.dem"),
+  ]
+
+  manifest = tmp_path / "backfill.txt"
+  manifest.write_text("b.dem\n# skipped\n\n/abs/c.dem\n")
+  assert find_demos(str(manifest)) == [str(tmp_path / "b.dem"), "/abs/c.dem"]
+
+
+def test_throughput_summary():
+  mb = 1024 * 1024
+  results = [
+    {"ok": True, "bytes": 100 * mb},
+    {"ok": True, "bytes": 200 * mb},
+    {"ok": False, "bytes": 50 * mb},
+  ]
+  summary = throughput_summary(results, 60.0, 4)
+  assert summary["parsed"] == 2
+  assert summary["failed"] == 1
+  assert summary["demos_per_min"] == 2.0
+  # failed demos don't count towards throughput
+  assert summary["mb_per_s"] == 5.0
+
+
+def test_missing_manifest_entry_fails_alone(tmp_path, capfd):
+  pytest.importorskip("demoparser2")
+  manifest = tmp_path / "backfill.txt"
+  manifest.write_text("gone.dem\n")
+  summary = run_batch(find_demos(str(manifest)), workers=1, keep_demos=True)
+  assert (summary["demos"], summary["failed"]) == (1, 1)
+  # the workers print straight to the inherited stdout
+  out = capfd.readouterr().out
+  assert "DATA_OUTPUT:" in out and "gone.dem" in out
@@ -0,0 +1,98 @@
+import contextlib
+import io
+import json
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+pytest.importorskip("demoparser2")
+
+parser_path = os.path.abspath(
+  os.path.join(os.path.dirname(__file__), "../src/dem_parser")
+)
+sys.path.insert(0, parser_path)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import parser as dem_parser  # noqa: E402
+from binary_timeline import (  # noqa: E402
+  ALIGNMENT,
+  MAGIC,
+  BinaryTimelineWriter,
+  get_binary_path,
+  read_binary_timeline,
+)
+from fake_demoparser import FakeDemoParser  # noqa: E402
+
+
+def test_binary_timeline_matches_the_json_timeline(tmp_path, monkeypatch):
+  monkeypatch.setattr(dem_parser, "OUTPUT_FOLDER", str(tmp_path / "out"))
+  monkeypatch.setattr(dem_parser, "BINARY_TIMELINE", True)
+  # one append per round, so the file is stitched from several windows
+  monkeypatch.setattr(dem_parser, "TICK_WINDOW", "round")
+  monkeypatch.setattr(
+    dem_parser, "DemoParser", lambda path: FakeDemoParser(rounds=4, seed=3)
+  )
+  demo = tmp_path / "match.dem"
+  demo.write_bytes(b"")
+  with contextlib.redirect_stdout(io.StringIO()):
+    json_path = dem_parser.parse_demo(str(demo), keep_demo=True)
+  with open(json_path) as f:
+    timeline = json.load(f)["timeline"]
+
+  binary_path = get_binary_path(json_path)
+  assert not [
+    name for name in os.listdir(os.path.dirname(binary_path)) if ".part" in name
+  ]
+  with open(binary_path, "rb") as f:
+    data = f.read()
+  assert data[:4] == MAGIC
+  header, arrays = read_binary_timeline(binary_path)
+  # the json header is zero padded, every array starts on an 8 byte boundary
+  header_end = 8 + int.from_bytes(data[4:8], "little")
+  data_start = header_end + -header_end % ALIGNMENT
+  assert set(data[header_end:data_start]) <= {0}
+  for name, spec in header["arrays"].items():
+    assert (data_start + spec["offset"]) % ALIGNMENT == 0
+  last = header["arrays"]["g_z"]
+  assert len(data) == data_start + last["offset"] + 4 * last["length"]
+  assert header["ticks"] == len(timeline)
+  assert header["players"] == sum(len(t["p"]) for t in timeline)
+
+  assert arrays["t"].tolist() == [t["t"] for t in timeline]
+  p_start, g_start = arrays["p_start"], arrays["g_start"]
+
+  def rows(prefix, fields, start, i):
+    columns = [arrays[f"{prefix}_{field}"][start[i] : start[i + 1]] for field in fields]
+    # json floats are the float32 values rounded to 2 decimals
+    columns = [
+      np.round(c.astype(float), 2) if c.dtype.kind == "f" else c for c in columns
+    ]
+    return [list(row) for row in zip(*(c.tolist() for c in columns))]
+
+  for i, tick in enumerate(timeline):
+    assert rows("p", ["sid", "hp", "x", "y", "z", "rot"], p_start, i) == tick["p"]
+    assert rows("g", ["eid", "sid", "wep", "x", "y", "z"], g_start, i) == tick.get(
+      "g", []
+    )
+  assert header["grenades"] > 0
+
+
+def test_aborted_binary_timeline_leaves_nothing(tmp_path):
+  path = str(tmp_path / "a.timeline.bin")
+  df = pd.DataFrame(
+    {
+      "tick": [1, 1, 2],
+      "sid": [0, 1, 0],
+      "hp": [100, 100, 90],
+      "x": [0.0, 1.0, 2.0],
+      "y": [0.0, 1.0, 2.0],
+      "z": [0.0, 0.0, 0.0],
+      "rot": [0, 90, 180],
+    }
+  )
+  with pytest.raises(RuntimeError), BinaryTimelineWriter(path) as writer:
+    writer.append(df)
+    raise RuntimeError("parse failed")
+  assert os.listdir(tmp_path) == []
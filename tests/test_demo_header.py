@@ -0,0 +1,42 @@
+import os
+import struct
+import sys
+
+parser_path = os.path.abspath(
+  os.path.join(os.path.dirname(__file__), "../src/dem_parser")
+)
+sys.path.insert(0, parser_path)
+from demo_header import DEMO_MAGIC, read_playback_ticks  # noqa: E402
+
+
+def varint(value):
+  out = b""
+  while True:
+    byte = value & 0x7F
+    value >>= 7
+    if not value:
+      return out + bytes([byte])
+    out += bytes([byte | 0x80])
+
+
+def write_demo(path, command=2, playback_ticks=183456, magic=DEMO_MAGIC):
+  # playback_time (fixed32) goes first so the field walk has something to skip
+  message = b"\x0d" + struct.pack("<f", 2866.5) + b"\x10" + varint(playback_ticks)
+  frame = varint(command) + varint(playback_ticks) + varint(len(message)) + message
+  body = b"\x00" * 300
+  offset = 16 + len(body)
+  path.write_bytes(magic + struct.pack("<ii", offset, 0) + body + frame)
+  return str(path)
+
+
+def test_read_playback_ticks(tmp_path):
+  assert read_playback_ticks(write_demo(tmp_path / "a.dem")) == 183456
+
+
+def test_unreadable_header_falls_back(tmp_path):
+  # compressed frame, other demo format, junk file, missing file
+  assert read_playback_ticks(write_demo(tmp_path / "c.dem", command=2 | 64)) is None
+  assert read_playback_ticks(write_demo(tmp_path / "d.dem", magic=b"HL2DEMO\0")) is None
+  (tmp_path / "junk.dem").write_bytes(DEMO_MAGIC + b"\xff" * 8)
+  assert read_playback_ticks(str(tmp_path / "junk.dem")) is None
+  assert read_playback_ticks(str(tmp_path / "missing.dem")) is None
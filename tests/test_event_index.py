@@ -0,0 +1,41 @@
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("numpy")
+
+parser_path = os.path.abspath(
+  os.path.join(os.path.dirname(__file__), "../src/dem_parser")
+)
+sys.path.insert(0, parser_path)
+from event_index import EventIndex  # noqa: E402
+
+
+def test_scrub_with_event_index():
+  events = {
+    "weapon_fire": [{"t": t} for t in [1000, 1000, 1030, 1100, 1500, 2999]],
+    "round_start": [{"t": t} for t in [400, 1000, 2000]],
+    "bomb_planted": [],
+  }
+  index = EventIndex(1000, 3000, interval=12, round_starts=[1000, 2000])
+  for name, records in events.items():
+    index.add(name, [r["t"] for r in records])
+  data = index.to_dict()
+
+  # buckets line up with the sampled ticks, every 5th one at interval 12
+  assert data["step"] == 60
+  assert data["offsets"]["weapon_fire"][:3] == [0, 3, 4]
+  assert data["round_offsets"] == {
+    "weapon_fire": [0, 5],
+    "round_start": [1, 2],
+    "bomb_planted": [0, 0],
+  }
+
+  for tick in range(1000, 3001, 7):
+    bucket = (tick - data["start_tick"]) // data["step"]
+    for name, records in events.items():
+      i = data["offsets"][name][bucket]
+      while i < len(records) and records[i]["t"] <= tick:
+        i += 1
+      assert i == sum(r["t"] <= tick for r in records)
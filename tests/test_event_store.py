@@ -0,0 +1,62 @@
+import contextlib
+import io
+import os
+import sys
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+parser_path = os.path.abspath(
+  os.path.join(os.path.dirname(__file__), "../src/dem_parser")
+)
+sys.path.insert(0, parser_path)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from event_store import CountingParser, EventStore  # noqa: E402
+from fake_demoparser import FakeDemoParser  # noqa: E402
+
+
+class BrokenEventsParser(FakeDemoParser):
+  def parse_events(self, event_names, player=None, other=None):
+    raise RuntimeError("corrupt event stream")
+
+
+def test_failed_pass_fails_every_call():
+  parser = CountingParser(BrokenEventsParser(rounds=2))
+  events = EventStore(parser, ["round_start", "player_death"])
+  with pytest.raises(RuntimeError, match="corrupt"):
+    events.get("round_start")
+  # a caller that swallowed the first error doesn't turn it into empty frames
+  with pytest.raises(RuntimeError, match="corrupt"):
+    events.get("player_death")
+  with pytest.raises(RuntimeError, match="corrupt"):
+    events.items(["round_start"])
+  assert parser.passes == {"parse_events": 1}
+
+
+def test_one_pass_serves_every_stage():
+  parser = CountingParser(FakeDemoParser(rounds=2))
+  events = EventStore(parser, ["round_start", "player_death", "round_start"])
+  assert events.event_names == ["round_start", "player_death"]
+  assert len(events.get("round_start")) == 2
+  assert [name for name, _ in events.items(["player_death"])] == ["player_death"]
+  with pytest.raises(KeyError):
+    events.get("bomb_planted")
+  assert parser.passes == {"parse_events": 1}
+
+
+def test_broken_events_fail_the_parse(tmp_path, monkeypatch):
+  pytest.importorskip("demoparser2")
+  import parser as dem_parser
+
+  monkeypatch.setattr(dem_parser, "OUTPUT_FOLDER", str(tmp_path / "out"))
+  monkeypatch.setattr(
+    dem_parser, "DemoParser", lambda path: BrokenEventsParser(rounds=2)
+  )
+  demo = tmp_path / "match.dem"
+  demo.write_bytes(b"")
+  with pytest.raises(RuntimeError), contextlib.redirect_stdout(io.StringIO()):
+    dem_parser.parse_demo(str(demo))
+  # nothing half written is left behind and the demo is kept for a retry
+  assert demo.exists()
+  assert not os.path.exists(dem_parser.get_absolute_path("match.dem.json"))
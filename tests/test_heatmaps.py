@@ -0,0 +1,86 @@
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../src"))
+sys.path.insert(0, os.path.join(src_path, "dem_parser"))
+from heatmaps import HeatmapBuilder, get_heatmap_path  # noqa: E402
+
+
+def cell_counts(heatmaps, layer):
+  # {(x, y) cell corner: count} of the non empty cells of a saved layer
+  origin_x, origin_y = heatmaps["origin"]
+  grid = np.array(heatmaps["layers"][layer])
+  return {
+    (origin_x + c * heatmaps["cell"], origin_y + r * heatmaps["cell"]): int(grid[r, c])
+    for r, c in zip(*np.nonzero(grid))
+  }
+
+
+def test_heatmap_grids(tmp_path):
+  builder = HeatmapBuilder(interval=12, cell=64)
+  # two windows of raw tick rows, the dead and the unknown team are skipped
+  builder.add_ticks(
+    pd.DataFrame(
+      {
+        "health": [100, 100, 0, 80],
+        "team_num": [2, 3, 2, 0],
+        "X": [10.0, -70.0, 10.0, 10.0],
+        "Y": [20.0, 130.0, 20.0, 20.0],
+      }
+    )
+  )
+  builder.add_ticks(
+    pd.DataFrame({"health": [50], "team_num": [2], "X": [63.9], "Y": [0.0]})
+  )
+  builder.add_ticks(pd.DataFrame())
+  builder.add_deaths(
+    pd.DataFrame(
+      {
+        "tick": [50, 500, 600],
+        "attacker_X": [0.0, 200.0, np.nan],
+        "attacker_Y": [0.0, 200.0, np.nan],
+        "attacker_team_num": [3, 3, np.nan],
+        "user_X": [0.0, -10.0, 5.0],
+        "user_Y": [0.0, -10.0, 5.0],
+        "user_team_num": [2, 2, 3],
+      }
+    ),
+    start_tick=100,
+    end_tick=1000,
+  )
+
+  path = builder.save(str(tmp_path / "a.dem.json"))
+  assert path == get_heatmap_path(str(tmp_path / "a.dem.json"))
+  heatmaps = json.loads(open(path).read())
+
+  # cropped to the cells that were hit, x -128..256 and y -64..256
+  assert heatmaps["origin"] == [-128, -64]
+  assert heatmaps["shape"] == [5, 6]
+  assert cell_counts(heatmaps, "occupancy_t") == {(0, 0): 2}
+  assert cell_counts(heatmaps, "occupancy_ct") == {(-128, 128): 1}
+  # the warmup death at tick 50 is outside the match
+  assert cell_counts(heatmaps, "kills_ct") == {(192, 192): 1}
+  assert cell_counts(heatmaps, "kills_t") == {}
+  assert cell_counts(heatmaps, "deaths_t") == {(-64, -64): 1}
+  assert cell_counts(heatmaps, "deaths_ct") == {(0, 0): 1}
+
+
+def test_get_heatmaps_endpoint(tmp_path):
+  pytest.importorskip("fastapi")
+  sys.path.insert(0, src_path)
+  import server
+  from fastapi import HTTPException
+
+  json_path = str(tmp_path / "a.dem.json")
+  with pytest.raises(HTTPException):
+    asyncio.run(server.get_heatmaps(json_path))
+  HeatmapBuilder(interval=12).save(json_path)
+  response = asyncio.run(server.get_heatmaps(json_path))
+  assert response.path == get_heatmap_path(json_path)
@@ -0,0 +1,262 @@
+import asyncio
+import os
+import sys
+from datetime import datetime, timezone
+
+import pytest
+
+src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../src"))
+sys.path.insert(0, src_path)
+from job_store import JobStore  # noqa: E402
+
+
+def test_job_store_persists_and_indexes(tmp_path):
+  path = str(tmp_path / "jobs.sqlite3")
+
+  async def fill():
+    store = JobStore(path)
+    await store.open()
+    await store.put("job_a", {"stage": "watcher", "match_code": "CSGO-a"})
+    await store.put(
+      "Parser_a", {"stage": "parser", "match_code": "CSGO-a", "job_id": "job_a"}
+    )
+    await store.put("Parser_b", {"stage": "parser", "match_code": "CSGO-b"})
+    assert await store.update("job_a", demo_id=7) == {
+      "stage": "watcher",
+      "match_code": "CSGO-a",
+      "demo_id": 7,
+    }
+    assert await store.update("missing", demo_id=7) is None
+    await store.close()
+
+  async def reopen():
+    # a new store on the same file, like a restarted orchestrator
+    store = JobStore(path)
+    await store.open()
+    watchers = await store.find(stage="watcher", match_code="CSGO-a")
+    assert watchers == [
+      ("job_a", {"stage": "watcher", "match_code": "CSGO-a", "demo_id": 7})
+    ]
+    assert [name for name, _ in await store.find(job_id="job_a")] == [
+      "Parser_a",
+      "job_a",
+    ]
+    assert [name for name, _ in await store.find(stage="parser")] == [
+      "Parser_a",
+      "Parser_b",
+    ]
+    assert (await store.pop("Parser_b"))["match_code"] == "CSGO-b"
+    assert await store.pop("Parser_b") == {}
+    with pytest.raises(ValueError):
+      await store.find(demo_id=7)
+    await store.close()
+
+  asyncio.run(fill())
+  asyncio.run(reopen())
+  # asyncpg takes numbered placeholders
+  assert JobStore(pool=object())._sql("a = ? AND b = ?") == "a = $1 AND b = $2"
+
+
+def test_concurrent_updates_all_land(tmp_path):
+  async def run():
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    await store.open()
+    for i in range(20):
+      await store.put(f"job_{i}", {"stage": "watcher"})
+      # the transcriber and the replay parse finish together
+      await asyncio.gather(
+        store.update(f"job_{i}", transcript_done=True),
+        store.update(f"job_{i}", replay_done=True),
+        store.update(f"job_{i}", demo_id=i),
+      )
+      assert await store.get(f"job_{i}") == {
+        "stage": "watcher",
+        "transcript_done": True,
+        "replay_done": True,
+        "demo_id": i,
+      }
+    # only one of two racing pops gets the task
+    popped = await asyncio.gather(store.pop("job_0"), store.pop("job_0"))
+    assert sorted(map(bool, popped)) == [False, True]
+    assert store.name_locks == {}
+    await store.close()
+
+  asyncio.run(run())
+
+
+def test_orchestrator_resumes_jobs(tmp_path, monkeypatch):
+  pytest.importorskip("fastapi")
+  import server
+
+  store = JobStore(str(tmp_path / "jobs.sqlite3"))
+  monkeypatch.setattr(server, "job_store", store)
+  dispatched, launched, downloads = [], [], []
+
+  async def dispatch(demo_path, match_code, fetch_time, task_name):
+    dispatched.append((task_name, demo_path))
+
+  async def launch(cmd, task_name):
+    launched.append((task_name, cmd))
+
+  async def download(match_code):
+    downloads.append(match_code)
+
+  monkeypatch.setattr(server, "dispatch_parser", dispatch)
+  monkeypatch.setattr(server, "launch_subprocess", launch)
+  monkeypatch.setattr(server, "send_via_pipe", download)
+  demo = tmp_path / "a.dem"
+  demo.write_text("x")
+
+  async def run():
+    await store.open()
+    for name, match_code in [("job_a", "CSGO-a"), ("job_b", "CSGO-b")]:
+      await store.put(
+        name, {"stage": "watcher", "match_code": match_code, "demo_id": None}
+      )
+    await store.put("job_c", {"stage": "watcher", "match_code": "CSGO-c", "demo_id": 3})
+    await store.put(
+      "job_d", {"stage": "watcher", "match_code": "CSGO-d", "demo_id": None}
+    )
+    await store.put("Debug_Download_$c", {"stage": "debug_download"})
+
+    # job_a's demo came in while the orchestrator was up, found by match_code
+    event = {
+      "type": "download_complete",
+      "payload": {"demo_path": str(demo), "match_code": "CSGO-a", "fetch_time": "t"},
+    }
+    await server.handle_subprocess_event(event, "Downloader")
+    assert dispatched == [("Parser_SGO-a", str(demo))]
+    assert (await store.get("Parser_SGO-a"))["job_id"] == "job_a"
+
+    # job_c's transcriber and job_d's parse were running, job_d's demo is gone
+    await store.put(
+      "Transcriber_job_c",
+      {"stage": "transcriber", "job_id": "job_c", "cmd": ["python", "t.py"]},
+    )
+    await store.put(
+      "Parser_d",
+      {"stage": "parser", "job_id": "job_d", "demo_path": str(tmp_path / "d.dem")},
+    )
+
+    dispatched.clear()
+    await server.resume_jobs()
+    assert dispatched == [("Parser_SGO-a", str(demo))]
+    assert launched == [("Transcriber_job_c", ["python", "t.py"])]
+    # job_b never got its demo, job_a and job_c are waiting on their tasks
+    assert downloads == ["CSGO-b"]
+    remaining = [name for name, _ in await store.find()]
+    assert sorted(remaining) == [
+      "Parser_SGO-a",
+      "Transcriber_job_c",
+      "job_a",
+      "job_b",
+      "job_c",
+    ]
+    await store.close()
+
+  asyncio.run(run())
+
+
+class FakePool:
+  """Just enough of an asyncpg pool for check_replay_watcher."""
+
+  def __init__(self):
+    self.replays = []
+
+  def acquire(self):
+    return self
+
+  async def __aenter__(self):
+    return self
+
+  async def __aexit__(self, *exc):
+    return False
+
+  async def fetchrow(self, query, *args):
+    now = datetime.now(timezone.utc)
+    if "FROM audios" in query:
+      return {"creation_time": now, "latency_ms": 0}
+    return {"fetch_time": now, "length_ticks": 6400}
+
+  async def execute(self, query, *args):
+    self.replays.append(args)
+
+
+@pytest.mark.parametrize("replay_ok", [True, False])
+def test_watcher_waits_for_the_replay_parse(tmp_path, monkeypatch, replay_ok):
+  pytest.importorskip("fastapi")
+  import server
+
+  store = JobStore(str(tmp_path / "jobs.sqlite3"))
+  pool = FakePool()
+  monkeypatch.setattr(server, "job_store", store)
+  monkeypatch.setattr(server, "db_pool", pool)
+  monkeypatch.setattr(server, "PARSER_META_FIRST", True)
+  launched, dispatched = [], []
+
+  async def launch(cmd, task_name):
+    launched.append(task_name)
+
+  async def dispatch(demo_path, match_code, fetch_time, task_name):
+    dispatched.append(task_name)
+
+  async def insert(record, event_type):
+    return 7
+
+  monkeypatch.setattr(server, "launch_subprocess", launch)
+  monkeypatch.setattr(server, "dispatch_parser", dispatch)
+  monkeypatch.setattr(server, "insert_into_db", insert)
+
+  async def event(event_type, task_name, **payload):
+    await server.handle_subprocess_event(
+      {"type": event_type, "payload": payload}, task_name
+    )
+
+  async def run():
+    await store.open()
+    await store.put(
+      "job_a",
+      {
+        "stage": "watcher",
+        "match_code": "CSGO-a",
+        "replay_name": "a",
+        "audio_id": 3,
+        "demo_id": None,
+        "transcript_done": False,
+        "replay_done": False,
+        "audio_file_path": "a.wav",
+      },
+    )
+    await event(
+      "download_complete",
+      "Downloader",
+      demo_path=str(tmp_path / "a.dem"),
+      match_code="CSGO-a",
+      fetch_time="2026-01-01T00:00:00",
+    )
+    await event("parse_meta_complete", "Meta_SGO-a", map="de_mirage", meta_only=True)
+    await server.finish_task("Meta_SGO-a", 0)
+    assert dispatched == ["Replay_SGO-a"]
+    assert launched == ["Meta_SGO-a", "Transcriber_job_a"]
+    assert (await store.get("Replay_SGO-a"))["job_id"] == "job_a"
+
+    # the transcript is in before the replay file is written
+    await event("transcribe_complete", "Transcriber_job_a", filepath="a.json")
+    await server.finish_task("Transcriber_job_a", 0)
+    assert (await store.get("job_a"))["transcript_done"]
+    assert pool.replays == []
+
+    await event("parse_meta_complete", "Replay_SGO-a", file_path="a.dem.json")
+    if replay_ok:
+      await server.finish_task("Replay_SGO-a", 0)
+      # a second check of the finished watcher doesn't insert it again
+      await server.check_replay_watcher("job_a")
+      assert [args[:3] for args in pool.replays] == [(7, 3, "a")]
+    else:
+      await event("error", "Replay_SGO-a", message="Parse failed: boom")
+      await server.finish_task("Replay_SGO-a", 1)
+      assert pool.replays == []
+    assert await store.find() == []
+    await store.close()
+
+  asyncio.run(run())
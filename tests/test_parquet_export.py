@@ -0,0 +1,72 @@
+import contextlib
+import io
+import json
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("pandas")
+pytest.importorskip("demoparser2")
+ds = pytest.importorskip("pyarrow.dataset")
+
+parser_path = os.path.abspath(
+  os.path.join(os.path.dirname(__file__), "../src/dem_parser")
+)
+sys.path.insert(0, parser_path)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import parser as dem_parser  # noqa: E402
+from fake_demoparser import FakeDemoParser  # noqa: E402
+
+
+def test_parquet_export_across_matches(tmp_path, monkeypatch):
+  root = tmp_path / "parquet"
+  monkeypatch.setattr(dem_parser, "OUTPUT_FOLDER", str(tmp_path / "out"))
+  monkeypatch.setattr(dem_parser, "PARQUET_DIR", str(root))
+  # two windows per match, so the tick table gets more than one row group
+  monkeypatch.setattr(dem_parser, "TICK_WINDOW", "round")
+
+  replays = {}
+  for seed, rounds in [(1, 4), (2, 6)]:
+    monkeypatch.setattr(
+      dem_parser, "DemoParser", lambda path: FakeDemoParser(rounds=rounds, seed=seed)
+    )
+    demo = tmp_path / f"match{seed}.dem"
+    demo.write_bytes(b"")
+    with contextlib.redirect_stdout(io.StringIO()):
+      json_path = dem_parser.parse_demo(str(demo), keep_demo=True)
+    replays[f"match{seed}"] = json.loads(open(json_path).read())
+
+  def table(name):
+    return ds.dataset(root / name, format="parquet", partitioning="hive").to_table()
+
+  ticks = table("ticks").to_pandas()
+  deaths = table("player_death").to_pandas()
+  players = table("players").to_pandas()
+  assert set(ticks["map"]) == {"de_mirage"}
+
+  for match, replay in replays.items():
+    # same rows as the replay timeline, in the same order
+    rows = ticks[ticks["match"] == match]
+    timeline = [[t["t"], *p[:2]] for t in replay["timeline"] for p in t["p"]]
+    assert rows[["tick", "sid", "hp"]].to_numpy().tolist() == timeline
+
+    match_deaths = deaths[deaths["match"] == match]
+    assert match_deaths["tick"].tolist() == [
+      e["t"] for e in replay["events"]["player_death"]
+    ]
+    match_players = players[players["match"] == match].set_index("sid")
+    assert len(match_players) == len(replay["players"])
+    for sid, p in replay["players"].items():
+      assert match_players.loc[int(sid), "steamid"] == p["sid"]
+      assert match_players.loc[int(sid), "kills"] == p["advanced_stats"]["kills"]
+
+  # a cross match question, kills per steamid, without touching the json
+  kills = deaths.merge(
+    players[["match", "sid", "steamid"]],
+    left_on=["match", "att"],
+    right_on=["match", "sid"],
+  )
+  per_player = kills.groupby("steamid").size()
+  assert per_player.sum() == (deaths["att"] >= 0).sum()
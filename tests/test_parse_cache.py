@@ -0,0 +1,70 @@
+import contextlib
+import io
+import json
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("pandas")
+pytest.importorskip("demoparser2")
+
+parser_path = os.path.abspath(
+  os.path.join(os.path.dirname(__file__), "../src/dem_parser")
+)
+sys.path.insert(0, parser_path)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import parse_cache  # noqa: E402
+import parser as dem_parser  # noqa: E402
+from fake_demoparser import FakeDemoParser  # noqa: E402
+
+
+def run_parse(demo_path):
+  out = io.StringIO()
+  with contextlib.redirect_stdout(out):
+    json_path = dem_parser.parse_demo(str(demo_path), keep_demo=True)
+  events = [
+    json.loads(line[len("DATA_OUTPUT:") :])
+    for line in out.getvalue().splitlines()
+    if line.startswith("DATA_OUTPUT:")
+  ]
+  return json_path, {e["type"]: e["payload"] for e in events}
+
+
+def test_repeated_parse_hits_cache(tmp_path, monkeypatch):
+  parses = []
+
+  def fake_demoparser(path):
+    parses.append(path)
+    return FakeDemoParser(rounds=4, seed=1)
+
+  monkeypatch.setattr(dem_parser, "DemoParser", fake_demoparser)
+  monkeypatch.setattr(dem_parser, "OUTPUT_FOLDER", str(tmp_path / "out"))
+  monkeypatch.setattr(dem_parser, "PARSE_CACHE_DIR", str(tmp_path / "cache"))
+  monkeypatch.setattr(dem_parser, "ROUND_SEGMENTS", True)
+  demo = tmp_path / "match.dem"
+  demo.write_bytes(b"not a real demo")
+
+  json_path, events = run_parse(demo)
+  files = sorted(os.listdir(tmp_path / "out"))
+  written = {name: (tmp_path / "out" / name).read_bytes() for name in files}
+  assert "parse_profile" in events
+  assert len(parses) == 1
+
+  for name in files:
+    os.remove(tmp_path / "out" / name)
+  cached_path, cached_events = run_parse(demo)
+  # no demoparser at all, same files and the same meta event
+  assert len(parses) == 1
+  assert cached_path == json_path
+  assert cached_events == {"parse_meta_complete": events["parse_meta_complete"]}
+  assert {n: (tmp_path / "out" / n).read_bytes() for n in files} == written
+
+  # a different output config or parser version is a miss
+  monkeypatch.setattr(dem_parser, "POSITION_ENCODING", "delta")
+  run_parse(demo)
+  assert len(parses) == 2
+  monkeypatch.setattr(parse_cache, "PARSER_VERSION", parse_cache.PARSER_VERSION + 1)
+  run_parse(demo)
+  assert len(parses) == 3
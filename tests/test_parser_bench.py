@@ -0,0 +1,119 @@
+import contextlib
+import io
+import os
+import sys
+import time
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("pandas")
+pytest.importorskip("demoparser2")
+
+parser_path = os.path.abspath(
+  os.path.join(os.path.dirname(__file__), "../src/dem_parser")
+)
+sys.path.insert(0, parser_path)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import parser as dem_parser  # noqa: E402
+from event_store import CountingParser, EventStore  # noqa: E402
+from fake_demoparser import FakeDemoParser  # noqa: E402
+
+# rounds per synthetic match, 30 is a full match that went to overtime
+MATCH_SIZES = [8, 16, 30]
+STAGES = [
+  "get_match_metadata",
+  "calculate_advanced_stats",
+  "process_ticks",
+  "parse_game_events",
+]
+
+
+def run_stages(rounds, players=10, seed=1):
+  """Runs the parser stages on one synthetic match, returns timings and outputs."""
+  parser = CountingParser(FakeDemoParser(rounds=rounds, players=players, seed=seed))
+  p = dem_parser
+  events = EventStore(
+    parser, p.GAME_EVENTS + p.STATS_EVENTS + p.META_EVENTS, p.EVENT_PROPS
+  )
+  timings = {}
+
+  def timed(stage, fn):
+    start = time.perf_counter()
+    # the stages print their progress, keep the table readable
+    with contextlib.redirect_stdout(io.StringIO()):
+      result = fn()
+    timings[stage] = time.perf_counter() - start
+    return result
+
+  # no demo path, so the end tick comes from the full tick scan like a
+  # demo without a readable file info frame
+  metadata = timed("get_match_metadata", lambda: p.get_match_metadata(parser, events))
+  start_tick, end_tick = metadata[:2]
+  stats = timed(
+    "calculate_advanced_stats",
+    lambda: p.calculate_advanced_stats(parser, events, start_tick, end_tick),
+  )
+
+  def ticks():
+    # the timeline is lazy, drain it so the fetch and the cleanup are timed
+    timeline, player_lookup, steamid_map = p.process_ticks(parser, start_tick, end_tick)
+    return list(timeline), player_lookup, steamid_map
+
+  timeline, player_lookup, steamid_map = timed("process_ticks", ticks)
+  events_data = timed(
+    "parse_game_events", lambda: p.parse_game_events(events, start_tick, steamid_map)
+  )
+
+  outputs = {
+    "metadata": metadata,
+    "stats": stats,
+    "timeline": timeline,
+    "players": player_lookup,
+    "events": events_data,
+    "passes": parser.passes,
+  }
+  return timings, outputs
+
+
+def format_table(results):
+  lines = [f"{'rounds':>6} " + " ".join(f"{s:>24}" for s in STAGES)]
+  for rounds, timings in results:
+    lines.append(f"{rounds:>6} " + " ".join(f"{timings[s]:>23.3f}s" for s in STAGES))
+  return "\n".join(lines)
+
+
+@pytest.fixture(scope="module")
+def bench_results():
+  return [(rounds, run_stages(rounds)) for rounds in MATCH_SIZES]
+
+
+def test_parser_stages_on_synthetic_matches(bench_results):
+  for rounds, (_, out) in bench_results:
+    start_tick, end_tick, map_name, winner, score_t, score_ct = out["metadata"][:6]
+    assert map_name == "de_mirage"
+    assert score_t + score_ct == rounds
+    assert winner == (2 if score_t > score_ct else 3 if score_ct > score_t else 0)
+
+    assert len(out["players"]) == 10
+    assert set(out["stats"]) == {p["name"] for p in out["players"].values()}
+    assert all(s["rounds_played"] == rounds for s in out["stats"].values())
+
+    wanted = dem_parser.get_wanted_ticks(start_tick, end_tick)
+    assert [t["t"] for t in out["timeline"]] == list(wanted)
+    assert len(out["events"]["round_start"]) == rounds
+    # one events pass shared by every stage
+    assert out["passes"]["parse_events"] == 1
+
+
+def test_parser_benchmark(bench_results):
+  # timings are printed (pytest -s) rather than asserted, they depend on the box
+  print(f"\n{format_table([(r, timings) for r, (timings, _) in bench_results])}")
+  for _, (timings, _) in bench_results:
+    assert set(timings) == set(STAGES)
+
+
+if __name__ == "__main__":
+  # python tests/test_parser_bench.py [rounds ...]
+  sizes = [int(a) for a in sys.argv[1:]] or MATCH_SIZES
+  print(format_table([(rounds, run_stages(rounds)[0]) for rounds in sizes]))
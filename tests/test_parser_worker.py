@@ -0,0 +1,115 @@
+import asyncio
+import json
+import os
+import sys
+import textwrap
+
+import pytest
+
+src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../src"))
+parser_path = os.path.join(src_path, "dem_parser")
+sys.path.insert(0, parser_path)
+from worker import run_worker  # noqa: E402
+
+
+def data_outputs(text):
+  prefix = "DATA_OUTPUT:"
+  return [
+    json.loads(line[len(prefix) :])
+    for line in text.splitlines()
+    if line.startswith(prefix)
+  ]
+
+
+def test_worker_runs_jobs_until_eof(tmp_path, capsys):
+  demo = tmp_path / "a.dem"
+  demo.write_text("x")
+  parsed = []
+
+  def parse_demo(path):
+    parsed.append(path)
+    if len(parsed) == 2:
+      raise RuntimeError("corrupt demo")
+
+  jobs = [
+    json.dumps({"demo_path": str(demo), "match_code": "CSGO-1"}),
+    "",
+    json.dumps({"demo_path": str(tmp_path / "missing.dem")}),
+    json.dumps({"demo_path": str(demo)}),
+  ]
+  run_worker(parse_demo, jobs, max_jobs=0)
+
+  events = [
+    (e["type"], e["payload"].get("ok")) for e in data_outputs(capsys.readouterr().out)
+  ]
+  assert parsed == [str(demo), str(demo)]
+  assert events == [
+    ("parse_job_done", True),
+    ("error", None),
+    ("parse_job_done", False),
+    ("error", None),
+    ("parse_job_done", False),
+  ]
+
+
+def test_worker_retires_after_max_jobs(tmp_path, capsys):
+  demo = tmp_path / "a.dem"
+  demo.write_text("x")
+  jobs = [json.dumps({"demo_path": str(demo)})] * 3
+  run_worker(lambda path: None, jobs, max_jobs=2)
+
+  done = [e["payload"] for e in data_outputs(capsys.readouterr().out)]
+  assert [d["retiring"] for d in done] == [False, True]
+
+
+def test_pool_routes_events_to_job_tasks(tmp_path, monkeypatch):
+  pytest.importorskip("fastapi")
+  sys.path.insert(0, src_path)
+  import server
+
+  script = tmp_path / "fake_parser.py"
+  script.write_text(
+    textwrap.dedent(
+      f"""
+      import json, sys
+      sys.path.insert(0, {parser_path!r})
+      from worker import run_worker
+
+      def parse_demo(path):
+        event = {{"type": "parse_meta_complete", "payload": {{"file_path": path}}}}
+        print("DATA_OUTPUT:" + json.dumps(event), flush=True)
+
+      run_worker(parse_demo, max_jobs=2)
+      """
+    )
+  )
+  demos = []
+  for i in range(3):
+    demo = tmp_path / f"{i}.dem"
+    demo.write_text("x")
+    demos.append(str(demo))
+
+  received = []
+  finished = []
+
+  async def handle(event, task_name):
+    received.append((task_name, event["payload"]["file_path"]))
+
+  async def finish(task_name, returncode):
+    finished.append((task_name, returncode))
+
+  monkeypatch.setattr(server, "PARSER_SCRIPT", str(script))
+  monkeypatch.setattr(server, "handle_subprocess_event", handle)
+  monkeypatch.setattr(server, "finish_task", finish)
+
+  async def run():
+    pool = server.ParserWorkerPool(2)
+    pool.start()
+    for i, demo in enumerate(demos):
+      await pool.submit(demo, f"CSGO-{i}", "now", f"Parser_{i}")
+    await pool.queue.join()
+    await pool.stop()
+
+  asyncio.run(run())
+  assert sorted(received) == [(f"Parser_{i}", demo) for i, demo in enumerate(demos)]
+  assert sorted(finished) == [(f"Parser_{i}", 0) for i in range(3)]
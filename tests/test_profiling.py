@@ -0,0 +1,46 @@
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+
+src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../src"))
+sys.path.insert(0, os.path.join(src_path, "dem_parser"))
+from profiling import ParseProfiler  # noqa: E402
+
+
+def test_profiler_stages_and_counts():
+  profiler = ParseProfiler()
+  with profiler.stage("metadata"):
+    sum(range(10000))
+  with pytest.raises(ValueError), profiler.stage("timeline"):
+    raise ValueError("stage failed")
+
+  assert list(profiler.counted(iter("abc"), "timeline_entries")) == ["a", "b", "c"]
+  profiler.count("players", 10)
+
+  payload = profiler.event(demo="a.dem")["payload"]
+  assert payload["demo"] == "a.dem"
+  assert [s["stage"] for s in payload["stages"]] == ["metadata", "timeline"]
+  assert payload["counts"] == {"timeline_entries": 3, "players": 10}
+  assert payload["wall_s"] >= payload["stages"][0]["wall_s"] >= 0
+  if sys.platform != "win32":
+    assert payload["peak_rss_mb"] > 0
+
+
+def test_orchestrator_persists_profile(tmp_path, monkeypatch):
+  pytest.importorskip("fastapi")
+  sys.path.insert(0, src_path)
+  import server
+
+  profile_path = tmp_path / "profiles.jsonl"
+  monkeypatch.setattr(server, "PARSE_PROFILE_PATH", str(profile_path))
+  event = ParseProfiler().event(demo="a.dem")
+  for _ in range(2):
+    asyncio.run(server.handle_subprocess_event(event, "Parser_abcde"))
+
+  records = [json.loads(line) for line in profile_path.read_text().splitlines()]
+  assert len(records) == 2
+  assert records[0]["task"] == "Parser_abcde"
+  assert records[0]["demo"] == "a.dem"
@@ -0,0 +1,99 @@
+import json
+import os
+import sys
+import tracemalloc
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+parser_path = os.path.abspath(
+  os.path.join(os.path.dirname(__file__), "../src/dem_parser")
+)
+sys.path.insert(0, parser_path)
+from replay_writer import ReplayWriter  # noqa: E402
+from timeline import iter_timeline  # noqa: E402
+
+N_PLAYERS = 10
+N_TICKS = 10_000  # 100k player rows
+# the materialized timeline alone is ~27 MB of python objects for this frame
+MEMORY_CEILING = 8 * 1024 * 1024
+
+
+def synthetic_tick_frame():
+  ticks = np.arange(N_TICKS) * 12
+  rng = np.random.default_rng(0)
+  df = pd.DataFrame(
+    {
+      "tick": np.repeat(ticks, N_PLAYERS),
+      "sid": np.tile(np.arange(N_PLAYERS), N_TICKS),
+      "hp": rng.integers(0, 101, N_TICKS * N_PLAYERS),
+      "x": rng.uniform(-3000, 3000, N_TICKS * N_PLAYERS).round(2),
+      "y": rng.uniform(-3000, 3000, N_TICKS * N_PLAYERS).round(2),
+      "z": rng.uniform(-500, 500, N_TICKS * N_PLAYERS).round(2),
+      "rot": rng.integers(-180, 180, N_TICKS * N_PLAYERS),
+    }
+  )
+  g_ticks = ticks[::7]
+  g_df = pd.DataFrame(
+    {
+      "tick": g_ticks,
+      "eid": np.arange(len(g_ticks)),
+      "sid": np.arange(len(g_ticks)) % N_PLAYERS,
+      "wep": np.arange(len(g_ticks)) % 6,
+      "x": rng.uniform(-3000, 3000, len(g_ticks)).round(2),
+      "y": rng.uniform(-3000, 3000, len(g_ticks)).round(2),
+      "z": rng.uniform(-500, 500, len(g_ticks)).round(2),
+    }
+  )
+  return df, g_df
+
+
+def write_replay(path, df, g_df):
+  with ReplayWriter(path) as writer:
+    writer.write("meta", {"interval": 12})
+    writer.write("players", {0: {"name": "a"}})
+    writer.write_list("timeline", iter_timeline(df, g_df))
+    writer.write("events", {"round_start": [{"t": 0}]})
+
+
+def test_streamed_replay_matches_json_dump(tmp_path):
+  df, g_df = synthetic_tick_frame()
+  df, g_df = df.head(2000), g_df.head(50)
+  path = str(tmp_path / "replay.json")
+  write_replay(path, df, g_df)
+
+  expected = {
+    "meta": {"interval": 12},
+    "players": {0: {"name": "a"}},
+    "timeline": list(iter_timeline(df, g_df)),
+    "events": {"round_start": [{"t": 0}]},
+  }
+  with open(path) as f:
+    assert f.read() == json.dumps(expected, separators=(",", ":"))
+  assert not os.path.exists(f"{path}.tmp")
+
+
+def test_streamed_replay_memory_ceiling(tmp_path):
+  df, g_df = synthetic_tick_frame()
+  path = str(tmp_path / "replay.json")
+
+  tracemalloc.start()
+  try:
+    write_replay(path, df, g_df)
+    _, peak = tracemalloc.get_traced_memory()
+  finally:
+    tracemalloc.stop()
+
+  assert peak < MEMORY_CEILING, f"streaming peaked at {peak / 1e6:.1f} MB"
+
+
+def test_failed_replay_leaves_no_file(tmp_path):
+  path = str(tmp_path / "replay.json")
+  with pytest.raises(RuntimeError):
+    with ReplayWriter(path) as writer:
+      writer.write("meta", {})
+      raise RuntimeError("parse failed")
+  assert not os.path.exists(path)
+  assert not os.path.exists(f"{path}.tmp")
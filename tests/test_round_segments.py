@@ -0,0 +1,191 @@
+import contextlib
+import io
+import json
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../src"))
+sys.path.insert(0, src_path)
+sys.path.insert(0, os.path.join(src_path, "dem_parser"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from round_segments import RoundSegmentWriter, get_index_path  # noqa: E402
+
+ROUND_STARTS = [1000, 5000, 9000]
+START_TICK, END_TICK = 800, 12000
+
+
+def replay():
+  # keyframe every 40 entries, at 800, 1280, ..., 4640, 5120, ...
+  timeline = [
+    {"t": t, "p": [[0, 100, 1.5, 2.5, 3.5, 90]], **({"k": 1} if i % 40 == 0 else {})}
+    for i, t in enumerate(range(START_TICK, END_TICK + 1, 12))
+  ]
+  events = {
+    "round_start": [{"t": t, "time": "115"} for t in [-500] + ROUND_STARTS],
+    "player_death": [{"t": t, "vic": 1, "att": 0} for t in (1200, 5000, 11000)],
+    "bomb_planted": [],
+  }
+  return timeline, events
+
+
+def write_segments(json_path, encoding=None):
+  timeline, events = replay()
+  with RoundSegmentWriter(
+    json_path, ROUND_STARTS, START_TICK, END_TICK, encoding
+  ) as segments:
+    assert list(segments.tee_timeline(iter(timeline))) == timeline
+    segments.write_events(events)
+  return timeline, events
+
+
+def test_round_segments_roundtrip(tmp_path):
+  json_path = str(tmp_path / "demo.dem.json")
+  timeline, events = write_segments(json_path)
+
+  with open(get_index_path(json_path)) as f:
+    index = json.load(f)
+  with open(tmp_path / index["segments"], "rb") as f:
+    data = f.read()
+
+  assert [(r["start_tick"], r["end_tick"]) for r in index["rounds"]] == [
+    (800, 4999),
+    (5000, 8999),
+    (9000, 12000),
+  ]
+  joined = []
+  deaths = []
+  for r in index["rounds"]:
+    offset, length = r["timeline"]
+    part = json.loads(data[offset : offset + length])
+    assert all(r["start_tick"] <= e["t"] <= r["end_tick"] for e in part)
+    joined += part
+    offset, length = r["events"]
+    deaths += json.loads(data[offset : offset + length]).get("player_death", [])
+  assert joined == timeline
+  assert deaths == events["player_death"]
+
+  # the pre-match round_start lands in round 1
+  offset, length = index["rounds"][0]["events"]
+  assert len(json.loads(data[offset : offset + length])["round_start"]) == 2
+
+
+def test_failed_segments_leave_no_files(tmp_path):
+  json_path = str(tmp_path / "demo.dem.json")
+  with pytest.raises(RuntimeError):
+    with RoundSegmentWriter(json_path, ROUND_STARTS, START_TICK, END_TICK):
+      raise RuntimeError("parse died")
+  assert os.listdir(tmp_path) == []
+
+
+def test_round_endpoints(tmp_path):
+  pytest.importorskip("fastapi")
+  from fastapi.testclient import TestClient
+  from server import app
+
+  json_path = str(tmp_path / "demo.dem.json")
+  timeline, events = write_segments(json_path, encoding="delta")
+  client = TestClient(app)
+
+  response = client.get("/get_round", params={"filepath": json_path, "round_num": 2})
+  assert response.status_code == 200
+  body = response.json()
+  assert (body["round"], body["start_tick"], body["end_tick"]) == (2, 5000, 8999)
+  assert body["timeline"] == [e for e in timeline if 5000 <= e["t"] <= 8999]
+  assert body["events"] == {
+    "round_start": [events["round_start"][2]],
+    "player_death": [events["player_death"][1]],
+  }
+
+  response = client.get("/get_round", params={"filepath": json_path, "round_num": 4})
+  assert response.status_code == 404
+  response = client.get(
+    "/get_round", params={"filepath": str(tmp_path / "x.json"), "round_num": 1}
+  )
+  assert response.status_code == 404
+
+  # the timeline starts from the start of start_tick's round, events don't
+  response = client.get(
+    "/get_ticks",
+    params={"filepath": json_path, "start_tick": 4900, "end_tick": 5100},
+  )
+  body = response.json()
+  assert body["timeline"][0]["t"] == 800
+  assert body["timeline"] == [e for e in timeline if 800 <= e["t"] <= 5100]
+  assert body["events"] == {
+    "round_start": [events["round_start"][2]],
+    "player_death": [events["player_death"][1]],
+  }
+
+
+def latest_rows(timeline, delta=False):
+  # the last row of every player, with delta encoding decoded first
+  rows, state = {}, {}
+  for entry in timeline:
+    if entry.get("k"):
+      state = {}
+    for sid, *values in entry["p"]:
+      if delta:
+        values = [a + b for a, b in zip(state.get(sid, [0] * 5), values + [0] * 5)]
+        state[sid] = values
+      rows[sid] = values
+  return rows
+
+
+@pytest.mark.parametrize(
+  "compaction, encoding",
+  [("dead", ""), ("dead", "delta"), ("held", ""), ("held", "delta")],
+)
+def test_ticks_start_at_the_round_start(tmp_path, monkeypatch, compaction, encoding):
+  pytest.importorskip("fastapi")
+  pytest.importorskip("demoparser2")
+  import parser as dem_parser
+
+  from fake_demoparser import FakeDemoParser
+  from fastapi.testclient import TestClient
+  from server import app
+
+  monkeypatch.setattr(dem_parser, "OUTPUT_FOLDER", str(tmp_path / "out"))
+  monkeypatch.setattr(dem_parser, "ROUND_SEGMENTS", True)
+  monkeypatch.setattr(dem_parser, "COMPACTION", compaction)
+  monkeypatch.setattr(dem_parser, "POSITION_ENCODING", encoding)
+  monkeypatch.setattr(dem_parser, "TICK_WINDOW", "round")
+  fake = FakeDemoParser(rounds=3, seed=2)
+  monkeypatch.setattr(dem_parser, "DemoParser", lambda path: fake)
+  demo = tmp_path / "match.dem"
+  demo.write_bytes(b"")
+  with contextlib.redirect_stdout(io.StringIO()):
+    json_path = dem_parser.parse_demo(str(demo), keep_demo=True)
+  with open(json_path) as f:
+    timeline = json.load(f)["timeline"]
+
+  # late in round 2, after the first deaths and the frozen start
+  round_start = int(fake.round_starts[1])
+  start_tick, end_tick = round_start + 90 * 64, round_start + 95 * 64
+  body = (
+    TestClient(app)
+    .get(
+      "/get_ticks",
+      params={"filepath": json_path, "start_tick": start_tick, "end_tick": end_tick},
+    )
+    .json()
+  )
+  assert body["compaction"] == compaction
+  assert body["timeline"][0]["t"] >= round_start
+  assert body["timeline"][0]["t"] < round_start + dem_parser.TICK_INTERVAL
+  # every player, dead ones too, is rebuilt from the range alone
+  delta = encoding == "delta"
+  assert body["timeline"][0].get("k") == (1 if delta else None)
+  assert len(body["timeline"][0]["p"]) == fake.players
+  before = [e for e in timeline if e["t"] <= end_tick]
+  assert latest_rows(body["timeline"], delta) == latest_rows(before, delta)
+
+  # players who died in the round before start_tick have no row in the range
+  # itself, their one dead row comes with the rewind
+  rows = latest_rows(body["timeline"], delta)
+  dead = {sid for sid, values in rows.items() if values[0] == 0}
+  in_range = {p[0] for e in body["timeline"] if e["t"] >= start_tick for p in e["p"]}
+  assert dead - in_range
@@ -0,0 +1,141 @@
+import contextlib
+import io
+import json
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+parser_path = os.path.abspath(
+  os.path.join(os.path.dirname(__file__), "../src/dem_parser")
+)
+sys.path.insert(0, parser_path)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from sampling import ADAPTIVE_POLICY, AdaptiveSampler  # noqa: E402
+from steamids import SteamIdMap  # noqa: E402
+
+BASE = AdaptiveSampler().policy["base_interval"]
+STEAMIDS = [76561198000000001, 76561198000000002]
+
+
+def walk(sid, ticks, x, rot=0, hp=100):
+  return pd.DataFrame(
+    {"tick": ticks, "sid": sid, "hp": hp, "x": x, "y": 0.0, "z": 0.0, "rot": rot}
+  )
+
+
+def kept_ticks(df, sampler=None, fetch=None):
+  sampler = sampler or AdaptiveSampler()
+  df = df.sort_values("tick", kind="stable")
+  return sampler.sample(df, SteamIdMap(STEAMIDS), fetch)
+
+
+def stop_and_kill(ticks):
+  # player 0 walks right and stops dead at tick 204, player 1 stands still
+  x = np.where(ticks < 204, ticks * 2.0, 408.0)
+  hp = np.where(ticks < 300, 100, 40)
+  df = pd.concat([walk(0, ticks, x, hp=hp), walk(1, ticks, 0.0)])
+  return df.sort_values("tick", kind="stable")
+
+
+DEATHS = pd.DataFrame(
+  {
+    "tick": [100],
+    "user_steamid": [str(STEAMIDS[1])],
+    "attacker_steamid": [str(STEAMIDS[0])],
+  }
+)
+
+
+def test_straight_walk_keeps_ends_and_heartbeats():
+  ticks = np.arange(0, 400, BASE)
+  out = kept_ticks(walk(0, ticks, ticks * 1.5))
+  heartbeat = ADAPTIVE_POLICY["max_gap"] // BASE * BASE
+  assert out["tick"].tolist() == list(range(0, 400, heartbeat)) + [ticks[-1]]
+
+
+def test_turns_hp_and_events_are_kept():
+  ticks = np.arange(0, 400, BASE)
+  out = kept_ticks(stop_and_kill(ticks), AdaptiveSampler(DEATHS))
+  p0 = out[out["sid"] == 0]["tick"].tolist()
+  p1 = out[out["sid"] == 1]["tick"].tolist()
+
+  assert 204 in p0  # the corner where the walk stops
+  assert 300 in p0  # hp change
+  radius = ADAPTIVE_POLICY["event_radius"]
+  assert {t for t in ticks if abs(t - 100) <= radius} <= set(p1)
+  assert len(p1) < len(ticks) // 2
+
+  # thinning never reorders what is left
+  assert out["tick"].is_monotonic_increasing
+
+
+def test_kills_and_sharp_bends_are_refined():
+  ticks = np.arange(0, 400, BASE)
+  fetched = []
+
+  def fetch(fine_ticks):
+    fetched.append(fine_ticks)
+    return stop_and_kill(np.asarray(fine_ticks))
+
+  out = kept_ticks(stop_and_kill(ticks), AdaptiveSampler(DEATHS), fetch)
+  p0 = out[out["sid"] == 0]["tick"].tolist()
+  p1 = out[out["sid"] == 1]["tick"].tolist()
+  fine = ADAPTIVE_POLICY["fine_interval"]
+
+  # one extra read, only for ticks between grid samples
+  assert len(fetched) == 1
+  assert not set(fetched[0]) & set(ticks.tolist())
+  # the grid steps on both sides of the stop, and every step near the kill
+  assert set(range(196, 216, fine)) <= set(p0)
+  assert set(range(72, 132, fine)) <= set(p1)
+  assert 160 not in p0 and 160 not in p1
+  assert out["tick"].is_monotonic_increasing
+
+
+def test_gaps_split_runs():
+  # dead (compacted away) between 100 and 300
+  ticks = np.concatenate([np.arange(0, 100, BASE), np.arange(300, 400, BASE)])
+  out = kept_ticks(walk(0, ticks, 0.0))
+  assert {0, 96, 300, 396} <= set(out["tick"].tolist())
+
+
+def test_adaptive_replay_is_smaller_than_the_fixed_grid(tmp_path, monkeypatch):
+  pytest.importorskip("demoparser2")
+  import parser as dem_parser
+  from fake_demoparser import FakeDemoParser
+
+  monkeypatch.setattr(dem_parser, "OUTPUT_FOLDER", str(tmp_path / "out"))
+  monkeypatch.setattr(dem_parser, "TICK_WINDOW", "round")
+  monkeypatch.setattr(
+    dem_parser, "DemoParser", lambda path: FakeDemoParser(rounds=6, seed=1)
+  )
+  demo = tmp_path / "match.dem"
+  demo.write_bytes(b"")
+
+  sizes = {}
+  for mode in ["", "adaptive"]:
+    monkeypatch.setattr(dem_parser, "SAMPLING", mode)
+    with contextlib.redirect_stdout(io.StringIO()):
+      json_path = dem_parser.parse_demo(str(demo), keep_demo=True)
+    with open(json_path) as f:
+      replay = json.load(f)
+    rows = sum(len(t["p"]) for t in replay["timeline"])
+    sizes[mode] = (rows, os.path.getsize(json_path))
+    assert replay["meta"]["interval"] == dem_parser.TICK_INTERVAL
+
+  assert sizes["adaptive"][0] < sizes[""][0]
+  assert sizes["adaptive"][1] < sizes[""][1]
+
+
+def test_held_compaction_rejects_adaptive(tmp_path, monkeypatch):
+  pytest.importorskip("demoparser2")
+  import parser as dem_parser
+
+  monkeypatch.setattr(dem_parser, "SAMPLING", "adaptive")
+  monkeypatch.setattr(dem_parser, "COMPACTION", "held")
+  with pytest.raises(ValueError, match="adaptive"):
+    dem_parser.parse_demo(str(tmp_path / "match.dem"), keep_demo=True)
@@ -0,0 +1,75 @@
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+parser_path = os.path.abspath(
+  os.path.join(os.path.dirname(__file__), "../src/dem_parser")
+)
+sys.path.insert(0, parser_path)
+from steamids import SteamIdMap, to_steamid64  # noqa: E402
+
+A, B, C = 76561198000000001, 76561198000007920, 76561198000015839
+
+
+def check(values, expected, expected_valid):
+  sids, valid = to_steamid64(values)
+  assert sids.dtype == np.int64
+  assert sids.tolist() == expected
+  assert valid.tolist() == expected_valid
+
+
+def test_integer_ids():
+  check(pd.Series([A, B], dtype=np.uint64), [A, B], [True, True])
+  check([A, B], [A, B], [True, True])
+
+
+def test_float_column_with_missing_values():
+  # numeric columns get NaN for a missing player, never a steamid above 2**53
+  check(pd.Series([1.0, np.nan, 3.0]), [1, 0, 3], [True, False, True])
+
+
+def test_string_ids():
+  check(pd.Series([str(A), str(B)]), [A, B], [True, True])
+
+
+def test_float_formatted_string_ids():
+  check(pd.Series([f"{A}.0", str(B)]), [A, B], [True, True])
+
+
+def test_junk_and_missing_string_ids():
+  check(
+    pd.Series([str(A), "BOT", "", None, f"{C}.0", "-5"], dtype=object),
+    [A, 0, 0, 0, C, 0],
+    [True, False, False, False, True, False],
+  )
+
+
+def test_lookup():
+  steamid_map = SteamIdMap([C, A, B, A])
+  assert len(steamid_map) == 3
+  ids = steamid_map.lookup(pd.Series([str(B), f"{C}.0", "BOT", None, str(A + 1), "1"]))
+  assert ids.dtype == np.int64
+  # tiny ids follow steamid order, unknown, junk and missing ids are -1
+  assert ids.tolist() == [1, 2, -1, -1, -1, -1]
+  # past the largest steamid, and a custom missing value
+  assert steamid_map.lookup([C + 1, A], missing=-7).tolist() == [-7, 0]
+
+
+def test_lookup_on_an_empty_map():
+  ids = SteamIdMap([]).lookup([A, "BOT"])
+  assert ids.dtype == np.int64
+  assert ids.tolist() == [-1, -1]
+
+
+def test_added_ids_come_after_the_sorted_ones():
+  steamid_map = SteamIdMap([B])
+  # ordered by first tick, then steamid, whatever order the rows come in
+  added = steamid_map.add(pd.Series([C, A, B, C, "BOT"]), [50, 80, 10, 40, 5])
+  assert added == 2
+  assert steamid_map.added == [(C, 40), (A, 80)]
+  assert steamid_map.lookup([A, B, C]).tolist() == [2, 0, 1]
+  assert steamid_map.add([A, B], [1, 1]) == 0
@@ -0,0 +1,224 @@
+import contextlib
+import io
+import json
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+pytest.importorskip("demoparser2")
+
+parser_path = os.path.abspath(
+  os.path.join(os.path.dirname(__file__), "../src/dem_parser")
+)
+sys.path.insert(0, parser_path)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import parser as dem_parser  # noqa: E402
+from event_store import CountingParser  # noqa: E402
+from fake_demoparser import FakeDemoParser  # noqa: E402
+
+SPACING = dem_parser.IDENTITY_SPACING
+
+
+class LateJoinParser(FakeDemoParser):
+  """The last player joins after the third identity tick and leaves before the
+  fourth, the identity ticks are every IDENTITY_SPACING ticks from the match start."""
+
+  def __init__(self, *args, **kwargs):
+    super().__init__(*args, **kwargs)
+    third = self.match_start + 2 * SPACING
+    self.late = (third + 200, third + SPACING - 200)
+
+  def parse_ticks(self, wanted_props, ticks=None):
+    df = super().parse_ticks(wanted_props, ticks)
+    late = df["steamid"] == self.steamids[-1]
+    joined = (df["tick"] >= self.late[0]) & (df["tick"] < self.late[1])
+    return df[~late | joined].reset_index(drop=True)
+
+
+def parse(tmp_path, monkeypatch, name, demo_parser):
+  monkeypatch.setattr(dem_parser, "OUTPUT_FOLDER", str(tmp_path / name))
+  monkeypatch.setattr(dem_parser, "DemoParser", lambda path: demo_parser)
+  demo = tmp_path / "match.dem"
+  demo.write_bytes(b"")
+  with contextlib.redirect_stdout(io.StringIO()):
+    json_path = dem_parser.parse_demo(str(demo), keep_demo=True)
+  with open(json_path) as f:
+    return json.load(f)
+
+
+@pytest.mark.parametrize("window", ["", "round"])
+def test_player_between_identity_ticks_is_kept(tmp_path, monkeypatch, window):
+  monkeypatch.setattr(dem_parser, "TICK_WINDOW", window)
+  late_parser = LateJoinParser(rounds=3, seed=4)
+  replay = parse(tmp_path, monkeypatch, "spaced", late_parser)
+
+  # what reading names and teams on every sampled tick gives
+  monkeypatch.setattr(dem_parser, "IDENTITY_SPACING", dem_parser.TICK_INTERVAL)
+  expected = parse(tmp_path, monkeypatch, "every", LateJoinParser(rounds=3, seed=4))
+
+  late_sid = len(replay["players"]) - 1
+  assert replay["players"][str(late_sid)]["sid"] == str(late_parser.steamids[-1])
+  assert replay["players"][str(late_sid)]["name"] == late_parser.names[-1]
+  seen = [t["t"] for t in replay["timeline"] if any(p[0] == late_sid for p in t["p"])]
+  assert seen and late_parser.late[0] <= min(seen) <= max(seen) < late_parser.late[1]
+  assert replay == expected
+
+
+def test_tick_frame_is_narrow():
+  parser = CountingParser(FakeDemoParser(rounds=4, seed=1))
+  tick_reads = []
+  parse_ticks = parser.parse_ticks
+
+  def recording_parse_ticks(props, ticks=None):
+    tick_reads.append((list(props), len(ticks)))
+    return parse_ticks(props, ticks=ticks)
+
+  parser.parse_ticks = recording_parse_ticks
+  start_tick, end_tick = 4000, parser.end_tick
+  with contextlib.redirect_stdout(io.StringIO()):
+    timeline, _, steamid_map = dem_parser.process_ticks(parser, start_tick, end_tick)
+    list(timeline)
+
+  # names and teams at a handful of ticks, everything else on the hot read
+  wanted = dem_parser.get_wanted_ticks(start_tick, end_tick)
+  identity = dem_parser.get_identity_ticks(wanted)
+  assert tick_reads == [
+    (dem_parser.IDENTITY_PROPS, len(identity)),
+    (dem_parser.TICK_PROPS, len(wanted)),
+  ]
+  assert len(identity) < len(wanted) // 50
+
+  raw = parser.parse_ticks(dem_parser.TICK_PROPS, ticks=[start_tick, end_tick])
+  df = dem_parser.clean_tick_frame(raw, steamid_map)
+  assert df.dtypes.to_dict() == dem_parser.TICK_DTYPES
+
+
+def frame(hps):
+  """One row per sampled tick and sid, {sid: [hp per tick]}, the players stand still."""
+  n = len(next(iter(hps.values())))
+  return pd.DataFrame(
+    {
+      "tick": [t * 12 for t in range(n) for _ in hps],
+      "sid": list(hps) * n,
+      "hp": [hps[sid][t] for t in range(n) for sid in hps],
+      "x": 0.0,
+      "y": 0.0,
+      "z": 0.0,
+      "rot": 0,
+    }
+  ).astype(dem_parser.TICK_DTYPES)
+
+
+def kept(df):
+  return {int(sid): g["tick"].tolist() for sid, g in df.groupby("sid")}
+
+
+def test_dead_runs_keep_their_first_sample():
+  # sid 1 dies on the third sample and stays dead, sid 2 is dead from the start
+  df = frame({1: [100, 90, 0, 0, 0, 0], 2: [0, 0, 0, 0, 0, 0]})
+  out = dem_parser.compact_player_rows(df)
+  assert kept(out) == {1: [0, 12, 24], 2: [0]}
+  # alive rows are never dropped without a hold policy, the rest is untouched
+  assert out["hp"].tolist() == [100, 0, 90, 0]
+  assert out["tick"].is_monotonic_increasing
+
+
+def test_revived_players_start_a_new_dead_run():
+  # dead for two samples, respawned, dead again
+  df = frame({1: [100, 0, 0, 100, 100, 0, 0]})
+  out = dem_parser.compact_player_rows(df)
+  assert kept(out) == {1: [0, 12, 36, 48, 60]}
+
+
+def test_dead_runs_are_cut_at_keep_at_ticks():
+  df = frame({1: [100, 0, 0, 0, 0, 0]})
+  out = dem_parser.compact_player_rows(df, keep_at=[36])
+  assert kept(out) == {1: [0, 12, 36]}
+
+
+@pytest.mark.parametrize("cut", [1, 2, 3, 5])
+def test_dead_runs_carry_across_windows(cut):
+  # the window edge falls before the death, on it, inside the run and at revival
+  df = frame({1: [100, 0, 0, 0, 100, 0], 2: [0, 0, 0, 0, 0, 0]})
+  whole = dem_parser.compact_player_rows(df)
+
+  carry = {}
+  edge = cut * 12
+  windows = [df[df["tick"] < edge], df[df["tick"] >= edge]]
+  parts = [dem_parser.compact_player_rows(w, carry) for w in windows]
+  assert kept(pd.concat(parts)) == kept(whole) == {1: [0, 12, 48, 60], 2: [0]}
+
+
+def test_held_compaction():
+  hold = {**dem_parser.HOLD_POLICY, "max_held_samples": 4}
+  # sid 1 stands still with a little jitter, sid 2 walks, sid 3 dies at tick 24
+  n = 10
+  df = pd.DataFrame(
+    {
+      "tick": [t * 12 for t in range(n) for _ in range(3)],
+      "sid": [1, 2, 3] * n,
+      "hp": [v for t in range(n) for v in (100, 100, 100 if t < 2 else 0)],
+      "x": [v for t in range(n) for v in (10.0 + 0.05 * (t % 2), 10.0 * t, 0.0)],
+      "y": [0.0] * 3 * n,
+      "z": [0.0] * 3 * n,
+      "rot": [v for t in range(n) for v in (90 + t % 2, 0, 0)],
+    }
+  )
+  out = dem_parser.compact_player_rows(df, hold=hold, keep_at=[72])
+  rows = {sid: g["tick"].tolist() for sid, g in out.groupby("sid")}
+  held = {sid: g.loc[g["held"] == 1, "tick"].tolist() for sid, g in out.groupby("sid")}
+
+  # refreshed every 4th sample and at the forced tick 72
+  assert rows[1] == [0, 48, 72]
+  assert held[1] == [0, 48, 72]
+  assert rows[2] == [t * 12 for t in range(n)]
+  assert held[2] == []
+  # held until death, then dead samples are dropped without a mark until the
+  # forced tick
+  assert rows[3] == [0, 24, 72]
+  assert held[3] == [0]
+  assert out["tick"].is_monotonic_increasing
+
+
+class StillPlayerParser(FakeDemoParser):
+  """player0 stands still at full health, so held compaction has runs to drop."""
+
+  def _player_props(self, tick, player, wanted_props):
+    data = super()._player_props(tick, player, wanted_props)
+    alive = tick < self.death_tick[self._round_of(tick), player]
+    still = (player == 0) & (alive | (tick < self.match_start))
+    values = {"health": 100, "X": 50.0, "Y": 50.0, "Z": 0.0, "yaw": 90.0}
+    for prop in set(values) & set(data):
+      data[prop] = np.where(still, values[prop], data[prop])
+    return data
+
+
+@pytest.mark.parametrize(
+  "hold", [None, {**dem_parser.HOLD_POLICY, "max_held_samples": 16}]
+)
+def test_compaction_carries_across_windows(hold):
+  parser = StillPlayerParser(rounds=3, seed=4)
+  start, end = parser.match_start, parser.end_tick
+  wanted = dem_parser.get_wanted_ticks(start, end)
+  # cut right after a player's first dead sample and in the middle of a held run
+  death_tick = parser.death_df["tick"].iloc[2]
+  first_dead = wanted[np.searchsorted(wanted, death_tick)]
+  edges = [
+    first_dead + dem_parser.TICK_INTERVAL,
+    first_dead + 40 * dem_parser.TICK_INTERVAL,
+  ]
+
+  timelines = []
+  for window in [None, edges]:
+    with contextlib.redirect_stdout(io.StringIO()):
+      timeline, _, _ = dem_parser.process_ticks(
+        parser, start, end, window=window, hold=hold
+      )
+      timelines.append(list(timeline))
+  assert timelines[0] == timelines[1]
+  rows = sum(len(t["p"]) for t in timelines[0])
+  assert rows < len(wanted) * parser.players
+  assert any("h" in t for t in timelines[0]) == (hold is not None)
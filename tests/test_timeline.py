@@ -0,0 +1,174 @@
+import json
+import os
+import sys
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+parser_path = os.path.abspath(
+  os.path.join(os.path.dirname(__file__), "../src/dem_parser")
+)
+sys.path.insert(0, parser_path)
+from timeline import delta_encoding_spec, iter_timeline  # noqa: E402
+
+N_PLAYERS = 10
+N_TICKS = 10_000
+
+
+def groupby_timeline(df, g_df=None):
+  # the old groupby-per-tick builder, kept as the reference output
+  g_grouped = g_df.groupby("tick") if g_df is not None else None
+  for tick, group in df.groupby("tick"):
+    tick_obj = {
+      "t": int(tick),
+      "p": [
+        [
+          int(sid),
+          int(hp),
+          round(float(x), 2),
+          round(float(y), 2),
+          round(float(z), 2),
+          int(rot),
+        ]
+        for sid, hp, x, y, z, rot in zip(
+          group["sid"], group["hp"], group["x"], group["y"], group["z"], group["rot"]
+        )
+      ],
+    }
+    if g_grouped is not None and tick in g_grouped.groups:
+      g = g_grouped.get_group(tick)
+      tick_obj["g"] = [
+        [
+          int(eid),
+          int(sid),
+          int(wep),
+          round(float(x), 2),
+          round(float(y), 2),
+          round(float(z), 2),
+        ]
+        for eid, sid, wep, x, y, z in zip(
+          g["eid"], g["sid"], g["wep"], g["x"], g["y"], g["z"]
+        )
+      ]
+    yield tick_obj
+
+
+def tick_frames(seed=0):
+  rng = np.random.default_rng(seed)
+  ticks = np.arange(N_TICKS) * 12
+  df = pd.DataFrame(
+    {
+      "tick": np.repeat(ticks, N_PLAYERS),
+      "sid": np.tile(np.arange(N_PLAYERS), N_TICKS),
+      "hp": rng.integers(0, 101, N_TICKS * N_PLAYERS),
+      "x": rng.uniform(-3000, 3000, N_TICKS * N_PLAYERS).round(2),
+      "y": rng.uniform(-3000, 3000, N_TICKS * N_PLAYERS).round(2),
+      "z": rng.uniform(-500, 500, N_TICKS * N_PLAYERS).round(2),
+      "rot": rng.integers(-180, 180, N_TICKS * N_PLAYERS),
+    }
+  )
+  # dead players are compacted away, so ticks don't all have the same row count
+  df = df[rng.random(len(df)) > 0.2].reset_index(drop=True)
+
+  # a few grenades per tick on some ticks, some on ticks that aren't sampled
+  g_ticks = np.sort(rng.choice(ticks, 3000)) + rng.choice([0, 0, 0, 5], 3000)
+  g_df = pd.DataFrame(
+    {
+      "tick": g_ticks,
+      "eid": np.arange(len(g_ticks)),
+      "sid": rng.integers(-1, N_PLAYERS, len(g_ticks)),
+      "wep": rng.integers(0, 6, len(g_ticks)),
+      "x": rng.uniform(-3000, 3000, len(g_ticks)).round(2),
+      "y": rng.uniform(-3000, 3000, len(g_ticks)).round(2),
+      "z": rng.uniform(-500, 500, len(g_ticks)).round(2),
+    }
+  ).sample(frac=1, random_state=seed)
+  return df, g_df
+
+
+def test_timeline_matches_groupby():
+  df, g_df = tick_frames()
+  assert list(iter_timeline(df, g_df)) == list(groupby_timeline(df, g_df))
+  assert list(iter_timeline(df)) == list(groupby_timeline(df))
+  empty = df.iloc[:0]
+  assert list(iter_timeline(empty, g_df)) == []
+
+
+def decode_delta(timeline, spec):
+  # follows the decoder spec written to meta
+  state = {}
+  for tick_obj in timeline:
+    if tick_obj.get("k"):
+      state = {}
+    players = []
+    for sid, *deltas in tick_obj["p"]:
+      deltas += [0] * (5 - len(deltas))
+      hp, x, y, z, rot = [a + b for a, b in zip(state.get(sid, [0] * 5), deltas)]
+      state[sid] = [hp, x, y, z, rot]
+      scale = spec["scale"]
+      players.append([sid, hp, x / scale, y / scale, z / scale, rot])
+    yield {**tick_obj, "p": players}
+
+
+def test_delta_timeline_roundtrip():
+  df, g_df = tick_frames()
+  # players walk around or stand still instead of teleporting every tick
+  rng = np.random.default_rng(1)
+  steps = rng.normal(0, 30, (len(df), 3)) * (rng.random((len(df), 1)) < 0.6)
+  walked = pd.DataFrame(steps, index=df.index).groupby(df["sid"]).cumsum()
+  df[["x", "y", "z"]] = (walked.to_numpy() + 500).round(2)
+  turns = rng.integers(-5, 6, len(df)) * (rng.random(len(df)) < 0.5)
+  df["rot"] = pd.Series(turns, index=df.index).groupby(df["sid"]).cumsum() % 360 - 180
+  df["hp"] = np.where(rng.random(len(df)) < 0.02, df["hp"], 100)
+
+  spec = delta_encoding_spec()
+  plain = list(iter_timeline(df, g_df))
+  encoded = list(iter_timeline(df, g_df, encoding="delta"))
+  decoded = list(decode_delta(encoded, spec))
+
+  assert [t["t"] for t in decoded] == [t["t"] for t in plain]
+  assert [t.get("g") for t in decoded] == [t.get("g") for t in plain]
+  assert sum(1 for t in encoded if t.get("k")) == -(
+    -len(plain) // spec["keyframe_ticks"]
+  )
+  for got, want in zip(decoded, plain):
+    assert [p[:2] for p in got["p"]] == [p[:2] for p in want["p"]]
+    assert [p[5] for p in got["p"]] == [p[5] for p in want["p"]]
+    positions = np.array([p[2:5] for p in got["p"]]) - np.array(
+      [p[2:5] for p in want["p"]]
+    )
+    assert np.abs(positions).max() <= 0.5 / spec["scale"] + 1e-9
+
+  plain_size = len(json.dumps(plain, separators=(",", ":")))
+  encoded_size = len(json.dumps(encoded, separators=(",", ":")))
+  assert encoded_size * 2 < plain_size
+
+  # forced keyframes, e.g. round starts, reset the state on their first sampled tick
+  round_starts = [5003, 60000]
+  forced = list(iter_timeline(df, g_df, encoding="delta", keyframe_at=round_starts))
+  keyframe_ticks = [t["t"] for t in forced if t.get("k")]
+  assert {5004, 60000} <= set(keyframe_ticks)
+  assert [t["p"] for t in decode_delta(forced, spec)] == [t["p"] for t in decoded]
+
+
+def test_timeline_benchmark():
+  df, g_df = tick_frames()
+
+  start = time.perf_counter()
+  for _ in groupby_timeline(df, g_df):
+    pass
+  groupby_time = time.perf_counter() - start
+
+  start = time.perf_counter()
+  for _ in iter_timeline(df, g_df):
+    pass
+  split_time = time.perf_counter() - start
+
+  # timings are printed (pytest -s) rather than asserted, they depend on the box
+  print(
+    f"\ntimeline {len(df)} rows: groupby {groupby_time:.3f}s, "
+    f"split {split_time:.3f}s ({groupby_time / split_time:.1f}x)"
+  )
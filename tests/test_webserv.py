@@ -5,6 +5,8 @@ import time
 
 src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../src"))
 sys.path.insert(0, src_path)
+import server  # noqa: E402
+from job_store import JobStore  # noqa: E402
 from server import app  # noqa: E402
 
 
@@ -12,13 +14,15 @@ def gitaction_awareness():
   return os.getenv("GITHUB_ACTIONS") == "true"
 
 
-def test_webserver():
+def test_webserver(tmp_path, monkeypatch):
   if gitaction_awareness():  # if this is ran in github actions
     client = TestClient(app)
     response = client.get("/health")
     assert response.status_code == 200
     assert response.json() == {"status": "ok"}
   else:
+    # the lifespan opens the job store, keep its file out of the tree
+    monkeypatch.setattr(server, "job_store", JobStore(str(tmp_path / "jobs.sqlite3")))
     with TestClient(app) as client:  # local tests use lifespan
       time.sleep(5)
       response = client.get("/health")  # /health to see if web server is responsive